@@ -5,5 +5,8 @@ This module contains the implementation of various AI agents used in MindFlow.
 
 from .agent_service import AgentService
 from .agent_types import SafetyStatus
+from .instrumentation import metrics_response, record_cache_hit, span
+from .llm_client import LLMClient, Priority, CircuitOpenError, get_llm_client, get_model, priority_scope
+from .single_flight import SingleFlight, request_key
 
-__all__ = ['AgentService', 'SafetyStatus'] 
\ No newline at end of file
+__all__ = ['AgentService', 'SafetyStatus', 'LLMClient', 'Priority', 'CircuitOpenError', 'get_llm_client', 'get_model', 'priority_scope', 'SingleFlight', 'request_key', 'metrics_response', 'record_cache_hit', 'span'] 
\ No newline at end of file
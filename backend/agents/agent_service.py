@@ -1,6 +1,10 @@
 """Main service class that handles all AI agent interactions."""
 
+import contextvars
+import csv
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 import google.generativeai as genai
@@ -31,7 +35,10 @@ from .agent_types import (
     MermaidAgentInput,
     MermaidAgentOutput,
     ConfigAgentInput,
-    ConfigAgentOutput
+    ConfigAgentOutput,
+    BatchFlashcardAgentInput,
+    BatchQuestionAgentInput,
+    StudyDeck
 )
 
 from .implementations import (
@@ -46,17 +53,45 @@ from .implementations import (
     handle_flashcard,
     handle_cheatsheet,
     handle_mermaid,
-    handle_config
+    handle_config,
+    handle_batch_flashcard,
+    handle_batch_question
 )
+from .prefetch import PrefetchScheduler
+from .llm_client import CallStats, Priority, get_llm_client, get_model
+from .answer_grading import grade_answer, local_feedback
+from .prompting import chat_history, dumps, render_payload
+from .single_flight import request_key
+from .instrumentation import VERBOSE, AgentCallRecord, agent_name, estimate_tokens, record_agent_call, record_cache_hit, span
+
+# Agents the classifier may route to; built once and shared by every classifier input.
+AVAILABLE_AGENTS = [
+    {'name': 'exploration', 'description': 'Explores new topics'},
+    {'name': 'interactive', 'description': 'Handles questions and answers'},
+    {'name': 'question', 'description': 'Generates quiz questions'},
+    {'name': 'answerEval', 'description': 'Evaluates answers to questions'},
+    {'name': 'deepDive', 'description': 'Provides detailed concept breakdowns'},
+    {'name': 'flashcard', 'description': 'Creates study flashcards'},
+    {'name': 'cheatsheet', 'description': 'Generates quick reference guides'},
+    {'name': 'mermaid', 'description': 'Creates visual diagrams'},
+    {'name': 'config', 'description': 'Handles system configuration'}
+]
+
 
 class AgentService:
     """Service class that manages all AI agent interactions."""
 
+    DECK_SUBTOPICS_PER_PROMPT = 4
+    DECK_MAX_PROMPT_CHARS = 2000
+    DECK_MAX_CONCURRENCY = 4
+
     def __init__(self, api_key: str):
         """Initialize the agent service with API key."""
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = get_model('gemini-pro')
+        self.llm = get_llm_client()
         self.learning_state = self._initialize_learning_state()
+        self.prefetcher = PrefetchScheduler()
 
     def _initialize_learning_state(self) -> LearningState:
         """Initialize a new learning state."""
@@ -80,41 +115,79 @@ class AgentService:
         entry['timestamp'] = datetime.now().isoformat()
         self.learning_state.session_history.append(entry)
 
-    def _handle_answer_evaluation(self, topic: str) -> None:
+    def _grade_answer_locally(self, answer: str) -> Optional[AnswerEvalAgentOutput]:
+        """Grade the pending question without the model when its answer is known."""
+        state = self.learning_state
+        is_correct = grade_answer(answer, state.last_question_type, state.last_correct_answer, state.last_question_options)
+        if is_correct is None:
+            return None
+        record_cache_hit('answer_evaluation', 'local')
+        return AnswerEvalAgentOutput(
+            is_correct=is_correct,
+            feedback=local_feedback(is_correct, state.last_correct_answer)
+        )
+
+    def _handle_answer_evaluation(self, topic: str, local_result: Optional[AnswerEvalAgentOutput] = None) -> AnswerEvalAgentOutput:
         self.learning_state.awaiting_answer = False
         answer_eval_input = AnswerEvalAgentInput("", self.learning_state.active_subtopic, self.learning_state.current_topic, self.learning_state.last_question, topic)
         answer_eval = handle_answer_eval(self.model, answer_eval_input, self._call_agent)
         return AnswerEvalAgentOutput(
-            is_correct=answer_eval.is_correct,
+            # A locally graded verdict is authoritative; the model only adds feedback.
+            is_correct=local_result.is_correct if local_result is not None else answer_eval.is_correct,
             feedback=answer_eval.feedback
         )
 
     def _call_agent(self, instructions: str, input_data: Any) -> Any:
         """Handle communication with the AI model."""
-        print('\n=== Agent Call ===')
-        print('Instructions:', instructions.split('\n')[0])
-        print('Input:', json.dumps(getattr(input_data, "to_dict", lambda: input_data)(), indent=2))
+        record = AgentCallRecord(agent=agent_name(instructions, input_data))
+        with span('agent.' + record.agent) as current:
+            try:
+                return self._request_agent(instructions, input_data, record)
+            finally:
+                record_agent_call(record)
+                if current is not None:
+                    for key, value in record.to_dict().items():
+                        if value is not None:
+                            current.set_attribute('mindflow.' + key, value)
+
+    def _request_agent(self, instructions: str, input_data: Any, record: AgentCallRecord) -> Any:
+        """Send one agent request and parse its JSON reply, filling in `record`."""
+        if VERBOSE:
+            print('\n=== Agent Call ===')
+            print('Instructions:', instructions.split('\n')[0])
+            print('Input:', dumps(input_data, indent=True))
 
         try:
-            chat = self.model.start_chat(history=[
-                {
-                    'role': 'user',
-                    'parts': [{'text': instructions}]
-                },
-                {
-                    'role': 'model',
-                    'parts': [{'text': 'I understand my role and instructions. Ready to process input.'}]
-                }
-            ])
-
-            result = chat.send_message(json.dumps({
-                **(input_data if isinstance(input_data, dict) else input_data.to_dict()),
-                'response_format': 'json',
-                'format_instructions': 'Return only valid JSON without any markdown formatting or additional text.'
-            }))
+            payload = render_payload(input_data)
+            def send():
+                # A stream that failed part-way leaves its ChatSession unusable,
+                # so every attempt starts from a fresh session.
+                chat = self.model.start_chat(history=list(chat_history(instructions)))
+                sent_at = time.perf_counter()
+                streamed = chat.send_message(payload, stream=True)
+                for _ in streamed:
+                    if record.time_to_first_token is None:
+                        record.time_to_first_token = time.perf_counter() - sent_at
+                return streamed
+
+            stats = CallStats()
+            try:
+                # Identical concurrent requests (same agent, same input) share one API call.
+                result = self.llm.call(send, stats=stats, key=request_key(instructions, payload))
+            finally:
+                record.queue_wait = stats.queue_wait
+                record.attempts = stats.attempts
 
             response = result.text
-            print('Raw response:', response)
+            if stats.coalesced:
+                # The leader's record already counts these tokens.
+                record_cache_hit(record.agent, 'single_flight')
+            else:
+                usage = getattr(result, 'usage_metadata', None)
+                record.prompt_tokens = getattr(usage, 'prompt_token_count', 0) or estimate_tokens(instructions) + estimate_tokens(payload)
+                record.response_tokens = getattr(usage, 'candidates_token_count', 0) or estimate_tokens(response)
+            if VERBOSE:
+                print('Raw response:', response)
 
             try:
                 json_start = response.find('{')
@@ -123,6 +196,7 @@ class AgentService:
                     clean_response = response[json_start:json_end]
                     parsed_response = json.loads(clean_response, strict=False)
                 else:
+                    record.outcome = 'no_json'
                     return {
                         'status': SafetyStatus.SAFE,
                         'explanation': response.strip(),
@@ -132,7 +206,7 @@ class AgentService:
                     }
 
                 if not isinstance(input_data, SafetyAgentInput):
-                    response_text = json.dumps(parsed_response, ensure_ascii=False).lower()
+                    response_text = dumps(parsed_response).lower()
                     moderation_phrases = [
                         'cannot help',
                         'inappropriate',
@@ -146,6 +220,7 @@ class AgentService:
                     ]
                     
                     if any(phrase in response_text for phrase in moderation_phrases):
+                        record.outcome = 'moderated'
                         return {
                             'status': SafetyStatus.INAPPROPRIATE,
                             'explanation': "I apologize, but I cannot generate that type of content. Let's focus on something else."
@@ -155,6 +230,7 @@ class AgentService:
 
             except json.JSONDecodeError as e:
                 print(f'Error parsing JSON response: {e}')
+                record.outcome = 'json_error'
                 return {
                     'status': SafetyStatus.SAFE,
                     'explanation': response.strip(),
@@ -165,7 +241,9 @@ class AgentService:
 
         except Exception as e:
             print(f'Error in agent call: {e}')
+            record.outcome = 'api_error'
             if 'SAFETY' in str(e):
+                record.outcome = 'safety_blocked'
                 return {
                     'status': SafetyStatus.INAPPROPRIATE,
                     'explanation': "I apologize, but I cannot generate that type of content. Let's focus on something else."
@@ -178,31 +256,70 @@ class AgentService:
                 'summary': ''
             }
 
-    def run_safety_check(self, input_text: str) -> SafetyAgentOutput:
+    def _context_summary(self) -> str:
+        return '\n'.join(entry['content'] for entry in self.learning_state.session_history)
+
+    def run_safety_check(self, input_text: str, context_summary: Optional[str] = None) -> SafetyAgentOutput:
         """Run a safety check on user input."""
-        print('\n=== Running Safety Check ===')
-        print('Input:', input_text)
-        print('Session history length:', len(self.learning_state.session_history))
+        if VERBOSE:
+            print('\n=== Running Safety Check ===')
+            print('Input:', input_text)
+            print('Session history length:', len(self.learning_state.session_history))
 
         safety_input = SafetyAgentInput(
             user_input=input_text,
-            latest_context_summary='\n'.join(
-                entry['content'] for entry in self.learning_state.session_history
-            )
+            latest_context_summary=context_summary if context_summary is not None else self._context_summary()
         )
 
         return handle_safety(self.model, safety_input, self._call_agent)
 
-    def start_new_topic(self, topic: str, user_background: Optional[str] = None, current_topic: Optional[str] = None, active_subtopic: Optional[str] = None, session_history: Optional[List[str]] = None) -> ExplorationAgentOutput:
+    def _prefetch_follow_ups(self, session_id: str, subtopics: List[str], context_summary: str) -> None:
+        """Pre-generate deep dives and first questions for the leading subtopics."""
+        broader_topic = self.learning_state.current_topic
+        self.prefetcher.schedule(session_id, broader_topic, subtopics, {
+            'deepDive': lambda subtopic: handle_deep_dive(self.model, DeepDiveAgentInput(
+                subtopic=subtopic,
+                broader_topic=broader_topic,
+                latest_context_summary=context_summary
+            ), self._call_agent),
+            'question': lambda subtopic: handle_question(self.model, QuestionAgentInput(
+                subtopic=subtopic,
+                broader_topic=broader_topic,
+                latest_context_summary=context_summary
+            ), self._call_agent)
+        }, context=context_summary)
+
+    def start_new_topic(self, topic: str, user_background: Optional[str] = None, current_topic: Optional[str] = None, active_subtopic: Optional[str] = None, session_history: Optional[List[str]] = None, session_id: str = 'default', detailed_feedback: bool = False) -> ExplorationAgentOutput:
         """Begin a new learning topic."""
-        print('\n=== Starting Agent Pipeline ===')
-        print('Input:', topic)
-        
+        with span('start_new_topic', session_id=session_id):
+            return self._run_pipeline(topic, current_topic, active_subtopic, session_history, session_id, detailed_feedback)
+
+    def _run_pipeline(self, topic: str, current_topic: Optional[str], active_subtopic: Optional[str], session_history: Optional[List[str]], session_id: str, detailed_feedback: bool = False) -> ExplorationAgentOutput:
+        """Run safety, classification and the selected agent for one user turn."""
+        if VERBOSE:
+            print('\n=== Starting Agent Pipeline ===')
+            print('Input:', topic)
+
         self.learning_state.current_topic = current_topic if current_topic != None else topic
         self.learning_state.active_subtopic = active_subtopic if active_subtopic != None else topic
         self.learning_state.session_history = session_history if session_history != None else []
-
-        safety_check = self.run_safety_check(topic)
+        self.prefetcher.retain(session_id, self.learning_state.current_topic)
+
+        awaiting_answer = self.learning_state.awaiting_answer and self.learning_state.last_question
+        if awaiting_answer:
+            # Closed-form answers are graded before any model call; an answer
+            # that matched an option needs neither a safety check nor the classifier.
+            local_result = self._grade_answer_locally(topic)
+            if local_result is not None:
+                if not detailed_feedback:
+                    self.learning_state.awaiting_answer = False
+                    return local_result
+                return self._handle_answer_evaluation(topic, local_result)
+
+        # Joined once per turn; every agent input below shares this string.
+        context_summary = self._context_summary()
+
+        safety_check = self.run_safety_check(topic, context_summary)
         if safety_check.status != SafetyStatus.SAFE:
             return ExplorationAgentOutput(
                 status=safety_check.status,
@@ -212,34 +329,19 @@ class AgentService:
                 summary=safety_check.explanation
             )
 
+        if awaiting_answer:
+            return self._handle_answer_evaluation(topic)
+
         classifier_input = AgentClassifierInput(
             user_input=topic,
-            available_agents=[
-                {'name': 'exploration', 'description': 'Explores new topics'},
-                {'name': 'interactive', 'description': 'Handles questions and answers'},
-                {'name': 'question', 'description': 'Generates quiz questions'},
-                {'name': 'answerEval', 'description': 'Evaluates answers to questions'},
-                {'name': 'deepDive', 'description': 'Provides detailed concept breakdowns'},
-                {'name': 'flashcard', 'description': 'Creates study flashcards'},
-                {'name': 'cheatsheet', 'description': 'Generates quick reference guides'},
-                {'name': 'mermaid', 'description': 'Creates visual diagrams'},
-                {'name': 'config', 'description': 'Handles system configuration'}
-            ],
-            latest_context_summary='\n'.join(
-                entry['content'] for entry in self.learning_state.session_history
-            )
+            available_agents=AVAILABLE_AGENTS,
+            latest_context_summary=context_summary
         )
 
         classification = handle_classification(self.model, classifier_input, self._call_agent)
 
-        if self.learning_state.awaiting_answer and self.learning_state.last_question:
-            return self._handle_answer_evaluation(topic)
-        
-        context_summary = '\n'.join(
-            entry['content'] for entry in self.learning_state.session_history
-        )
-
-        print("Agent: ", classification.next_agent)
+        if VERBOSE:
+            print("Agent: ", classification.next_agent)
 
         match classification.next_agent:
             case 'exploration':
@@ -247,7 +349,10 @@ class AgentService:
                     user_prompt=topic,
                     latest_context_summary=context_summary
                 )
-                return handle_exploration(self.model, input_data, self._call_agent)
+                response = handle_exploration(self.model, input_data, self._call_agent)
+                self.learning_state.learning_path = response.subtopics
+                self._prefetch_follow_ups(session_id, response.subtopics, context_summary)
+                return response
 
             case 'interactive':
                 input_data = InteractiveAgentInput(
@@ -269,9 +374,17 @@ class AgentService:
                     broader_topic=self.learning_state.current_topic,
                     latest_context_summary=context_summary
                 )
-                response = handle_question(self.model, input_data, self._call_agent)
+                response = self.prefetcher.take(
+                    session_id, self.learning_state.current_topic, 'question', self.learning_state.active_subtopic, context_summary, consume=True
+                )
+                if response is not None:
+                    record_cache_hit('question', 'prefetch')
+                else:
+                    response = handle_question(self.model, input_data, self._call_agent)
                 self.learning_state.last_question = response.question
                 self.learning_state.last_question_type = response.type
+                self.learning_state.last_question_options = response.options
+                self.learning_state.last_correct_answer = response.correct_answer
                 self.learning_state.awaiting_answer = True
                 return ExplorationAgentOutput(
                     status=SafetyStatus.SAFE,
@@ -287,7 +400,13 @@ class AgentService:
                     broader_topic=self.learning_state.current_topic,
                     latest_context_summary=context_summary
                 )
-                response = handle_deep_dive(self.model, input_data, self._call_agent)
+                response = self.prefetcher.take(
+                    session_id, self.learning_state.current_topic, 'deepDive', self.learning_state.active_subtopic, context_summary
+                )
+                if response is not None:
+                    record_cache_hit('deep_dive', 'prefetch')
+                else:
+                    response = handle_deep_dive(self.model, input_data, self._call_agent)
                 return ExplorationAgentOutput(
                     status=SafetyStatus.SAFE,
                     explanation=response.breakdown,
@@ -366,11 +485,132 @@ class AgentService:
     def get_session_summary(self) -> SummaryConsolidationAgentOutput:
         """Generate a summary of the learning session."""
         input_data = SummaryConsolidationAgentInput(
-            latest_context_summary='\n'.join(
-                entry['content'] for entry in self.learning_state.session_history
-            ),
+            latest_context_summary=self._context_summary(),
             last_agent_input=None,
             last_agent_output=None
         )
 
-        return handle_summary(self.model, input_data, self._call_agent) 
\ No newline at end of file
+        return handle_summary(self.model, input_data, self._call_agent)
+
+    def _pack_subtopics(self, subtopics: List[str], latest_context_summary: str) -> List[List[str]]:
+        """Group subtopics into batches that fit into a single prompt."""
+        batches = []
+        current = []
+        current_chars = len(latest_context_summary)
+        for subtopic in subtopics:
+            if current and (
+                len(current) >= self.DECK_SUBTOPICS_PER_PROMPT
+                or current_chars + len(subtopic) > self.DECK_MAX_PROMPT_CHARS
+            ):
+                batches.append(current)
+                current = []
+                current_chars = len(latest_context_summary)
+            current.append(subtopic)
+            current_chars += len(subtopic)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _generate_flashcard_batch(self, broader_topic: str, subtopics: List[str], latest_context_summary: str) -> Dict[str, str]:
+        """Generate flashcards for a batch; subtopics the reply missed are left out."""
+        return dict(handle_batch_flashcard(self.model, BatchFlashcardAgentInput(
+            broader_topic=broader_topic,
+            subtopics=subtopics,
+            latest_context_summary=latest_context_summary
+        ), self._call_agent).flashcards)
+
+    def _generate_flashcards(self, broader_topic: str, subtopic: str, latest_context_summary: str) -> Dict[str, str]:
+        """Single-subtopic fallback for a subtopic its batch missed."""
+        return {subtopic: handle_flashcard(self.model, FlashcardAgentInput(
+            broader_topic=broader_topic,
+            subtopic=subtopic,
+            latest_context_summary=latest_context_summary
+        ), self._call_agent).csv_content}
+
+    def _generate_question_batch(self, broader_topic: str, subtopics: List[str], latest_context_summary: str) -> Dict[str, QuestionAgentOutput]:
+        """Generate questions for a batch; subtopics the reply missed are left out."""
+        return dict(handle_batch_question(self.model, BatchQuestionAgentInput(
+            broader_topic=broader_topic,
+            subtopics=subtopics,
+            latest_context_summary=latest_context_summary
+        ), self._call_agent).questions)
+
+    def _generate_question(self, broader_topic: str, subtopic: str, latest_context_summary: str) -> Dict[str, QuestionAgentOutput]:
+        """Single-subtopic fallback for a subtopic its batch missed."""
+        return {subtopic: handle_question(self.model, QuestionAgentInput(
+            subtopic=subtopic,
+            broader_topic=broader_topic,
+            latest_context_summary=latest_context_summary
+        ), self._call_agent)}
+
+    @staticmethod
+    def _parse_flashcard_csv(subtopic: str, csv_content: str) -> List[Dict[str, str]]:
+        """Turn an agent's CSV flashcard block into deck rows."""
+        cards = []
+        for row in csv.reader(csv_content.strip().splitlines()):
+            if len(row) < 2:
+                continue
+            question, answer = row[0].strip(), ','.join(row[1:]).strip()
+            if (question.lower(), answer.lower()) == ('question', 'answer'):
+                continue
+            cards.append({'subtopic': subtopic, 'question': question, 'answer': answer})
+        return cards
+
+    def generate_deck(
+        self,
+        broader_topic: str,
+        subtopics: List[str],
+        include_flashcards: bool = True,
+        include_questions: bool = True,
+        latest_context_summary: str = ''
+    ) -> StudyDeck:
+        """Generate flashcards and questions for many subtopics concurrently.
+
+        Calls run at the caller's priority; wrap the call in `priority_scope`
+        (BULK for jobs and prefetching, INTERACTIVE for a waiting user).
+        """
+        def submit(fn, *args):
+            # Pool threads do not inherit context variables, so each task carries a copy.
+            return executor.submit(contextvars.copy_context().run, fn, *args)
+
+        subtopics = list(dict.fromkeys(subtopic for subtopic in subtopics if subtopic))
+        batches = self._pack_subtopics(subtopics, latest_context_summary)
+
+        with ThreadPoolExecutor(max_workers=self.DECK_MAX_CONCURRENCY) as executor:
+            batch_futures = {}
+            for batch in batches:
+                if include_flashcards:
+                    batch_futures[submit(self._generate_flashcard_batch, broader_topic, batch, latest_context_summary)] = ('flashcards', batch)
+                if include_questions:
+                    batch_futures[submit(self._generate_question_batch, broader_topic, batch, latest_context_summary)] = ('questions', batch)
+
+            results = {'flashcards': {}, 'questions': {}}
+            fallbacks = []
+            fallback_fns = {'flashcards': self._generate_flashcards, 'questions': self._generate_question}
+            for future in as_completed(batch_futures):
+                kind, batch = batch_futures[future]
+                results[kind].update(future.result())
+                # Subtopics a batch missed go back on the pool so a failed batch
+                # fans out instead of serialising its retries on one worker.
+                fallbacks.extend(
+                    (kind, submit(fallback_fns[kind], broader_topic, subtopic, latest_context_summary))
+                    for subtopic in batch if subtopic not in results[kind]
+                )
+            for kind, future in fallbacks:
+                results[kind].update(future.result())
+            flashcards_by_subtopic = results['flashcards']
+            questions_by_subtopic = results['questions']
+
+        flashcards = []
+        questions = []
+        for subtopic in subtopics:
+            if subtopic in flashcards_by_subtopic:
+                flashcards.extend(self._parse_flashcard_csv(subtopic, flashcards_by_subtopic[subtopic]))
+            if subtopic in questions_by_subtopic:
+                questions.append({'subtopic': subtopic, **questions_by_subtopic[subtopic].to_dict()})
+
+        return StudyDeck(
+            broader_topic=broader_topic,
+            flashcards=flashcards,
+            questions=questions
+        )
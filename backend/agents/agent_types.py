@@ -1,6 +1,9 @@
+import csv
+import io
 from enum import Enum
 from typing import List, Optional, Dict, Any
 from dataclasses import dataclass, asdict
+from .prompting import shallow_dict
 
 class SafetyStatus(str, Enum):
     SAFE = "SAFE"
@@ -8,20 +11,17 @@ class SafetyStatus(str, Enum):
     DANGEROUS = "DANGEROUS"
     INAPPROPRIATE = "INAPPROPRIATE"
 
-@dataclass
+@dataclass(slots=True)
 class BaseAgentInput:
     latest_context_summary: str
 
     def to_dict(self):
-        return asdict(self)
+        return shallow_dict(self)
 
-@dataclass
+@dataclass(slots=True)
 class ExplorationAgentInput(BaseAgentInput):
     user_prompt: str
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class ExplorationAgentOutput:
     status: SafetyStatus
@@ -39,13 +39,10 @@ class ExplorationAgentOutput:
             "summary": self.summary
         }
 
-@dataclass
+@dataclass(slots=True)
 class InteractiveAgentInput(BaseAgentInput):
     user_input: str
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class InteractiveAgentOutput:
     response: str
@@ -53,14 +50,11 @@ class InteractiveAgentOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class QuestionAgentInput(BaseAgentInput):
     subtopic: str
     broader_topic: str
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class QuestionAgentOutput:
     question: str
@@ -71,16 +65,13 @@ class QuestionAgentOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class AnswerEvalAgentInput(BaseAgentInput):
     subtopic: str
     broader_topic: str
     question_asked: str
     user_question_answer: str
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class AnswerEvalAgentOutput:
     is_correct: bool
@@ -89,14 +80,11 @@ class AnswerEvalAgentOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class AgentClassifierInput(BaseAgentInput):
     user_input: str
     available_agents: List[Dict[str, str]]
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class AgentClassifierOutput:
     next_agent: str
@@ -104,13 +92,10 @@ class AgentClassifierOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class SafetyAgentInput(BaseAgentInput):
     user_input: str
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class SafetyAgentOutput:
     status: SafetyStatus
@@ -122,14 +107,11 @@ class SafetyAgentOutput:
             "explanation": self.explanation
         }
 
-@dataclass
+@dataclass(slots=True)
 class SummaryConsolidationAgentInput(BaseAgentInput):
     last_agent_input: Any
     last_agent_output: Any
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class SummaryConsolidationAgentOutput:
     summary: str
@@ -139,14 +121,11 @@ class SummaryConsolidationAgentOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class DeepDiveAgentInput(BaseAgentInput):
     subtopic: str
     broader_topic: str
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class DeepDiveAgentOutput:
     breakdown: str
@@ -157,14 +136,11 @@ class DeepDiveAgentOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class FlashcardAgentInput(BaseAgentInput):
     broader_topic: str
     subtopic: Optional[str]
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class FlashcardAgentOutput:
     csv_content: str
@@ -172,14 +148,11 @@ class FlashcardAgentOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class CheatsheetAgentInput(BaseAgentInput):
     broader_topic: str
     subtopic: Optional[str]
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class CheatsheetAgentOutput:
     content: str
@@ -187,15 +160,12 @@ class CheatsheetAgentOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class MermaidAgentInput(BaseAgentInput):
     broader_topic: str
     subtopic: Optional[str]
     available_diagram_types: List[str]
 
-    def to_dict(self):
-        return asdict(self)
-
 @dataclass
 class MermaidAgentOutput:
     mermaid_code: str
@@ -203,20 +173,62 @@ class MermaidAgentOutput:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class ConfigAgentInput(BaseAgentInput):
     user_input: str
 
+@dataclass
+class ConfigAgentOutput:
+    prompt_addition: str
+
+    def to_dict(self):
+        return asdict(self)
+
+@dataclass(slots=True)
+class BatchFlashcardAgentInput(BaseAgentInput):
+    broader_topic: str
+    subtopics: List[str]
+
+@dataclass
+class BatchFlashcardAgentOutput:
+    flashcards: Dict[str, str]
+
     def to_dict(self):
         return asdict(self)
 
+@dataclass(slots=True)
+class BatchQuestionAgentInput(BaseAgentInput):
+    broader_topic: str
+    subtopics: List[str]
+
 @dataclass
-class ConfigAgentOutput:
-    prompt_addition: str
+class BatchQuestionAgentOutput:
+    questions: Dict[str, QuestionAgentOutput]
+
+    def to_dict(self):
+        return {
+            "questions": {subtopic: question.to_dict() for subtopic, question in self.questions.items()}
+        }
+
+@dataclass
+class StudyDeck:
+    broader_topic: str
+    flashcards: List[Dict[str, str]]
+    questions: List[Dict[str, Any]]
 
     def to_dict(self):
         return asdict(self)
 
+    def to_csv(self) -> str:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["subtopic", "question", "answer"])
+        for card in self.flashcards:
+            writer.writerow([card["subtopic"], card["question"], card["answer"]])
+        for question in self.questions:
+            writer.writerow([question["subtopic"], question["question"], question["correct_answer"]])
+        return buffer.getvalue()
+
 @dataclass
 class LearningState:
     current_topic: str
@@ -228,6 +240,8 @@ class LearningState:
     last_quiz_answer: Optional[str] = None
     last_question: Optional[str] = None
     last_question_type: Optional[str] = None
+    last_question_options: Optional[List[str]] = None
+    last_correct_answer: Optional[str] = None
     awaiting_answer: bool = False
 
     def to_dict(self):
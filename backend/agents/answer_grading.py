@@ -0,0 +1,89 @@
+"""Deterministic grading of quiz answers that have a known correct answer.
+
+MCQ answers may be given as the option text, its letter ("b", "(b)",
+"option b") or its 1-based number. True/false answers accept the usual
+yes/no spellings. Any other question type counts as correct on a normalized
+exact match. If an answer cannot be graded with certainty (free-form text
+that matches nothing), `grade_answer` returns None and the caller falls
+back to the Answer Evaluation Agent.
+"""
+
+import re
+import string
+from typing import List, Optional
+
+_WHITESPACE = re.compile(r'\s+')
+_OPTION_REFERENCE = re.compile(r'^(?:option|answer|choice)?\s*[(\[]?([a-z]|\d{1,2})[)\].:]?$')
+_TRUE = {'true', 't', 'yes', 'y', 'correct', 'right'}
+_FALSE = {'false', 'f', 'no', 'n', 'incorrect', 'wrong'}
+
+
+def normalize(text: str) -> str:
+    """Case-fold, collapse whitespace and drop surrounding punctuation."""
+    return _WHITESPACE.sub(' ', text.casefold()).strip().strip(string.punctuation + ' ')
+
+
+def _option_index(answer: str, options: List[str]) -> Optional[int]:
+    normalized = [normalize(option) for option in options]
+    if answer in normalized:
+        return normalized.index(answer)
+    match = _OPTION_REFERENCE.match(answer)
+    if match:
+        reference = match.group(1)
+        index = int(reference) - 1 if reference.isdigit() else ord(reference) - ord('a')
+        if 0 <= index < len(options):
+            return index
+    # Options are often written as "A) Velocity"; match on the text after the label.
+    stripped = [re.sub(r'^[(\[]?[a-z\d][)\].:]\s*', '', option) for option in normalized]
+    if answer in stripped:
+        return stripped.index(answer)
+    return None
+
+
+def _truth_value(text: str) -> Optional[bool]:
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    return None
+
+
+def is_multiple_choice(question_type: Optional[str], options: Optional[List[str]]) -> bool:
+    return bool(options) and normalize(question_type or 'mcq') in ('mcq', 'multiple choice', 'multiple_choice')
+
+
+def is_true_false(question_type: Optional[str]) -> bool:
+    return normalize(question_type or '').replace(' ', '').replace('_', '').replace('/', '') in ('truefalse', 'tf', 'boolean')
+
+
+def grade_answer(answer: str, question_type: Optional[str], correct_answer: Optional[str],
+                 options: Optional[List[str]] = None) -> Optional[bool]:
+    """True/False when the answer can be graded locally, None when it needs the LLM."""
+    if not correct_answer:
+        return None
+    answer = normalize(answer)
+    correct = normalize(correct_answer)
+    if not answer:
+        return None
+
+    if is_multiple_choice(question_type, options):
+        chosen = _option_index(answer, options)
+        expected = _option_index(correct, options)
+        if chosen is None or expected is None:
+            return None
+        return chosen == expected
+
+    if is_true_false(question_type):
+        chosen, expected = _truth_value(answer), _truth_value(correct)
+        if chosen is None or expected is None:
+            return None
+        return chosen == expected
+
+    # Free-form: an exact match is certainly right; anything else needs judgement.
+    return True if answer == correct else None
+
+
+def local_feedback(is_correct: bool, correct_answer: str) -> str:
+    if is_correct:
+        return f"Correct! The answer is {correct_answer}."
+    return f"Not quite. The correct answer is {correct_answer}."
@@ -15,6 +15,8 @@ from .flashcard_agent import handle_flashcard
 from .cheatsheet_agent import handle_cheatsheet
 from .mermaid_agent import handle_mermaid
 from .config_agent import handle_config
+from .batch_flashcard_agent import handle_batch_flashcard
+from .batch_question_agent import handle_batch_question
 
 __all__ = [
     'handle_exploration',
@@ -28,5 +30,7 @@ __all__ = [
     'handle_flashcard',
     'handle_cheatsheet',
     'handle_mermaid',
-    'handle_config'
+    'handle_config',
+    'handle_batch_flashcard',
+    'handle_batch_question'
 ] 
\ No newline at end of file
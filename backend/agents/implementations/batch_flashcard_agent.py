@@ -0,0 +1,29 @@
+"""Batch Flashcard Agent Implementation"""
+
+from typing import Any
+from ..agent_types import BatchFlashcardAgentInput, BatchFlashcardAgentOutput
+from ..agent_instructions import BATCH_FLASHCARD_AGENT_INSTRUCTIONS
+
+def handle_batch_flashcard(
+    model: Any,
+    input_data: BatchFlashcardAgentInput,
+    call_agent: callable
+) -> BatchFlashcardAgentOutput:
+    """Handle flashcard generation for several subtopics in one call."""
+
+    result = call_agent(
+        BATCH_FLASHCARD_AGENT_INSTRUCTIONS,
+        input_data
+    )
+
+    flashcards = result.get('flashcards')
+    if not isinstance(flashcards, dict):
+        flashcards = {}
+
+    return BatchFlashcardAgentOutput(
+        flashcards={
+            subtopic: flashcards[subtopic]
+            for subtopic in input_data.subtopics
+            if isinstance(flashcards.get(subtopic), str)
+        }
+    )
@@ -0,0 +1,34 @@
+"""Batch Question Agent Implementation"""
+
+from typing import Any
+from ..agent_types import BatchQuestionAgentInput, BatchQuestionAgentOutput, QuestionAgentOutput
+from ..agent_instructions import BATCH_QUESTION_AGENT_INSTRUCTIONS
+
+def handle_batch_question(
+    model: Any,
+    input_data: BatchQuestionAgentInput,
+    call_agent: callable
+) -> BatchQuestionAgentOutput:
+    """Handle question generation for several subtopics in one call."""
+
+    result = call_agent(
+        BATCH_QUESTION_AGENT_INSTRUCTIONS,
+        input_data
+    )
+
+    questions = result.get('questions')
+    if not isinstance(questions, dict):
+        questions = {}
+
+    return BatchQuestionAgentOutput(
+        questions={
+            subtopic: QuestionAgentOutput(
+                question=questions[subtopic].get('question', 'What do you know about this topic?'),
+                type=questions[subtopic].get('type', 'MCQ'),
+                options=questions[subtopic].get('options', []),
+                correct_answer=questions[subtopic].get('correct_answer', '')
+            )
+            for subtopic in input_data.subtopics
+            if isinstance(questions.get(subtopic), dict)
+        }
+    )
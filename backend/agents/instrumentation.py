@@ -0,0 +1,132 @@
+"""Per-agent-call metrics, tracing and opt-in verbose logging.
+
+Every agent hop produces one AgentCallRecord. It is exported as Prometheus
+metrics when prometheus_client is installed, and as an OpenTelemetry span
+when opentelemetry is installed. Both are optional, and without them the
+records are simply dropped. Set AGENT_VERBOSE_LOGGING=1 to also print each
+call's input and raw response; this is off by default because serializing
+them is costly on the hot path.
+
+Operational messages (retries, per-page extraction errors and the like) go
+through `logging`, to children of the 'mindflow' logger configured here,
+at the level given by LOG_LEVEL (default INFO).
+"""
+
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+except ImportError:
+    Counter = Histogram = None
+
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer('mindflow.agents')
+except ImportError:
+    _tracer = None
+
+VERBOSE = os.getenv('AGENT_VERBOSE_LOGGING', '').lower() in ('1', 'true', 'yes')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+logger = logging.getLogger('mindflow')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+
+_AGENT_NAME = re.compile(r"You are MindFlow's ([^.]+?)(?: Agent)?\.")
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+if Counter is not None:
+    AGENT_CALLS = Counter('mindflow_agent_calls_total', 'Agent calls by outcome', ['agent', 'outcome'])
+    AGENT_LATENCY = Histogram('mindflow_agent_latency_seconds', 'End-to-end agent call latency', ['agent'], buckets=_LATENCY_BUCKETS)
+    AGENT_QUEUE_WAIT = Histogram('mindflow_agent_queue_wait_seconds', 'Time spent waiting for the LLM client', ['agent'], buckets=_LATENCY_BUCKETS)
+    AGENT_TTFT = Histogram('mindflow_agent_time_to_first_token_seconds', 'Time until the first response chunk', ['agent'], buckets=_LATENCY_BUCKETS)
+    AGENT_PROMPT_TOKENS = Counter('mindflow_agent_prompt_tokens_total', 'Prompt tokens sent', ['agent'])
+    AGENT_RESPONSE_TOKENS = Counter('mindflow_agent_response_tokens_total', 'Response tokens received', ['agent'])
+    AGENT_CACHE_HITS = Counter('mindflow_agent_cache_hits_total', 'Agent outputs served from a cache', ['agent', 'cache'])
+
+
+def agent_name(instructions: str, input_data: Any = None) -> str:
+    """Short agent label taken from the instructions' first line."""
+    match = _AGENT_NAME.search(instructions[:200])
+    if match:
+        return match.group(1).lower().replace(' ', '_')
+    return type(input_data).__name__ if input_data is not None else 'unknown'
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class AgentCallRecord:
+    agent: str
+    started: float = field(default_factory=time.perf_counter)
+    queue_wait: float = 0.0
+    time_to_first_token: Optional[float] = None
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    response_tokens: int = 0
+    outcome: str = 'ok'
+    attempts: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'agent': self.agent,
+            'queue_wait': round(self.queue_wait, 4),
+            'time_to_first_token': round(self.time_to_first_token, 4) if self.time_to_first_token is not None else None,
+            'latency': round(self.latency, 4),
+            'prompt_tokens': self.prompt_tokens,
+            'response_tokens': self.response_tokens,
+            'outcome': self.outcome,
+            'attempts': self.attempts
+        }
+
+
+def record_agent_call(record: AgentCallRecord) -> None:
+    """Export a finished agent call."""
+    record.latency = time.perf_counter() - record.started
+    if Counter is not None:
+        AGENT_CALLS.labels(record.agent, record.outcome).inc()
+        AGENT_LATENCY.labels(record.agent).observe(record.latency)
+        AGENT_QUEUE_WAIT.labels(record.agent).observe(record.queue_wait)
+        if record.time_to_first_token is not None:
+            AGENT_TTFT.labels(record.agent).observe(record.time_to_first_token)
+        AGENT_PROMPT_TOKENS.labels(record.agent).inc(record.prompt_tokens)
+        AGENT_RESPONSE_TOKENS.labels(record.agent).inc(record.response_tokens)
+    if VERBOSE:
+        logger.info('Agent call: %s', record.to_dict())
+
+
+def record_cache_hit(agent: str, cache: str) -> None:
+    """Count an agent output that was served without calling the model."""
+    if Counter is not None:
+        AGENT_CACHE_HITS.labels(agent, cache).inc()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """OpenTelemetry span when tracing is available, otherwise a no-op."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name) as current:
+        for key, value in attributes.items():
+            if value is not None:
+                current.set_attribute(key, value)
+        yield current
+
+
+def metrics_response():
+    """(body, content type) for a Prometheus scrape, or None without prometheus_client."""
+    if Counter is None:
+        return None
+    return generate_latest(), CONTENT_TYPE_LATEST
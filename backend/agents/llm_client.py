@@ -0,0 +1,283 @@
+"""Central client that every Gemini call goes through.
+
+It admits calls in priority order under a token-bucket rate limit and a
+concurrency cap, retries transient failures with exponential backoff and
+jitter, and trips a circuit breaker when the API keeps failing so callers
+fail fast instead of piling onto an exhausted quota. Calls made with a
+`key` are coalesced: concurrent identical requests share one API call (see
+single_flight.py).
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+from .single_flight import SingleFlight
+
+logger = logging.getLogger('mindflow.llm')
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+    BACKGROUND = 2
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is rejecting calls."""
+
+
+@dataclass
+class CallStats:
+    """Filled in by LLMClient.call for callers that want to report on it."""
+    queue_wait: float = 0.0
+    attempts: int = 0
+    coalesced: bool = False
+
+
+_current_priority = contextvars.ContextVar('llm_priority', default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def priority_scope(priority: Priority):
+    """Run LLM calls made inside the block at the given priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+RETRYABLE_MARKERS = ('429', '500', '502', '503', '504', 'quota', 'rate limit', 'resource exhausted', 'unavailable', 'deadline', 'timed out', 'timeout')
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an API error is transient and worth retrying."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own, callers hold a lock."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self) -> float:
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single probe through after a cool-down."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self.probing):
+                raise CircuitOpenError('LLM circuit breaker is open; the API is failing, try again shortly')
+            if state == 'half-open':
+                self.probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Rate-limited, prioritised and retrying gateway to the Gemini API."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        burst: int = 10,
+        max_concurrency: int = 8,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self.flights = SingleFlight()
+
+    @classmethod
+    def from_env(cls) -> 'LLMClient':
+        """Build a client configured from LLM_* environment variables."""
+        return cls(
+            requests_per_minute=float(os.getenv('LLM_REQUESTS_PER_MINUTE', 60)),
+            burst=int(os.getenv('LLM_BURST', 10)),
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 8)),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', 4))
+        )
+
+    def _acquire(self, priority: Priority) -> None:
+        entry = (int(priority), next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    if self._waiting[0] == entry and self._active < self.max_concurrency:
+                        wait = self._bucket.time_until_available()
+                        if wait == 0:
+                            self._bucket.take()
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+            self._active += 1
+
+    def _release(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn: Callable[[], Any], priority: Optional[Priority] = None, stats: Optional[CallStats] = None, key: Optional[str] = None) -> Any:
+        """Run `fn` (a single API request) under the client's limits.
+
+        With a `key` (see request_key), callers that arrive while an identical
+        request is in flight wait for it instead of calling the API again.
+        """
+        priority = _current_priority.get() if priority is None else priority
+        if key is None:
+            return self._call(fn, priority, stats)
+        result, shared = self.flights.do(key, lambda: self._call(fn, priority, stats))
+        if shared and stats is not None:
+            stats.coalesced = True
+        return result
+
+    async def call_async(self, fn: Callable[[], Any], priority: Optional[Priority] = None, stats: Optional[CallStats] = None, key: Optional[str] = None) -> Any:
+        """`call` for coroutines: the blocking request runs in a thread, and followers of a coalesced key wait without one."""
+        priority = _current_priority.get() if priority is None else priority
+        if key is None:
+            return await asyncio.to_thread(self._call, fn, priority, stats)
+        result, shared = await self.flights.do_async(key, lambda: asyncio.to_thread(self._call, fn, priority, stats))
+        if shared and stats is not None:
+            stats.coalesced = True
+        return result
+
+    def _call(self, fn: Callable[[], Any], priority: Priority, stats: Optional[CallStats]) -> Any:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            queued_at = time.perf_counter()
+            self._acquire(priority)
+            if stats is not None:
+                stats.queue_wait += time.perf_counter() - queued_at
+                stats.attempts += 1
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    # The API answered, it just rejected this request.
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning('LLM call failed (%s); retrying in %.2fs', e, delay)
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                self._release()
+            time.sleep(delay)
+            attempt += 1
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient.from_env()
+        return _client
+
+
+_models: Dict[Tuple[str, str], Any] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_name: str = 'gemini-pro', **model_kwargs) -> Any:
+    """Return a long-lived GenerativeModel for this name and configuration."""
+    key = (model_name, repr(sorted(model_kwargs.items())))
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name, **model_kwargs)
+            _models[key] = model
+        return model
@@ -0,0 +1,160 @@
+"""Background prefetching of likely follow-up agent outputs."""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .llm_client import Priority, priority_scope
+
+
+@dataclass
+class PrefetchSession:
+    topic: str
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    futures: Dict[Tuple[str, str], Future] = field(default_factory=dict)
+    contexts: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    call_times: List[float] = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class PrefetchScheduler:
+    """Runs prefetch tasks in the background and caches their results per session.
+
+    Results are keyed by (kind, subtopic) inside a session and remember the
+    context summary they were generated from. A result is only handed out
+    while that context is still the start of the current one, i.e. the
+    session history has grown but not been reset or rewritten. Scheduling
+    for a different topic cancels whatever is still pending for the old one,
+    and each session may only start `session_budget` prefetch calls per
+    `budget_window`. Sessions idle for `session_ttl` seconds are dropped, and
+    at most `max_sessions` are kept.
+    """
+
+    def __init__(self, max_workers: int = 2, max_subtopics: int = 3, session_budget: int = 12, budget_window: float = 3600.0, session_ttl: float = 3600.0, max_sessions: int = 1024):
+        self.max_subtopics = max_subtopics
+        self.session_budget = session_budget
+        self.budget_window = budget_window
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._sessions: 'OrderedDict[str, PrefetchSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id: str) -> Optional[PrefetchSession]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.session_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self._cancel(session)
+
+    def _session_for_topic(self, session_id: str, topic: str) -> PrefetchSession:
+        session = self._get(session_id)
+        if session is None or session.topic != topic:
+            if session is not None:
+                self._cancel(session)
+            session = PrefetchSession(topic=topic, call_times=session.call_times if session else [])
+            self._sessions[session_id] = session
+            self._evict()
+        return session
+
+    @staticmethod
+    def _cancel(session: PrefetchSession) -> None:
+        session.cancelled.set()
+        for future in session.futures.values():
+            future.cancel()
+
+    def _take_budget(self, session: PrefetchSession) -> bool:
+        now = time.monotonic()
+        session.call_times[:] = [t for t in session.call_times if now - t < self.budget_window]
+        if len(session.call_times) >= self.session_budget:
+            return False
+        session.call_times.append(now)
+        return True
+
+    def schedule(self, session_id: str, topic: str, subtopics: List[str], tasks: Dict[str, Callable[[str], Any]], context: str = '') -> int:
+        """Schedule every task for the first `max_subtopics` subtopics; returns how many were queued.
+
+        `context` is the input the tasks were built from (the context summary).
+        """
+        queued = 0
+        with self._lock:
+            session = self._session_for_topic(session_id, topic)
+            for subtopic in subtopics[:self.max_subtopics]:
+                for kind, task in tasks.items():
+                    key = (kind, subtopic)
+                    if key in session.futures and session.contexts.get(key) == context:
+                        continue
+                    if not self._take_budget(session):
+                        continue
+                    if key in session.futures:
+                        session.futures[key].cancel()
+                    session.futures[key] = self._executor.submit(self._run, session, task, subtopic)
+                    session.contexts[key] = context
+                    queued += 1
+        return queued
+
+    @staticmethod
+    def _run(session: PrefetchSession, task: Callable[[str], Any], subtopic: str) -> Optional[Any]:
+        if session.cancelled.is_set():
+            return None
+        with priority_scope(Priority.BACKGROUND):
+            result = task(subtopic)
+        return None if session.cancelled.is_set() else result
+
+    def take(self, session_id: str, topic: str, kind: str, subtopic: str, context: str = '', consume: bool = False) -> Optional[Any]:
+        """Return a prefetched result if it is finished and still matches `context`.
+
+        A prefetch still in flight is cancelled rather than waited on: it runs at
+        background priority, so the caller is better off making the call itself.
+        """
+        key = (kind, subtopic)
+        with self._lock:
+            session = self._get(session_id)
+            if session is None or session.topic != topic:
+                return None
+            future = session.futures.get(key)
+            if future is None or future.cancelled():
+                return None
+            unusable = not future.done() or not context.startswith(session.contexts.get(key, ''))
+            if consume or unusable:
+                del session.futures[key]
+                session.contexts.pop(key, None)
+            if unusable:
+                future.cancel()
+                return None
+
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Prefetch for {kind} '{subtopic}' failed: {e}")
+            return None
+
+    def retain(self, session_id: str, topic: str) -> None:
+        """Cancel a session's prefetches if the user has moved on to another topic."""
+        with self._lock:
+            session = self._get(session_id)
+            if session is not None and session.topic != topic:
+                self._cancel(session)
+                session.futures.clear()
+                session.contexts.clear()
+                session.topic = topic
+                session.cancelled = threading.Event()
+
+    def cancel(self, session_id: str) -> None:
+        """Drop everything prefetched for a session."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._cancel(session)
@@ -0,0 +1,84 @@
+"""Fast rendering of agent chat history and JSON payloads.
+
+The fixed parts of every agent call are built once: the two-turn history for
+a given instruction text and the JSON fragment holding the response-format
+fields. Agent inputs are `__slots__` dataclasses, serialized straight from
+their attributes without asdict()'s deep copy. The shared context summary is
+encoded once per distinct string and spliced into each payload that uses it,
+not re-escaped for every agent in a turn. orjson is used when installed,
+with the standard json module as the fallback.
+"""
+
+import json
+from dataclasses import fields
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ACKNOWLEDGEMENT = 'I understand my role and instructions. Ready to process input.'
+FORMAT_FIELDS = {
+    'response_format': 'json',
+    'format_instructions': 'Return only valid JSON without any markdown formatting or additional text.'
+}
+CONTEXT_FIELD = 'latest_context_summary'
+
+
+def _default(value: Any) -> Any:
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(value: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string, keeping non-ASCII characters as-is."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(value, default=_default, ensure_ascii=False,
+                      indent=2 if indent else None, separators=None if indent else (',', ':'))
+
+
+_FORMAT_FRAGMENT = dumps(FORMAT_FIELDS)[1:-1]
+
+
+@lru_cache(maxsize=None)
+def field_names(cls: type) -> Tuple[str, ...]:
+    return tuple(field.name for field in fields(cls))
+
+
+def shallow_dict(input_data: Any) -> Dict[str, Any]:
+    """Field name -> value without copying the values."""
+    return {name: getattr(input_data, name) for name in field_names(type(input_data))}
+
+
+@lru_cache(maxsize=64)
+def chat_history(instructions: str) -> Tuple[Dict[str, Any], ...]:
+    """The instruction turn and the model's acknowledgement, built once per instruction text."""
+    return (
+        {'role': 'user', 'parts': [{'text': instructions}]},
+        {'role': 'model', 'parts': [{'text': ACKNOWLEDGEMENT}]}
+    )
+
+
+@lru_cache(maxsize=32)
+def _encoded_context(summary: str) -> str:
+    return dumps(summary)
+
+
+def render_payload(input_data: Any) -> str:
+    """JSON payload for an agent call: the input's fields plus the response-format fields."""
+    if isinstance(input_data, dict):
+        return dumps({**input_data, **FORMAT_FIELDS})
+
+    values = shallow_dict(input_data)
+    parts: List[str] = []
+    summary = values.pop(CONTEXT_FIELD, None)
+    if summary is not None:
+        parts.append(f'"{CONTEXT_FIELD}":{_encoded_context(summary)}')
+    if values:
+        parts.append(dumps(values)[1:-1])
+    parts.append(_FORMAT_FRAGMENT)
+    return '{' + ','.join(parts) + '}'
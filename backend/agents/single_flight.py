@@ -0,0 +1,84 @@
+"""Coalescing of identical in-flight LLM requests.
+
+When a class opens the same module together, dozens of identical prompts
+arrive before the first one has been answered. SingleFlight lets the first
+caller for a key (the leader) make the request. Every caller that arrives
+with the same key while it is in flight waits on the leader's future and
+gets the same result or exception. Threads and coroutines share one table,
+so an async caller can wait on a threaded leader's request and vice versa.
+Nothing is kept once the leader finishes; this is not a cache.
+"""
+
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+def request_key(*parts: str) -> str:
+    """Canonical key for a request: a hash of its instructions/model and rendered input."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its outcome with concurrent callers."""
+
+    def __init__(self):
+        self._flights: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._flights[key] = Future()
+            return future, True
+
+    def _land(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); `shared` is True when another caller's request produced it."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._land(key, future)
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Coroutine version of `do`; followers await the leader without holding a thread."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future), True
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._land(key, future)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,53 @@
+import pytest
+
+from agents.agent_service import AgentService
+from agents.agent_types import LearningState
+from agents.answer_grading import grade_answer, normalize
+
+OPTIONS = ['A) Speed', 'B) Velocity', 'C) Mass', 'D) Time']
+
+
+@pytest.mark.parametrize('answer', ['B) Velocity', 'velocity', 'b', '(B)', 'option b', '2', '  Velocity. '])
+def test_mcq_accepts_the_option_text_letter_or_number(answer):
+    assert grade_answer(answer, 'MCQ', 'B) Velocity', OPTIONS) is True
+
+
+def test_mcq_wrong_option_is_graded_false_and_unknown_text_needs_the_model():
+    assert grade_answer('c', 'MCQ', 'Velocity', OPTIONS) is False
+    assert grade_answer('the one with direction', 'MCQ', 'Velocity', OPTIONS) is None
+    assert grade_answer('e', 'MCQ', 'Velocity', OPTIONS) is None
+
+
+@pytest.mark.parametrize('answer, expected', [('yes', True), ('T', True), ('false', False), ('maybe', None)])
+def test_true_false_spellings(answer, expected):
+    assert grade_answer(answer, 'True/False', 'True') is expected
+
+
+def test_free_form_only_certain_on_an_exact_match():
+    assert grade_answer('Newton', 'short answer', 'newton.') is True
+    assert grade_answer('kg m/s^2', 'short answer', 'newton') is None
+    assert grade_answer('anything', 'short answer', None) is None
+    assert grade_answer('   ', 'MCQ', 'Velocity', OPTIONS) is None
+
+
+def test_normalize_folds_case_space_and_edge_punctuation():
+    assert normalize('  Hello,\n  World! ') == 'hello, world'
+
+
+def _service(**state):
+    service = AgentService.__new__(AgentService)
+    service.learning_state = LearningState('Forces', 'Vectors', [], {}, [], **state)
+    return service
+
+
+def test_grade_answer_locally_uses_the_pending_question():
+    service = _service(last_question_type='MCQ', last_question_options=OPTIONS, last_correct_answer='B) Velocity')
+    result = service._grade_answer_locally('b')
+    assert result.is_correct is True
+    assert 'B) Velocity' in result.feedback
+    assert service._grade_answer_locally('a').is_correct is False
+
+
+def test_grade_answer_locally_defers_when_it_cannot_be_sure():
+    assert _service(last_question_type='short answer', last_correct_answer='inertia')._grade_answer_locally('resistance to change') is None
+    assert _service()._grade_answer_locally('b') is None
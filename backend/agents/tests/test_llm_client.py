@@ -0,0 +1,88 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agents import llm_client
+from agents.llm_client import CircuitBreaker, CircuitOpenError, LLMClient, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_client, 'time', SimpleNamespace(monotonic=clock.monotonic, perf_counter=time.perf_counter, sleep=lambda seconds: None))
+    return clock
+
+
+def test_token_bucket_spends_its_burst_then_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate_per_second=2, capacity=3)
+    for _ in range(3):
+        assert bucket.time_until_available() == 0
+        bucket.take()
+    assert bucket.time_until_available() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.time_until_available() == 0
+
+
+def test_token_bucket_never_exceeds_capacity(clock):
+    bucket = TokenBucket(rate_per_second=10, capacity=2)
+    clock.now += 60
+    bucket.take()
+    bucket.take()
+    assert bucket.time_until_available() > 0
+
+
+def test_circuit_opens_after_consecutive_failures_and_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 30
+    assert breaker.state == 'half-open'
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+
+def test_call_retries_transient_errors_only(clock):
+    client = LLMClient(max_retries=2, failure_threshold=10)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError('reset')
+        return 'ok'
+
+    assert client.call(flaky) == 'ok'
+    assert len(attempts) == 3
+
+    def rejected():
+        raise ValueError('400 invalid argument')
+
+    with pytest.raises(ValueError):
+        client.call(rejected)
+    assert client.breaker.failures == 0
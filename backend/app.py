@@ -1,63 +1,72 @@
 import os
+from dotenv import load_dotenv
+
+# Before the package imports below: they read their settings from the
+# environment when imported, and preload_models() runs at import too.
+load_dotenv()
+
 import json
 import requests
-from dotenv import load_dotenv
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Response, request, send_file, jsonify
 from flask_cors import CORS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.document_loaders import PyPDFLoader
-from werkzeug.utils import secure_filename
-import kokoro
-from kokoro import KPipeline
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
 from IPython.display import display, Audio
 import soundfile as sf
 import numpy as np
 import re
-import pdfplumber
 import google.generativeai as genai
-import torch
 import io
+import logging
+import threading
+import time
 import os
 from langchain.vectorstores import FAISS
-from langchain_core.embeddings import Embeddings
 from typing import List
 from datetime import datetime
-from agents import AgentService, SafetyStatus
-
-pipeline = KPipeline(lang_code='a')
+from agents import AgentService, SafetyStatus, Priority, get_llm_client, get_model, metrics_response, priority_scope, record_cache_hit, request_key
+from ingestion import DEFAULT_TIMEOUT, PageCache, PdfExtractor, DiskBackedRequest, cleanup_request_files, get_http_session, receive_upload
+from storage import ChatHistoryStore, JobStore
+from jobs import JobFailed, JobManager, JobProgress, JobQueueFull
+from rag import AnswerCache, DocumentStore, GeminiEmbeddings, HybridRetriever, IndexConfig, QuestionBanks, chunk_pages, document_id_for, precompute_document
+from speech import (
+    KOKORO_VOICE,
+    StreamingEncoder,
+    get_tts_pipeline,
+    get_whisper_model,
+    loaded_models,
+    memory_usage,
+    negotiate_format,
+    parse_sample_rate,
+    preload_models,
+    transcribe_audio
+)
+
+# Load (and warm) the speech models at import, so a Gunicorn master with
+# preload_app shares them with its workers; see gunicorn.conf.py.
+preload_models()
 
 
-load_dotenv()
 app = Flask(__name__)
-
-class GeminiEmbeddings(Embeddings):
-    def __init__(self):
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-pro')
-        
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of documents."""
-        embeddings = []
-        for text in texts:
-            prompt = f"Convert this text into a numerical embedding representation (return only the numbers, comma-separated): {text}"
-            response = self.model.generate_content(prompt)
-            try:
-                numbers = [float(num) for num in response.text.strip('[]').split(',')]
-                while len(numbers) < 512:  
-                    numbers.append(0.0)
-                embeddings.append(numbers[:512]) 
-            except Exception as e:
-                print(f"Error creating embedding: {e}")
-                embeddings.append(np.random.rand(512).tolist())
-        return embeddings
-
-    def embed_query(self, text: str) -> List[float]:
-        """Generate embedding for a single piece of text."""
-        return self.embed_documents([text])[0]
-
-chat_history = []
-vector_store = None
+logger = logging.getLogger('mindflow.app')
+app.request_class = DiskBackedRequest
+app.teardown_request(cleanup_request_files)
+llm_client = get_llm_client()
+
+CHAT_HISTORY_DIR = os.getenv('CHAT_HISTORY_DIR', 'chat_history/')
+chat_history = ChatHistoryStore(CHAT_HISTORY_DIR)
+JOB_STORE_DIR = os.getenv('JOB_STORE_DIR', 'job_results/')
+job_manager = JobManager(JobStore(JOB_STORE_DIR))
+# Each event stream holds a worker thread; past this many per process, clients poll /jobs/<id>.
+JOB_EVENT_STREAMS = int(os.getenv('JOB_EVENT_STREAMS', 2))
+JOB_EVENT_STREAM_SECONDS = float(os.getenv('JOB_EVENT_STREAM_SECONDS', 120))
+job_event_slots = threading.BoundedSemaphore(JOB_EVENT_STREAMS)
+document_store = DocumentStore()
+question_banks = QuestionBanks(document_store)
+retriever = None
+EXPLAIN_MORE_K = int(os.getenv('EXPLAIN_MORE_K', 2))
+RAG_INDEX_CONFIG = IndexConfig.from_env()
+RAG_CHUNK_TOKENS = int(os.getenv('RAG_CHUNK_TOKENS', 256))
+answer_cache = AnswerCache(document_store)
 try:
     embeddings = GeminiEmbeddings()
 except Exception as e:
@@ -75,57 +84,54 @@ CORS(app, resources={
 
 agent_service = AgentService(api_key=os.environ.get('GEMINI_API_KEY'))
 
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return jsonify({'error': 'Uploaded file is too large'}), 413
+
 DOWNLOADS_DIR = "downloads/"
 os.makedirs(DOWNLOADS_DIR, exist_ok=True)
 
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+MAX_PDF_UPLOAD_BYTES = int(os.getenv('MAX_PDF_UPLOAD_BYTES', 50 * 1024 * 1024))
+MAX_AUDIO_UPLOAD_BYTES = int(os.getenv('MAX_AUDIO_UPLOAD_BYTES', 25 * 1024 * 1024))
+
+PAGE_CACHE_DIR = os.getenv('PAGE_CACHE_DIR', 'page_cache/')
+pdf_extractor = PdfExtractor(cache=PageCache(PAGE_CACHE_DIR))
 
 
 def download_file(file_url):
-    print(file_url)
-    print(file_url.split("/"))
+    logger.debug('Downloading %s', file_url)
     local_filename = DOWNLOADS_DIR + file_url.split("/")[-2] + ".pdf"
 
     try:
-        response = requests.get(file_url, stream=True)
-        response.raise_for_status()
+        with get_http_session().get(file_url, stream=True, timeout=DEFAULT_TIMEOUT) as response:
+            response.raise_for_status()
 
-        with open(local_filename, "wb") as file:
-            for chunk in response.iter_content(chunk_size=8192):
-                file.write(chunk)
+            with open(local_filename, "wb") as file:
+                for chunk in response.iter_content(chunk_size=65536):
+                    file.write(chunk)
 
         return local_filename
     except requests.exceptions.RequestException as e:
-        print(f"Error downloading file: {e}")
+        logger.warning('Error downloading %s: %s', file_url, e)
         return None
 
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file."""
-    loader = PyPDFLoader(pdf_path)
-    pages = loader.load()
-    text = "\n".join([page.page_content for page in pages])
-    return text
-
-
 def process_with_gemini(text):
     """Generate a structured learning plan using Gemini (strictly 200 words)."""
-    model = genai.GenerativeModel("gemini-pro")
+    model = get_model("gemini-pro")
     prompt = f"Create an interactive learning module from this content. Use LaTeX for mathematical expressions and wrap them in single or double dollar signs if required. Use markdown for other content:\n\n{text}"
     
     try:
-        response = model.generate_content(prompt)
+        response = llm_client.call(lambda: model.generate_content(prompt), Priority.BULK, key=request_key('gemini-pro', prompt))
         return response.text
 
     except Exception as e:
         print(f"Error processing with Gemini: {e}")
         return None
 
-def split_text_for_rag(text):
-    """Split the text into smaller chunks for RAG processing."""
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    return text_splitter.split_text(text)
+def split_text_for_rag(text, pages=None):
+    """Split the text (or (page_number, text) pairs) into token-sized chunks for RAG processing."""
+    return chunk_pages(pages if pages is not None else [(1, text)], max_tokens=RAG_CHUNK_TOKENS)
 
 @app.route('/process-interaction', methods=['POST'])
 def process_interaction():
@@ -143,7 +149,11 @@ def process_interaction():
         active_subtopic = data.get('active_subtopic')
         session_history = data.get('session_history')
 
-        response = agent_service.start_new_topic(user_input, current_topic=current_topic, active_subtopic=active_subtopic, session_history=session_history)
+        session_id = data.get('session_id', 'default')
+        # Quiz answers are graded locally when possible; ask for model-written feedback explicitly.
+        detailed_feedback = bool(data.get('detailed_feedback', False))
+
+        response = agent_service.start_new_topic(user_input, current_topic=current_topic, active_subtopic=active_subtopic, session_history=session_history, session_id=session_id, detailed_feedback=detailed_feedback)
 
         response_dict = response.to_dict()
 
@@ -155,36 +165,31 @@ def process_interaction():
             'error': str(e)
         }), 500
 
-def generate_audio(text):
-    generator = pipeline(
-        text, voice='af_heart', # <= change voice here
+def generate_audio(text, encoder):
+    """Synthesize text, handing each chunk to the encoder as soon as Kokoro yields it."""
+    generator = get_tts_pipeline()(
+        text, voice=KOKORO_VOICE,
         speed=1
     )
-    all_audio = []
-    for i, (gs, ps, audio) in enumerate(generator):
-        print(i)
-        print(gs)
-        print(ps)
-        all_audio.append(audio)
-    final_audio = np.concatenate(all_audio)
-    return final_audio
+    try:
+        for _, _, audio in generator:
+            encoder.write(audio)
+    except BaseException:
+        encoder.close()
+        raise
+    return encoder.finish()
 
 @app.route("/process-text2speech", methods=["POST"])
 def process_text2speech():
     text = ""
+    request.max_content_length = MAX_PDF_UPLOAD_BYTES
 
     if "pdf" in request.files:
-        file = request.files["pdf"]
-        if file.filename == "":
+        try:
+            with receive_upload("pdf", MAX_PDF_UPLOAD_BYTES) as upload:
+                text = pdf_extractor.extract_text(upload.path, separator=" ")
+        except BadRequest:
             return jsonify({"error": "No selected file"}), 400
-
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-
-        text = ""
-        with pdfplumber.open(file) as pdf:
-            text = " ".join(page.extract_text() for page in pdf.pages)
         print(text)
         text = re.sub(r"(\w+)\s*\n\s*(\w+)", r"\1 \2", text)
         print(text)
@@ -195,12 +200,18 @@ def process_text2speech():
     if not text:
         return jsonify({"error": "No text provided"}), 400
 
-    audio = generate_audio(text)
+    try:
+        audio_format = negotiate_format(request.values.get("format"), request.accept_mimetypes)
+        sample_rate = parse_sample_rate(request.values.get("sample_rate"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    audio = generate_audio(text, StreamingEncoder(audio_format, sample_rate))
 
-    wav_file = io.BytesIO()
-    sf.write(wav_file, audio, 24000, format='WAV')
-    wav_file.seek(0)
-    return send_file(wav_file, mimetype='audio/wav', as_attachment=False)
+    response = send_file(io.BytesIO(audio), mimetype=audio_format.mimetype, as_attachment=False,
+                         download_name=f"speech.{audio_format.extension}")
+    response.headers["Vary"] = "Accept"
+    return response
 
 
 def is_valid_pdf(file_url):
@@ -209,80 +220,196 @@ def is_valid_pdf(file_url):
         if 'ucarecdn.com' in file_url:
             return True
             
-        response = requests.get(file_url, stream=True)
-        response.raise_for_status()
+        # Only the first bytes are needed; a fully read ranged body lets the
+        # pooled connection go back to the pool instead of being dropped.
+        with get_http_session().get(file_url, stream=True, timeout=DEFAULT_TIMEOUT, headers={'Range': 'bytes=0-3'}) as response:
+            response.raise_for_status()
 
-        content_type = response.headers.get('content-type', '').lower()
-        if 'application/pdf' in content_type:
-            return True
+            content_type = response.headers.get('content-type', '').lower()
+            if 'application/pdf' in content_type:
+                return True
 
-        magic_numbers = response.raw.read(4)
-        return magic_numbers.startswith(b'%PDF')
+            magic_numbers = response.raw.read(4)
+            return magic_numbers.startswith(b'%PDF')
     except Exception as e:
         print(f"Error validating PDF: {e}")
         return False
 
-@app.route('/process-content', methods=['POST'])
-def process_content():
-    """Process uploaded content."""
-    try:
-        data = request.json
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        print("Received data:", data)  
-        
-        notes = data.get('notes', '')
-        files = data.get('files', [])
+CONTENT_STAGES = ['validate', 'download', 'extract', 'summarize']
+# How long /process-content waits for its job before answering 202 with where to follow it.
+CONTENT_SYNC_TIMEOUT = float(os.getenv('CONTENT_SYNC_TIMEOUT', 300))
 
-        processed_files = []
-        all_text = []
 
-        if notes.strip():
-            all_text.append(notes)
+def precompute_stage(document_id, pages, progress):
+    """Build the document's retrieval index, section summaries and seed questions unless they already exist."""
+    with progress.stage('precompute'):
+        if document_store.exists(document_id):
+            progress.update('precompute', 1.0, 'Already precomputed')
+            return
+        precompute_document(document_store, document_id, pages, embeddings, RAG_INDEX_CONFIG, RAG_CHUNK_TOKENS,
+                            report=lambda fraction, detail: progress.update('precompute', fraction, detail))
 
-        for file_url in files:
-            print(f"Processing file URL: {file_url}")  
 
-            if not file_url:
-                continue
+# Document ID -> ID of its unfinished precompute job, for jobs this process has seen.
+precompute_jobs = {}
+precompute_jobs_lock = threading.Lock()
+
+
+def _running_job_id(job_id):
+    job = job_manager.get(job_id) if job_id else None
+    return job_id if job is not None and not job.finished else None
+
 
+def schedule_precompute(document_id, pages):
+    """Queue the document's precompute job unless its artifacts exist; returns the job ID or None.
+
+    A document uploaded again while its precompute is still running gets
+    the running job's ID. Within a process the in-flight map answers that;
+    across workers the job ID is recorded in the document's state directory
+    under a lock file, and the shared job store says whether it still runs.
+    """
+    if document_store.exists(document_id):
+        return None
+    with precompute_jobs_lock:
+        job_id = _running_job_id(precompute_jobs.get(document_id))
+        if job_id:
+            return job_id
+        precompute_jobs.pop(document_id, None)
+
+    def precompute_job(progress):
+        try:
+            precompute_stage(document_id, pages, progress)
+        finally:
+            with precompute_jobs_lock:
+                precompute_jobs.pop(document_id, None)
+        return {'document_id': document_id}
+
+    with document_store.state_lock(document_id, 'precompute'):
+        claim = document_store.read_state(document_id, 'precompute.json') or {}
+        job_id = _running_job_id(claim.get('job_id'))
+        if not job_id:
+            if document_store.exists(document_id):
+                return None
+            try:
+                job_id = job_manager.submit('precompute-document', ['precompute'], precompute_job).job_id
+            except JobQueueFull as e:
+                # Routes fall back to on-demand work until the document is precomputed.
+                print(f"Skipping document precompute: {e}")
+                return None
+            document_store.write_state(document_id, 'precompute.json', {'job_id': job_id})
+    with precompute_jobs_lock:
+        if _running_job_id(job_id):
+            precompute_jobs[document_id] = job_id
+    return job_id
+
+
+def run_content_pipeline(notes, files, progress):
+    """Validate, download, extract and summarize uploaded content, reporting each stage.
+
+    The document's artifacts are built by a separate precompute job, queued
+    at the end; its ID is returned as `precompute_job_id`.
+    """
+    files = [file_url for file_url in files if file_url]
+    all_text = []
+    pages = []
+
+    if notes.strip():
+        all_text.append(notes)
+        pages.append((1, notes))
+
+    with progress.stage('validate'):
+        for i, file_url in enumerate(files):
+            print(f"Processing file URL: {file_url}")  
             if not is_valid_pdf(file_url):
                 print(f"Invalid PDF URL: {file_url}")  
-                return jsonify({
-                    'error': f'Invalid or unsupported file format. Only PDF files are allowed.'
-                }), 400
-                
+                raise JobFailed('Invalid or unsupported file format. Only PDF files are allowed.', 400)
+            progress.update('validate', (i + 1) / len(files))
+
+    processed_files = []
+    with progress.stage('download'):
+        for i, file_url in enumerate(files):
             local_file = download_file(file_url)
             if local_file:
                 processed_files.append(local_file)
-                try:
-                    text = extract_text_from_pdf(local_file)
-                    if text:
-                        all_text.append(text)
-                except Exception as e:
-                    print(f"Error extracting text from PDF: {e}")
-                    return jsonify({
-                        'error': 'Could not extract text from PDF. Please ensure it is a valid PDF file with extractable text.'
-                    }), 400
-
-        if not all_text:
-            return jsonify({
-                'error': 'No content could be processed'
-            }), 400
+            progress.update('download', (i + 1) / len(files), f"{len(processed_files)} of {len(files)} files")
 
+    with progress.stage('extract'):
+        for i, local_file in enumerate(processed_files):
+            try:
+                file_pages = pdf_extractor.extract_pages(local_file)
+                text = "\n".join(page_text for _, page_text in file_pages if page_text)
+                if text:
+                    all_text.append(text)
+                    pages.extend((len(pages) + 1, page_text) for _, page_text in file_pages)
+            except Exception as e:
+                print(f"Error extracting text from PDF: {e}")
+                raise JobFailed('Could not extract text from PDF. Please ensure it is a valid PDF file with extractable text.', 400)
+            progress.update('extract', (i + 1) / len(processed_files))
+
+    if not all_text:
+        raise JobFailed('No content could be processed', 400)
+
+    with progress.stage('summarize'):
         combined_text = "\n\n".join(all_text)
         processed_content = process_with_gemini(combined_text)
 
-        if not processed_content:
-            return jsonify({
-                'error': 'Failed to process content with AI'
-            }), 500
+    if not processed_content:
+        raise JobFailed('Failed to process content with AI', 500)
+
+    document_id = document_id_for(combined_text)
+    return {
+        'response': processed_content,
+        'document_id': document_id,
+        'precompute_job_id': schedule_precompute(document_id, pages),
+        'status': 'success'
+    }
+
+
+def submit_content_job(data):
+    """Queue the content pipeline; returns the job, or an error response when the queue is full."""
+    try:
+        job = job_manager.submit('process-content', CONTENT_STAGES,
+                                 lambda progress: run_content_pipeline(data.get('notes', ''), data.get('files', []), progress))
+    except JobQueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '30'
+        return None, (response, 503)
+    return job, None
+
+
+def job_accepted(job):
+    """202 with where to follow a job."""
+    return jsonify({
+        **job.to_dict(include_result=False),
+        'status_url': f"/jobs/{job.job_id}",
+        'events_url': f"/jobs/{job.job_id}/events"
+    }), 202
 
-        return jsonify({
-            'response': processed_content,
-            'status': 'success'
-        })
+
+@app.route('/process-content', methods=['POST'])
+def process_content():
+    """Process uploaded content and answer with the result.
+
+    The work runs on the job pool like /process-content/jobs; this route
+    waits for it. If it takes longer than CONTENT_SYNC_TIMEOUT, the answer
+    is a 202 with the job's URLs instead.
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        print("Received data:", data)  
+
+        job, error = submit_content_job(data)
+        if error:
+            return error
+        job = job_manager.wait(job.job_id, CONTENT_SYNC_TIMEOUT)
+        if not job.finished:
+            return job_accepted(job)
+        if job.status != 'succeeded':
+            return jsonify({'error': job.error}), job.error_status or 500
+        return jsonify(job.result)
 
     except Exception as e:
         print(f"Error processing content: {e}")
@@ -290,35 +417,126 @@ def process_content():
             'error': str(e)
         }), 500
 
+@app.route('/process-content/jobs', methods=['POST'])
+def create_content_job():
+    """The asynchronous entrypoint: start processing uploaded content and return a job ID at once.
+
+    Follow the job at /jobs/<id> or /jobs/<id>/events; its result has the
+    same fields as a /process-content response.
+    """
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    job, error = submit_content_job(data)
+    return error or job_accepted(job)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, per-stage progress and, once finished, the result or error of a job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-sent events: one `progress` event per change, then a final `done` event.
+
+    Streams are capped per process and end after JOB_EVENT_STREAM_SECONDS;
+    EventSource clients reconnect on their own, others should poll /jobs/<id>.
+    """
+    if job_manager.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if not job_event_slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many open progress streams; poll /jobs/<id> instead', 'poll': f"/jobs/{job_id}"})
+        response.status_code = 429
+        response.headers['Retry-After'] = '5'
+        return response
+
+    def events():
+        deadline = time.monotonic() + JOB_EVENT_STREAM_SECONDS
+        yield "retry: 5000\n\n"
+        for job in job_manager.watch(job_id, heartbeat=min(15.0, JOB_EVENT_STREAM_SECONDS)):
+            if job is None:
+                yield ": keep-alive\n\n"
+            elif job.finished:
+                yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+            else:
+                yield f"event: progress\ndata: {json.dumps(job.to_dict(include_result=False))}\n\n"
+            if time.monotonic() > deadline:
+                return
+
+    response = Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(job_event_slots.release)
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint for agent call metrics."""
+    exported = metrics_response()
+    if exported is None:
+        return jsonify({'error': 'prometheus_client is not installed'}), 501
+    body, content_type = exported
+    return Response(body, mimetype=content_type)
+
+@app.route("/worker-memory", methods=["GET"])
+def worker_memory():
+    """Memory of the worker serving this request, with shared model pages split out."""
+    return jsonify({**memory_usage(), 'models': loaded_models()})
+
 @app.route("/get-summary", methods=["GET"])
 def get_summary():
     """Get a summary of the current learning session."""
     summary = agent_service.get_session_summary()
     return jsonify(summary.to_dict())
 
-model_path = os.path.join(app.root_path, 'model/whisper_model.pt')
-model = torch.load(model_path, weights_only=False)  
+@app.route("/generate-deck", methods=["POST"])
+def generate_deck():
+    """Generate a flashcard and question deck for many subtopics at once."""
+    try:
+        data = request.json or {}
+        broader_topic = data.get('broader_topic') or agent_service.learning_state.current_topic
+        subtopics = data.get('subtopics') or agent_service.learning_state.learning_path
+
+        if not broader_topic or not subtopics:
+            return jsonify({'error': 'A broader topic and at least one subtopic are required'}), 400
+
+        include = data.get('include', ['flashcards', 'questions'])
+        # The user is waiting on this response, so its calls are not queued behind bulk work.
+        with priority_scope(Priority.INTERACTIVE):
+            deck = agent_service.generate_deck(
+                broader_topic,
+                subtopics,
+                include_flashcards='flashcards' in include,
+                include_questions='questions' in include,
+                latest_context_summary=data.get('latest_context_summary', '')
+            )
+
+        if data.get('format') == 'csv':
+            return Response(deck.to_csv(), mimetype='text/csv')
+
+        return jsonify({
+            'deck': deck.to_dict(),
+            'status': 'success'
+        })
+
+    except Exception as e:
+        print(f"Error generating deck: {e}")
+        return jsonify({
+            'error': str(e)
+        }), 500
 
 @app.route('/speech2text', methods=['POST'])
 def transcribe():
     """Converts speech audio to text using Whisper model"""
-    temp_file = "temp_audio.wav"
-
-    if 'file' in request.files:
-        file = request.files['file']
-        file.save(temp_file)
-
-    elif request.data:
-        with open(temp_file, "wb") as f:
-            f.write(request.data)
-
-    else:
+    try:
+        with receive_upload('file', MAX_AUDIO_UPLOAD_BYTES, allow_raw_body=True, suffix='.wav') as upload:
+            vad = request.args.get('vad', '1') != '0'
+            result = transcribe_audio(get_whisper_model(), upload.path, vad=vad)
+    except BadRequest:
         return jsonify({"error": "No audio data received"}), 400
 
-    result = model.transcribe(temp_file)
-    os.remove(temp_file)  
-
-    return jsonify({"text": result["text"]})
+    return jsonify({"text": result["text"], "segments": result["segments"]})
 
 @app.route('/explain-more', methods=['POST'])
 def explain_more():
@@ -328,13 +546,42 @@ def explain_more():
         question = data.get('question')
         context = data.get('context', '')
 
-        global vector_store
-        if vector_store is None:
-            texts = split_text_for_rag(context)
-            vector_store = FAISS.from_texts(texts, embeddings)
+        k = int(data.get('k', EXPLAIN_MORE_K))
+
+        global retriever
+        # Documents ingested through /process-content have a precomputed index.
+        document_id = data.get('document_id')
+        active_retriever = document_store.retriever(document_id, embeddings) if document_id else None
+        if active_retriever is None:
+            if retriever is None:
+                chunks = split_text_for_rag(context)
+                retriever = HybridRetriever.from_texts(
+                    [chunk.text for chunk in chunks],
+                    embeddings,
+                    metadatas=[chunk.metadata() for chunk in chunks],
+                    index_config=RAG_INDEX_CONFIG
+                )
+            active_retriever = retriever
         
-        relevant_docs = vector_store.similarity_search(question, k=2)
-        relevant_context = " ".join([doc.page_content for doc in relevant_docs])
+        # Repeated questions are answered from the cache per precomputed document and
+        # retrieval depth, until the document's index is rebuilt. Ad-hoc context is not cached.
+        cache = answer_cache if document_id and active_retriever is not retriever else None
+        if cache is not None:
+            cached = cache.lookup(document_id, active_retriever.fingerprint, question, f"k={k}")
+            if cached is not None:
+                record_cache_hit('explain_more', 'answer')
+                chat_history.append(data.get('session_id', 'default'), {
+                    "question": question,
+                    "answer": cached.answer,
+                    "timestamp": datetime.now().isoformat()
+                })
+                return jsonify({
+                    'response': cached.answer,
+                    'cached': True,
+                    'status': 'success'
+                })
+
+        relevant_context = " ".join(active_retriever.retrieve(question, k))
         
         prompt = f"""Using the following context and question, provide a detailed explanation:
         
@@ -344,10 +591,12 @@ def explain_more():
         
         Provide a thorough explanation that incorporates the context and addresses the question directly."""
         
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
+        model = get_model('gemini-pro')
+        response = llm_client.call(lambda: model.generate_content(prompt), Priority.INTERACTIVE, key=request_key('gemini-pro', prompt))
+        if cache is not None:
+            cache.store(document_id, active_retriever.fingerprint, question, response.text, f"k={k}")
         
-        chat_history.append({
+        chat_history.append(data.get('session_id', 'default'), {
             "question": question,
             "answer": response.text,
             "timestamp": datetime.now().isoformat()
@@ -370,8 +619,26 @@ def interactive_questions():
     try:
         data = request.json
         context = data.get('context', '')
+
+        # Documents ingested through /process-content have a question bank; serve this user's unseen questions from it.
+        document_id = data.get('document_id')
+        user_id = data.get('user_id') or data.get('session_id', 'default')
+        banked = question_banks.serve(document_id, user_id, 3) if document_id else None
+        if banked and len(banked) == 3:
+            questions = banked
+            chat_history.append(data.get('session_id', 'default'), {
+                "type": "interactive_questions",
+                "questions": questions,
+                "timestamp": datetime.now().isoformat()
+            })
+            return jsonify({
+                'questions': questions,
+                'document_id': document_id,
+                'status': 'success'
+            })
+        banked = banked or []
         
-        prompt = f"""Based on this content, generate 3 interactive questions to test understanding. 
+        prompt = f"""Based on this content, generate {3 - len(banked)} interactive questions to test understanding. 
         Format your response as a JSON array of questions, where each question has:
         - question_text: the actual question
         - options: array of 4 possible answers
@@ -380,20 +647,24 @@ def interactive_questions():
         
         Content: {context}"""
         
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
+        model = get_model('gemini-pro')
+        response = llm_client.call(lambda: model.generate_content(prompt), Priority.INTERACTIVE, key=request_key('gemini-pro', prompt))
 
         try:
             questions = json.loads(response.text)
+            if document_id and isinstance(questions, list):
+                # Top up what the bank could serve, and bank the new questions so they are generated once.
+                question_banks.add(document_id, questions, user_id)
+                questions = banked + questions[:3 - len(banked)]
         except json.JSONDecodeError:
-            questions = [{
+            questions = banked or [{
                 "question_text": "Could not generate proper questions.",
                 "options": ["Try again", "Contact support"],
                 "correct_answer": "Try again",
                 "explanation": "There was an error processing the content."
             }]
         
-        chat_history.append({
+        chat_history.append(data.get('session_id', 'default'), {
             "type": "interactive_questions",
             "questions": questions,
             "timestamp": datetime.now().isoformat()
@@ -411,5 +682,23 @@ def interactive_questions():
         }), 500
 
 
+@app.route('/documents/<document_id>', methods=['GET'])
+def get_document(document_id):
+    """Precomputed artifacts of an ingested document: its manifest and section summaries."""
+    manifest = document_store.manifest(document_id)
+    if manifest is None:
+        return jsonify({'error': 'Unknown document or not precomputed yet'}), 404
+    return jsonify({**manifest, 'summaries': document_store.summaries(document_id)})
+
+
+@app.route('/chat-history', methods=['GET'])
+def get_chat_history():
+    """Page through a session's /explain-more and /interactive-questions history, newest first."""
+    session_id = request.args.get('session_id', 'default')
+    offset = request.args.get('offset', 0, type=int)
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify(chat_history.page(session_id, offset=offset, limit=limit))
+
+
 if __name__ == "__main__":
     app.run(debug=True)
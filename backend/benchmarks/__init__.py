@@ -0,0 +1 @@
+"""Offline benchmarks for the MindFlow backend. Run from the backend directory."""
@@ -0,0 +1,92 @@
+"""Per-request client overhead before and after sharing models and HTTP connections.
+
+Usage (from backend/):
+    python -m benchmarks.bench_clients [--iterations 200] [--url https://example.com/file.pdf]
+
+Without --url the HTTP numbers come from a local plain-HTTP server, which
+measures connection setup and client construction but not TLS; pass an
+HTTPS URL to include handshake cost.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import google.generativeai as genai
+import requests
+
+from agents import get_model
+from ingestion import get_http_session
+
+PDF_BYTES = b'%PDF-1.4\n' + b'0' * 4096
+
+
+class _PdfHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(PDF_BYTES)))
+        self.end_headers()
+        self.wfile.write(PDF_BYTES)
+
+    def log_message(self, *args):
+        pass
+
+
+def _time(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.mean(samples) * 1e6, statistics.median(samples) * 1e6
+
+
+def _report(name, before, after):
+    print(f"{name:<28} before: mean {before[0]:9.1f}us p50 {before[1]:9.1f}us | "
+          f"after: mean {after[0]:9.1f}us p50 {after[1]:9.1f}us | {before[0] / after[0]:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--url', help='Download URL to benchmark instead of the local server')
+    args = parser.parse_args()
+
+    genai.configure(api_key='benchmark')
+    _report(
+        'GenerativeModel per request',
+        _time(lambda: genai.GenerativeModel('gemini-pro'), args.iterations),
+        _time(lambda: get_model('gemini-pro'), args.iterations)
+    )
+
+    server = None
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _PdfHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}/file/'
+
+    def fresh_download():
+        requests.get(url, timeout=30).content
+
+    def pooled_download():
+        get_http_session().get(url, timeout=30).content
+
+    _report(
+        'Download per request',
+        _time(fresh_download, args.iterations),
+        _time(pooled_download, args.iterations)
+    )
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Kokoro G2P time with a cold, warm and snapshot-loaded phoneme cache.
+
+Usage (from backend/):
+    python -m benchmarks.bench_g2p [corpus.txt] [--lang a] [--repeats 3]
+
+Without a corpus a built-in set of course-style sentences is used. The
+corpus is phonemized `--repeats` times, the way repeated lectures and
+flashcards are read aloud. The report covers:
+- no cache
+- a cold cache (first pass)
+- a warm cache (later passes)
+- a fresh process-style cache loaded from the on-disk snapshot
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from speech.g2p_cache import CachedG2P, G2PCache
+
+SAMPLE_CORPUS = """Newton's second law states that force equals mass times acceleration.
+The derivative of x squared is two x. Momentum is conserved in a closed system.
+A vector has both magnitude and direction. Kinetic energy is one half m v squared.
+Photosynthesis converts light energy into chemical energy. The mitochondria is the powerhouse of the cell.
+"""
+
+
+def _time(g2p, paragraphs):
+    start = time.perf_counter()
+    for paragraph in paragraphs:
+        g2p(paragraph)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', nargs='?')
+    parser.add_argument('--lang', default='a')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    text = SAMPLE_CORPUS
+    if args.corpus:
+        with open(args.corpus, 'r', encoding='utf-8') as f:
+            text = f.read()
+    paragraphs = [line for line in text.splitlines() if line.strip()]
+
+    from kokoro import KPipeline
+    # model=False builds only the text frontend.
+    g2p = KPipeline(lang_code=args.lang, model=False).g2p
+    g2p(paragraphs[0])
+
+    snapshot = os.path.join(tempfile.mkdtemp(), 'g2p.pkl')
+    cached = CachedG2P(g2p, G2PCache(snapshot))
+    uncached = sum(_time(g2p, paragraphs) for _ in range(args.repeats)) / args.repeats
+    cold = _time(cached, paragraphs)
+    warm = sum(_time(cached, paragraphs) for _ in range(args.repeats)) / args.repeats
+    cached.cache.save()
+    from_disk = _time(CachedG2P(g2p, G2PCache(snapshot)), paragraphs)
+
+    print(f"{len(paragraphs)} paragraphs, {cached.cache.stats()['entries']} cached sentences")
+    for name, seconds in (('no cache', uncached), ('cold cache', cold), ('warm cache', warm), ('loaded snapshot', from_disk)):
+        print(f"{name:<16} {seconds * 1000:9.2f} ms  {uncached / seconds:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
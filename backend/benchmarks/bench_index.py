@@ -0,0 +1,88 @@
+"""Recall@k, QPS and bytes per vector of each vector index type against the flat baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_index [--count 200000] [--dim 512] [--queries 1000] [--k 10]
+        [--types flat,ivf_flat,ivf_pq,ivf_sq8,hnsw,sq8] [--nprobe 4,16,64] [--ef-search 32,128]
+        [--vectors embeddings.npy]
+
+Without --vectors, clustered synthetic vectors stand in for chunk embeddings.
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from rag import INDEX_TYPES, IndexConfig, build_index, set_search_params
+
+
+def synthetic_vectors(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, count // 500), dimensions)).astype('float32')
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.3 * rng.normal(size=(count, dimensions)).astype('float32')
+    return vectors.astype('float32')
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(row_found) & set(row_truth)) for row_found, row_truth in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def measure(index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    elapsed = time.perf_counter() - start
+    return found, len(queries) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200_000)
+    parser.add_argument('--dim', type=int, default=512)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--types', default=','.join(INDEX_TYPES))
+    parser.add_argument('--nprobe', default='4,16,64')
+    parser.add_argument('--ef-search', default='32,128')
+    parser.add_argument('--vectors', help='.npy file of real embeddings to index instead of synthetic data')
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype('float32')
+    else:
+        vectors = synthetic_vectors(args.count + args.queries, args.dim)
+    vectors, queries = vectors[:-args.queries], vectors[-args.queries:]
+    count = len(vectors)
+
+    baseline = build_index(vectors, IndexConfig(index_type='flat'))
+    truth, _ = measure(baseline, queries, args.k)
+
+    print(f"{count} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    print(f"{'index':<10} {'search param':<14} {'build s':>8} {f'recall@{args.k}':>10} {'QPS':>10} {'bytes/vec':>10}")
+    for index_type in args.types.split(','):
+        start = time.perf_counter()
+        index = build_index(vectors, IndexConfig(index_type=index_type))
+        build_seconds = time.perf_counter() - start
+        bytes_per_vector = len(faiss.serialize_index(index)) / count
+
+        if faiss.try_extract_index_ivf(index) is not None:
+            settings = [('nprobe', int(value)) for value in args.nprobe.split(',')]
+        elif index_type == 'hnsw':
+            settings = [('efSearch', int(value)) for value in args.ef_search.split(',')]
+        else:
+            settings = [('-', None)]
+
+        for name, value in settings:
+            if name == 'nprobe':
+                set_search_params(index, nprobe=value)
+            elif name == 'efSearch':
+                set_search_params(index, ef_search=value)
+            found, qps = measure(index, queries, args.k)
+            label = f"{name}={value}" if value is not None else '-'
+            print(f"{index_type:<10} {label:<14} {build_seconds:8.2f} {recall_at_k(found, truth):10.3f} {qps:10.0f} {bytes_per_vector:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
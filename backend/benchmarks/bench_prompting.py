@@ -0,0 +1,83 @@
+"""Per-turn prompt building cost: asdict + json.dumps versus the precompiled renderer.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompting [--iterations 2000] [--history 40]
+
+One turn builds the safety, classifier and selected-agent payloads from a
+session history of --history entries, which matches what AgentService does
+per user message. Reports time and peak allocation per turn.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import asdict
+
+from agents.agent_service import AVAILABLE_AGENTS
+from agents.agent_types import AgentClassifierInput, DeepDiveAgentInput, SafetyAgentInput
+from agents.prompting import FORMAT_FIELDS, chat_history, render_payload
+
+
+def _legacy_payload(input_data):
+    # What _request_agent did before: a deep copy, a verbose dump and the payload dump.
+    json.dumps(asdict(input_data), indent=2)
+    return json.dumps({**asdict(input_data), **FORMAT_FIELDS})
+
+
+def _legacy_history(instructions):
+    return [
+        {'role': 'user', 'parts': [{'text': instructions}]},
+        {'role': 'model', 'parts': [{'text': 'I understand my role and instructions. Ready to process input.'}]}
+    ]
+
+
+def legacy_turn(history, instructions):
+    for _ in range(3):
+        _legacy_history(instructions)
+    summary = '\n'.join(entry['content'] for entry in history)
+    _legacy_payload(SafetyAgentInput(latest_context_summary=summary, user_input='Explain momentum'))
+    summary = '\n'.join(entry['content'] for entry in history)
+    _legacy_payload(AgentClassifierInput(latest_context_summary=summary, user_input='Explain momentum', available_agents=[dict(agent) for agent in AVAILABLE_AGENTS]))
+    summary = '\n'.join(entry['content'] for entry in history)
+    _legacy_payload(DeepDiveAgentInput(latest_context_summary=summary, subtopic='Momentum', broader_topic='Mechanics'))
+
+
+def current_turn(history, instructions):
+    for _ in range(3):
+        list(chat_history(instructions))
+    summary = '\n'.join(entry['content'] for entry in history)
+    render_payload(SafetyAgentInput(latest_context_summary=summary, user_input='Explain momentum'))
+    render_payload(AgentClassifierInput(latest_context_summary=summary, user_input='Explain momentum', available_agents=AVAILABLE_AGENTS))
+    render_payload(DeepDiveAgentInput(latest_context_summary=summary, subtopic='Momentum', broader_topic='Mechanics'))
+
+
+def measure(turn, history, instructions, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        turn(history, instructions)
+    elapsed = (time.perf_counter() - start) / iterations
+    tracemalloc.start()
+    turn(history, instructions)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1e6, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--history', type=int, default=40)
+    args = parser.parse_args()
+
+    history = [{'role': 'user', 'content': f'Message {i}: ' + 'Tell me about conservation laws. ' * 12}
+               for i in range(args.history)]
+    instructions = "You are MindFlow's Deep Dive Agent.\n" + 'Instruction text. ' * 200
+
+    for name, turn in (('asdict + json.dumps', legacy_turn), ('precompiled renderer', current_turn)):
+        micros, peak_kib = measure(turn, history, instructions, args.iterations)
+        print(f"{name:<24} {micros:9.1f}us/turn  peak {peak_kib:8.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
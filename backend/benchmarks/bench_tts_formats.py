@@ -0,0 +1,59 @@
+"""Response size and encode cost of each TTS output format and sample rate.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tts_formats [text.txt] [--rates 24000,16000,12000] [--mbps 2]
+
+The text (a built-in lecture paragraph by default) is synthesized once with
+Kokoro, then the chunks are encoded into every available format at every
+rate. For each one the report gives bytes, the size ratio against 24kHz WAV,
+the encode time, and the time to download the file over a `--mbps` mobile link.
+"""
+
+import argparse
+import time
+
+from speech.audio_encoding import TTS_SAMPLE_RATE, StreamingEncoder, available_formats
+from speech.models import KOKORO_VOICE, get_tts_pipeline
+
+SAMPLE_TEXT = (
+    "Newton's second law states that the net force on an object equals its mass times its acceleration. "
+    "When the forces are balanced, the object keeps moving at a constant velocity, which is the first law. "
+    "For every action there is an equal and opposite reaction, so a rocket pushes exhaust backwards and moves forwards."
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('text', nargs='?')
+    parser.add_argument('--rates', default='24000,16000,12000')
+    parser.add_argument('--mbps', type=float, default=2.0)
+    args = parser.parse_args()
+
+    text = SAMPLE_TEXT
+    if args.text:
+        with open(args.text, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+    start = time.perf_counter()
+    chunks = [audio for _, _, audio in get_tts_pipeline()(text, voice=KOKORO_VOICE, speed=1)]
+    synthesis_seconds = time.perf_counter() - start
+    audio_seconds = sum(len(chunk) for chunk in chunks) / TTS_SAMPLE_RATE
+    print(f"{audio_seconds:.1f}s of speech synthesized in {synthesis_seconds:.2f}s")
+
+    baseline = None
+    for audio_format in available_formats().values():
+        for rate in map(int, args.rates.split(',')):
+            start = time.perf_counter()
+            encoder = StreamingEncoder(audio_format, rate)
+            for chunk in chunks:
+                encoder.write(chunk)
+            data = encoder.finish()
+            encode_seconds = time.perf_counter() - start
+            baseline = baseline or len(data)
+            download_seconds = len(data) * 8 / (args.mbps * 1e6)
+            print(f"{audio_format.name:<5} {rate:>6}Hz {len(data):>10,} bytes  {baseline / len(data):5.1f}x smaller  "
+                  f"encode {encode_seconds * 1000:7.1f}ms  download {download_seconds:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Real-time factor and word error rate of each Whisper backend on a local audio set.
+
+Usage (from backend/):
+    python -m benchmarks.bench_whisper audio_dir/ [--backends torch,torch-int8] [--threads 4] [--concurrency 8]
+
+audio_dir holds audio files (.wav, .flac, .mp3) with a reference transcript
+next to each one, e.g. clip1.wav and clip1.txt. Every backend transcribes
+every clip once after a warmup. The report gives load time, real-time
+factor (processing time / audio duration, lower is better), speed-up over
+the first backend and WER against the references.
+
+With --concurrency N, the PyTorch backends also run every clip through
+transcribe_audio from N threads at once, first one window at a time and
+then with dynamic batching, and report clips per second for both.
+"""
+
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import soundfile as sf
+
+from speech import batching
+from speech.models import WHISPER_CT2_MODEL, WHISPER_MODEL_PATH
+from speech.transcription import transcribe_audio
+from speech.whisper_backends import BACKENDS, default_num_threads, load_whisper
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.mp3', '.ogg')
+
+
+def normalize_words(text: str) -> List[str]:
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """(word edits, reference words) via Levenshtein distance over words."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def load_clips(directory: str) -> List[Tuple[str, str, float]]:
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        reference_path = os.path.join(directory, stem + '.txt')
+        if extension.lower() in AUDIO_EXTENSIONS and os.path.exists(reference_path):
+            with open(reference_path, 'r', encoding='utf-8') as f:
+                reference = f.read()
+            path = os.path.join(directory, name)
+            clips.append((path, reference, sf.info(path).duration))
+    return clips
+
+
+def concurrent_throughput(model, clips, concurrency: int, batch_size: int) -> float:
+    """Clips per second when `concurrency` threads transcribe all clips."""
+    batching.WHISPER_MAX_BATCH_SIZE = batch_size
+    batching._batcher = None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda clip: transcribe_audio(model, clip[0]), clips))
+    return len(clips) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('audio_dir')
+    parser.add_argument('--backends', default='torch,torch-int8')
+    parser.add_argument('--threads', type=int, default=default_num_threads())
+    parser.add_argument('--model', default=WHISPER_MODEL_PATH)
+    parser.add_argument('--ct2-model', default=WHISPER_CT2_MODEL)
+    parser.add_argument('--concurrency', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=max(batching.WHISPER_MAX_BATCH_SIZE, 8))
+    args = parser.parse_args()
+
+    clips = load_clips(args.audio_dir)
+    if not clips:
+        parser.error(f"No audio files with matching .txt references in {args.audio_dir}")
+    audio_seconds = sum(duration for _, _, duration in clips)
+    print(f"{len(clips)} clips, {audio_seconds:.1f}s of audio, {args.threads} threads")
+
+    baseline_rtf = None
+    for backend in args.backends.split(','):
+        if backend not in BACKENDS:
+            parser.error(f"Unknown backend '{backend}'")
+        start = time.perf_counter()
+        model = load_whisper(backend, args.model, args.threads, args.ct2_model)
+        load_seconds = time.perf_counter() - start
+        model.transcribe(clips[0][0])
+
+        edits = words = 0
+        start = time.perf_counter()
+        for path, reference, _ in clips:
+            result = model.transcribe(path)
+            clip_edits, clip_words = word_error_rate(reference, result['text'])
+            edits += clip_edits
+            words += clip_words
+        rtf = (time.perf_counter() - start) / audio_seconds
+        baseline_rtf = baseline_rtf or rtf
+        print(f"{backend:<12} load {load_seconds:6.1f}s  RTF {rtf:6.3f}  speed-up {baseline_rtf / rtf:4.1f}x  "
+              f"WER {edits / max(words, 1):6.2%}")
+        if args.concurrency and backend != 'ctranslate2':
+            unbatched = concurrent_throughput(model, clips, args.concurrency, 1)
+            batched = concurrent_throughput(model, clips, args.concurrency, args.batch_size)
+            print(f"{'':<12} {args.concurrency} concurrent: {unbatched:6.2f} clips/s unbatched, "
+                  f"{batched:6.2f} clips/s batched (max batch {args.batch_size}), {batched / unbatched:4.1f}x")
+        del model
+
+
+if __name__ == '__main__':
+    main()
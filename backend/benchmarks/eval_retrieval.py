@@ -0,0 +1,66 @@
+"""Compare dense, BM25 and hybrid retrieval on a small labelled question set.
+
+Usage (from backend/):
+    python -m benchmarks.eval_retrieval dataset.json [--k 2] [--embeddings hashing|gemini] [--chunker tokens|characters]
+
+The dataset is a JSON object:
+    {
+      "context": "Full document text...",
+      "queries": [{"question": "What is X?", "relevant": "text that only the right chunk contains"}]
+    }
+A retrieved chunk counts as relevant when it contains the `relevant` string
+(case-insensitive). Reports hit rate@k and MRR@k per retriever.
+"""
+
+import argparse
+import json
+from typing import Callable, Dict, List
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from rag import GeminiEmbeddings, HashingEmbeddings, HybridRetriever, chunk_pages
+
+
+def evaluate(name: str, retrieve: Callable[[str, int], List[int]], texts: List[str], queries: List[Dict[str, str]], k: int) -> None:
+    hits = 0
+    reciprocal_ranks = 0.0
+    for query in queries:
+        relevant = query['relevant'].lower()
+        for rank, doc_id in enumerate(retrieve(query['question'], k)):
+            if relevant in texts[doc_id].lower():
+                hits += 1
+                reciprocal_ranks += 1.0 / (rank + 1)
+                break
+    total = len(queries) or 1
+    print(f"{name:<18} hit@{k}: {hits / total:.3f}  MRR@{k}: {reciprocal_ranks / total:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('dataset')
+    parser.add_argument('--k', type=int, default=2)
+    parser.add_argument('--embeddings', choices=['hashing', 'gemini'], default='hashing')
+    parser.add_argument('--chunker', choices=['tokens', 'characters'], default='tokens')
+    args = parser.parse_args()
+
+    with open(args.dataset, 'r', encoding='utf-8') as f:
+        dataset = json.load(f)
+
+    if args.chunker == 'tokens':
+        texts = [chunk.text for chunk in chunk_pages([(1, dataset['context'])])]
+    else:
+        texts = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100).split_text(dataset['context'])
+    embeddings = GeminiEmbeddings() if args.embeddings == 'gemini' else HashingEmbeddings()
+    retriever = HybridRetriever.from_texts(texts, embeddings)
+    unranked = HybridRetriever(texts, retriever.vector_store, reranker=None)
+    queries = dataset['queries']
+
+    print(f"{len(texts)} chunks, {len(queries)} queries")
+    evaluate('dense', lambda q, k: retriever._dense_ranking(q)[:k], texts, queries, args.k)
+    evaluate('bm25', lambda q, k: retriever._lexical_ranking(q)[:k], texts, queries, args.k)
+    evaluate('hybrid (rrf)', unranked.retrieve_ids, texts, queries, args.k)
+    evaluate('hybrid + rerank', retriever.retrieve_ids, texts, queries, args.k)
+
+
+if __name__ == '__main__':
+    main()
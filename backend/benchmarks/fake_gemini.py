@@ -0,0 +1,176 @@
+"""Local stand-in for google.generativeai with configurable latency and failures.
+
+`install()` swaps `genai.GenerativeModel` for FakeGenerativeModel. The fake
+answers agent chats with canned per-agent JSON and plain prompts with
+canned text. It sleeps for a latency drawn from the configured distribution
+and raises quota-style errors at the configured rate. Nothing leaves the
+machine, so the benchmarks run on CPU-only CI.
+"""
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from agents.instrumentation import agent_name
+
+
+class FakeQuotaError(Exception):
+    """Injected failure; its message marks it as retryable for the LLM client."""
+
+
+@dataclass
+class LatencyDistribution:
+    kind: str = 'lognormal'
+    params: List[float] = field(default_factory=lambda: [0.8, 0.5])
+
+    @classmethod
+    def parse(cls, spec: str) -> 'LatencyDistribution':
+        """Parse 'constant:0.2', 'uniform:0.1,0.5' or 'lognormal:median,sigma'."""
+        kind, _, values = spec.partition(':')
+        return cls(kind, [float(value) for value in values.split(',') if value])
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == 'constant':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(self.params[0], self.params[1])
+        if self.kind == 'lognormal':
+            median, sigma = self.params
+            return rng.lognormvariate(0, sigma) * median
+        raise ValueError(f"Unknown latency distribution '{self.kind}'")
+
+
+def _classifier_reply(payload: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    agents = ['exploration', 'interactive', 'question', 'deepDive', 'flashcard', 'cheatsheet', 'mermaid']
+    return {'next_agent': rng.choices(agents, weights=[4, 3, 2, 2, 1, 1, 1])[0]}
+
+
+def _batch_reply(key: str, value: Callable[[str], Any]) -> Callable[[Dict[str, Any], random.Random], Dict[str, Any]]:
+    return lambda payload, rng: {key: {subtopic: value(subtopic) for subtopic in payload.get('subtopics', [])}}
+
+
+_QUESTION = {
+    'question': 'Which of these is a vector quantity?',
+    'type': 'MCQ',
+    'options': ['Speed', 'Mass', 'Velocity', 'Time'],
+    'correct_answer': 'Velocity'
+}
+
+CANNED_RESPONSES: Dict[str, Callable[[Dict[str, Any], random.Random], Dict[str, Any]]] = {
+    'safety': lambda payload, rng: {'status': 'SAFE', 'explanation': 'Content is appropriate.'},
+    'agent_classifier': _classifier_reply,
+    'exploration': lambda payload, rng: {
+        'subtopics': ['Kinematics', 'Forces', 'Energy', 'Momentum', 'Rotation'],
+        'broaderTopic': 'Classical mechanics',
+        'prerequisites': ['Algebra', 'Basic calculus'],
+        'summary': 'An overview of motion, forces and conservation laws. ' * 8
+    },
+    'interactive': lambda payload, rng: {'response': 'Good question. ' * 40},
+    'question': lambda payload, rng: dict(_QUESTION),
+    'answer_evaluation': lambda payload, rng: {'is_correct': rng.random() < 0.6, 'feedback': 'Nice reasoning. ' * 10},
+    'deep_dive': lambda payload, rng: {
+        'breakdown': 'A detailed breakdown. ' * 60,
+        'mermaid_diagram': 'graph TD; A-->B;',
+        'analogy': 'Like a ball rolling downhill.',
+        'code_example': None
+    },
+    'flashcard': lambda payload, rng: {'csv_content': 'question,answer\nWhat is F?,m*a\nWhat is p?,m*v'},
+    'cheatsheet': lambda payload, rng: {'content': '# Cheatsheet\n' + '- key fact\n' * 30},
+    'mermaid': lambda payload, rng: {'mermaid_code': 'graph TD; A-->B; B-->C;'},
+    'configuration': lambda payload, rng: {'prompt_addition': 'Use simpler language.'},
+    'summary_consolidation': lambda payload, rng: {'summary': 'Session summary.', 'key_points': ['F = ma'], 'recommendations': ['Practice']},
+    'batch_flashcard': _batch_reply('flashcards', lambda subtopic: f'question,answer\nWhat is {subtopic}?,A definition'),
+    'batch_question': _batch_reply('questions', lambda subtopic: dict(_QUESTION)),
+}
+
+
+def _reply_to_prompt(prompt: str, rng: random.Random) -> str:
+    if prompt.startswith('Convert this text into a numerical embedding'):
+        return ','.join(f'{rng.random():.4f}' for _ in range(512))
+    if 'interactive questions' in prompt:
+        return json.dumps([dict(_QUESTION, question_text=_QUESTION['question'], explanation='Velocity has direction.')] * 3)
+    return '## Learning module\n\n' + 'Explained content with $E = mc^2$. ' * 80
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_chars: int):
+        self.text = text
+        self.usage_metadata = type('Usage', (), {
+            'prompt_token_count': prompt_chars // 4,
+            'candidates_token_count': len(text) // 4
+        })()
+
+    def __iter__(self):
+        yield self
+
+
+@dataclass
+class FakeGeminiConfig:
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel covering the calls MindFlow makes."""
+
+    config = FakeGeminiConfig()
+    _rng = random.Random()
+    _rng_lock = threading.Lock()
+    calls = 0
+
+    def __init__(self, model_name: str = 'gemini-pro', **kwargs):
+        self.model_name = model_name
+
+    @classmethod
+    def _simulate(cls) -> None:
+        with cls._rng_lock:
+            cls.calls += 1
+            delay = cls.config.latency.sample(cls._rng)
+            fail = cls._rng.random() < cls.config.failure_rate
+        time.sleep(delay)
+        if fail:
+            raise FakeQuotaError('429 Resource exhausted (injected by fake Gemini)')
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs) -> FakeResponse:
+        self._simulate()
+        with self._rng_lock:
+            text = _reply_to_prompt(prompt, self._rng)
+        return FakeResponse(text, len(prompt))
+
+    def start_chat(self, history: Optional[List[Dict[str, Any]]] = None) -> 'FakeChatSession':
+        return FakeChatSession(history or [])
+
+
+class FakeChatSession:
+    def __init__(self, history: List[Dict[str, Any]]):
+        self.history = history
+        self.instructions = history[0]['parts'][0]['text'] if history else ''
+
+    def send_message(self, content: str, stream: bool = False, **kwargs) -> FakeResponse:
+        FakeGenerativeModel._simulate()
+        try:
+            payload = json.loads(content)
+        except (TypeError, json.JSONDecodeError):
+            payload = {}
+        reply = CANNED_RESPONSES.get(agent_name(self.instructions))
+        with FakeGenerativeModel._rng_lock:
+            body = reply(payload, FakeGenerativeModel._rng) if reply else {'response': 'ok'}
+        return FakeResponse(json.dumps(body), len(self.instructions) + len(content))
+
+
+def install(latency: str = 'lognormal:0.8,0.5', failure_rate: float = 0.0, seed: Optional[int] = None) -> None:
+    """Route every genai.GenerativeModel in this process to the fake."""
+    import google.generativeai as genai
+    from agents import llm_client
+
+    FakeGenerativeModel.config = FakeGeminiConfig(LatencyDistribution.parse(latency), failure_rate, seed)
+    FakeGenerativeModel._rng = random.Random(seed)
+    genai.GenerativeModel = FakeGenerativeModel
+    genai.configure = lambda *args, **kwargs: None
+    with llm_client._models_lock:
+        llm_client._models.clear()
+
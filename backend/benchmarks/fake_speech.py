@@ -0,0 +1,126 @@
+"""CPU-cheap stand-ins for the Kokoro pipeline and the Whisper model.
+
+They keep the shapes and timing of the real models: the fake pipeline yields
+one 24kHz chunk per sentence and the fake model returns a Whisper-style dict.
+The fake model also has the `dims` and `decode()` that speech/batching.py
+looks for, so with batching on, /speech2text goes through WhisperBatcher.
+The load test can therefore exercise /process-text2speech and /speech2text
+without model weights. `install()` stubs kokoro, torch and whisper in
+sys.modules when they are not installed, so it runs on CPU-only CI.
+"""
+
+import re
+import sys
+import time
+import types
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import numpy as np
+
+SAMPLE_RATE = 24000
+WHISPER_SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30
+
+
+class FakeKPipeline:
+    """Yields (graphemes, phonemes, audio) per sentence like kokoro.KPipeline."""
+
+    seconds_per_char = 0.0005
+
+    def __init__(self, lang_code: str = 'a', **kwargs):
+        self.lang_code = lang_code
+
+    def __call__(self, text: str, voice: str = 'af_heart', speed: float = 1, **kwargs):
+        for sentence in filter(None, (part.strip() for part in re.split(r'(?<=[.!?])\s+', text))):
+            time.sleep(len(sentence) * self.seconds_per_char)
+            # Roughly 15 characters of speech per second.
+            samples = int(SAMPLE_RATE * len(sentence) / 15 / speed)
+            yield sentence, sentence.lower(), np.zeros(samples, dtype=np.float32)
+
+
+class FakeWhisperModel:
+    """Mimics whisper's model.transcribe() and batched model.decode() at a fixed real-time factor."""
+
+    real_time_factor = 0.05
+    # Extra cost of each additional window in a batched decode, relative to the first.
+    batch_marginal_cost = 0.25
+    dims = SimpleNamespace(n_mels=80)
+    device = 'cpu'
+    is_multilingual = False
+    num_languages = 99
+
+    def transcribe(self, audio, **kwargs):
+        if isinstance(audio, str):
+            import soundfile as sf
+            duration = sf.info(audio).duration
+        else:
+            duration = len(audio) / WHISPER_SAMPLE_RATE
+        time.sleep(duration * self.real_time_factor)
+        return {'text': 'transcribed speech', 'segments': [], 'language': 'en'}
+
+    def decode(self, mel, options=None):
+        """One greedy pass over a batch of padded 30-second windows."""
+        size = len(mel)
+        time.sleep(WINDOW_SECONDS * self.real_time_factor * (1 + self.batch_marginal_cost * (size - 1)))
+        return [SimpleNamespace(text='transcribed speech', tokens=[], language='en',
+                                avg_logprob=-0.2, compression_ratio=1.2, no_speech_prob=0.01)
+                for _ in range(size)]
+
+
+class _FakeTensor(np.ndarray):
+    def to(self, device):
+        return self
+
+
+def _stub_torch() -> types.ModuleType:
+    torch = types.ModuleType('torch')
+    torch.load = lambda path, *args, **kwargs: None
+    torch.set_num_threads = lambda count: None
+    torch.no_grad = nullcontext
+    torch.zeros = lambda *shape: np.zeros(shape, dtype=np.float32).view(_FakeTensor)
+    torch.stack = lambda tensors: np.stack(tensors).view(_FakeTensor)
+    return torch
+
+
+def _stub_whisper() -> types.ModuleType:
+    whisper = types.ModuleType('whisper')
+    whisper.audio = SimpleNamespace(SAMPLE_RATE=WHISPER_SAMPLE_RATE, N_FRAMES=WINDOW_SECONDS * 100)
+    whisper.tokenizer = SimpleNamespace(get_tokenizer=lambda *args, **kwargs: SimpleNamespace(
+        timestamp_begin=50364, eot=50257, decode=lambda tokens: ''))
+    whisper.DecodingOptions = lambda **kwargs: SimpleNamespace(**kwargs)
+    whisper.log_mel_spectrogram = lambda audio, n_mels=80: sys.modules['torch'].zeros(n_mels, whisper.audio.N_FRAMES)
+    whisper.pad_or_trim = lambda mel, length: mel
+
+    def load_audio(path):
+        import soundfile as sf
+        audio, rate = sf.read(path, dtype='float32', always_2d=True)
+        return audio.mean(axis=1)
+
+    whisper.load_audio = load_audio
+    return whisper
+
+
+def _import_or_stub(name: str, stub) -> types.ModuleType:
+    try:
+        return __import__(name)
+    except ImportError:
+        sys.modules[name] = stub()
+        return sys.modules[name]
+
+
+def install() -> None:
+    """Make `KPipeline(...)` and the Whisper `torch.load` return the fakes."""
+    kokoro = _import_or_stub('kokoro', lambda: types.ModuleType('kokoro'))
+    torch = _import_or_stub('torch', _stub_torch)
+    _import_or_stub('whisper', _stub_whisper)
+
+    kokoro.KPipeline = FakeKPipeline
+    real_load = torch.load
+
+    def load(path, *args, **kwargs):
+        if str(path).endswith('whisper_model.pt'):
+            return FakeWhisperModel()
+        return real_load(path, *args, **kwargs)
+
+    torch.load = load
@@ -0,0 +1,284 @@
+"""Offline load test of the Flask routes against a fake Gemini and fake speech models.
+
+Usage (from backend/):
+    python -m benchmarks.load_test [--scenario mixed] [--users 16] [--requests 400]
+        [--latency lognormal:0.8,0.5] [--failure-rate 0.02] [--seed 1]
+        [--whisper-batch-size 8] [--json results.json]
+        [--baseline previous.json --tolerance 0.2]
+
+Gemini is replaced by benchmarks.fake_gemini. Kokoro and Whisper are
+replaced by benchmarks.fake_speech unless --real-speech is given. PDFs for
+/process-content are served from a local HTTP server, so the run needs no
+network access or API key. Concurrent virtual users drive the routes through
+Flask's test client. The report gives throughput, p50/p95/p99 latency and
+error counts per route, plus peak RSS. With --baseline the run exits non-zero
+when a route's p95 regresses by more than --tolerance, which lets CI gate on it.
+"""
+
+import argparse
+import io
+import json
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks import fake_gemini, fake_speech
+
+PARAGRAPH = ('Newton\'s second law states that the net force on a body equals its mass times its acceleration. '
+             'Momentum is conserved in a closed system, and kinetic energy depends on the square of velocity. ')
+CONTEXT = PARAGRAPH * 40
+
+
+def _make_pdf(pages: int) -> bytes:
+    """Minimal multi-page PDF with a text layer."""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for number in range(pages):
+        text = f'BT /F1 11 Tf 40 750 Td (Page {number + 1}. {PARAGRAPH[:90]}) Tj ET'
+        objects.append(f'<< /Length {len(text)} >>\nstream\n{text}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R '
+                       f'/Resources << /Font << /F1 3 0 R >> >> >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {pages} >>'
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for index, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f'{index} 0 obj\n{body}\nendobj\n'.encode('latin-1'))
+    xref = out.tell()
+    out.write(f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode())
+    for offset in offsets:
+        out.write(f'{offset:010d} 00000 n \n'.encode())
+    out.write(f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode())
+    return out.getvalue()
+
+
+def _make_wav(seconds: float) -> bytes:
+    """Tone bursts separated by short pauses, so VAD finds speech to transcribe."""
+    import soundfile as sf
+    time_axis = np.arange(int(16000 * seconds)) / 16000
+    audio = 0.3 * np.sin(2 * np.pi * 220 * time_axis) * (time_axis % 1.0 < 0.8)
+    wav = io.BytesIO()
+    sf.write(wav, audio.astype(np.float32), 16000, format='WAV')
+    return wav.getvalue()
+
+
+class _PdfHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = b''
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+# A request is (method, path, keyword arguments for the test client).
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+def build_scenarios(pdf_url: str, wav: bytes) -> Dict[str, List[Tuple[str, int, Callable[[int], Request]]]]:
+    """Route mixes, each a list of (label, weight, request factory taking the user id)."""
+    def interaction(user):
+        topic = random.choice(['Newtonian mechanics', 'Momentum', 'Energy conservation', 'Tell me more'])
+        return 'POST', '/process-interaction', {'json': {'input': topic, 'session_id': f'user-{user}'}}
+
+    def explain_more(user):
+        return 'POST', '/explain-more', {'json': {
+            'question': 'Why is momentum conserved?', 'context': CONTEXT, 'session_id': f'user-{user}'}}
+
+    def process_content(user):
+        return 'POST', '/process-content', {'json': {'notes': PARAGRAPH, 'files': [pdf_url]}}
+
+    def text_to_speech(user):
+        return 'POST', '/process-text2speech', {'data': {'text': PARAGRAPH * 3}}
+
+    def speech_to_text(user):
+        return 'POST', '/speech2text', {'data': wav, 'content_type': 'audio/wav'}
+
+    return {
+        'chat': [('process-interaction', 3, interaction), ('explain-more', 2, explain_more)],
+        'content': [('process-content', 1, process_content)],
+        'speech': [('text2speech', 1, text_to_speech), ('speech2text', 1, speech_to_text)],
+        'mixed': [
+            ('process-interaction', 6, interaction),
+            ('explain-more', 4, explain_more),
+            ('process-content', 1, process_content),
+            ('text2speech', 1, text_to_speech),
+            ('speech2text', 1, speech_to_text),
+        ],
+    }
+
+
+def _rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def run(app, mix, users: int, total_requests: int) -> Dict[str, Any]:
+    labels = [label for label, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    factories = {label: factory for label, _, factory in mix}
+    latencies: Dict[str, List[float]] = {label: [] for label in labels}
+    errors: Dict[str, int] = {label: 0 for label in labels}
+    lock = threading.Lock()
+    remaining = iter(range(total_requests))
+    peak_rss = _rss_mb()
+    stop = threading.Event()
+
+    def sample_memory():
+        nonlocal peak_rss
+        while not stop.wait(0.2):
+            peak_rss = max(peak_rss, _rss_mb())
+
+    def user(user_id: int):
+        client = app.test_client()
+        rng = random.Random(user_id)
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            label = rng.choices(labels, weights)[0]
+            method, path, kwargs = factories[label](user_id)
+            start = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[label].append(elapsed)
+                if response.status_code >= 400:
+                    errors[label] += 1
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    start_rss = _rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    wall = time.perf_counter() - start
+    stop.set()
+    sampler.join()
+
+    routes = {}
+    for label in labels:
+        samples = latencies[label]
+        routes[label] = {
+            'requests': len(samples),
+            'errors': errors[label],
+            'throughput_rps': round(len(samples) / wall, 2),
+            'p50_ms': round(percentile(samples, 50) * 1000, 1),
+            'p95_ms': round(percentile(samples, 95) * 1000, 1),
+            'p99_ms': round(percentile(samples, 99) * 1000, 1),
+        }
+    return {
+        'wall_seconds': round(wall, 2),
+        'throughput_rps': round(sum(len(s) for s in latencies.values()) / wall, 2),
+        'rss_start_mb': round(start_rss, 1),
+        'rss_peak_mb': round(max(peak_rss, _rss_mb()), 1),
+        'gemini_calls': fake_gemini.FakeGenerativeModel.calls,
+        'routes': routes,
+    }
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(f"{'route':<22}{'reqs':>6}{'errs':>6}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, route in results['routes'].items():
+        print(f"{label:<22}{route['requests']:>6}{route['errors']:>6}{route['throughput_rps']:>8}"
+              f"{route['p50_ms']:>10}{route['p95_ms']:>10}{route['p99_ms']:>10}")
+    print(f"total {results['throughput_rps']} req/s over {results['wall_seconds']}s, "
+          f"{results['gemini_calls']} fake Gemini calls, "
+          f"RSS {results['rss_start_mb']} -> peak {results['rss_peak_mb']} MB")
+
+
+def regressions(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Routes whose p95 grew by more than `tolerance` relative to the baseline."""
+    found = []
+    for label, route in results['routes'].items():
+        previous = baseline.get('routes', {}).get(label)
+        if previous and previous['p95_ms'] and route['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            found.append(f"{label}: p95 {previous['p95_ms']}ms -> {route['p95_ms']}ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=['chat', 'content', 'speech', 'mixed'], default='mixed')
+    parser.add_argument('--users', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--latency', default='lognormal:0.8,0.5',
+                        help="Fake Gemini latency: constant:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--pdf-pages', type=int, default=12)
+    parser.add_argument('--real-speech', action='store_true', help='Load the real Kokoro and Whisper models')
+    parser.add_argument('--whisper-batch-size', type=int, default=8,
+                        help='Cross-request Whisper batch size for /speech2text; 1 turns batching off')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Results file from an earlier run to compare p95 against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    fake_gemini.install(args.latency, args.failure_rate, args.seed)
+    if not args.real_speech:
+        fake_speech.install()
+
+    import app as backend
+    from speech import batching
+    batching.WHISPER_MAX_BATCH_SIZE = args.whisper_batch_size
+
+    _PdfHandler.body = _make_pdf(args.pdf_pages)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PdfHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pdf_url = f'http://127.0.0.1:{server.server_address[1]}/load-test/document.pdf'
+
+    scenarios = build_scenarios(pdf_url, _make_wav(5))
+    print(f"scenario {args.scenario}: {args.users} users, {args.requests} requests, "
+          f"latency {args.latency}, failure rate {args.failure_rate}")
+    results = run(backend.app, scenarios[args.scenario], args.users, args.requests)
+    server.shutdown()
+    results['config'] = vars(args)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Gunicorn settings that share the speech models across workers.
+
+Usage (from backend/):
+    gunicorn -c gunicorn.conf.py app:app
+
+app.py is imported once in the master, which loads and warms the models
+(preload_app). Workers are forked afterwards and inherit those pages
+copy-on-write. Each process logs its memory at boot; compare summed PSS
+with RSS x workers to see the sharing.
+"""
+
+import gc
+import os
+
+from dotenv import load_dotenv
+
+# The speech package reads its settings at import, so load .env first.
+load_dotenv()
+
+from speech.whisper_backends import GUNICORN_WORKERS
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = GUNICORN_WORKERS
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after preload, before any worker is forked. Frozen
+    # objects are never traversed by the collector, so workers' collections
+    # don't write to (and un-share) the pages holding the preloaded models.
+    gc.freeze()
+    from speech import memory_usage
+    server.log.info(f"Master memory after preload: {memory_usage()}")
+
+
+def post_fork(server, worker):
+    from speech import memory_usage
+    from speech.models import SPEECH_WARMUP, configure_threads, warmup_models
+    configure_threads()
+    if SPEECH_WARMUP == 'worker':
+        warmup_models()
+    server.log.info(f"Worker {worker.pid} memory at boot: {memory_usage()}")
@@ -0,0 +1,19 @@
+"""
+MindFlow Ingestion Module
+This module contains the helpers used to fetch and prepare uploaded content.
+"""
+
+from .http import DEFAULT_TIMEOUT, get_http_session
+from .pdf_extraction import PageCache, PdfExtractor
+from .uploads import DiskBackedRequest, Upload, cleanup_request_files, receive_upload
+
+__all__ = [
+    'DEFAULT_TIMEOUT',
+    'get_http_session',
+    'PageCache',
+    'PdfExtractor',
+    'DiskBackedRequest',
+    'Upload',
+    'cleanup_request_files',
+    'receive_upload'
+]
@@ -0,0 +1,43 @@
+"""Pooled HTTP session for outbound downloads."""
+
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 10))
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 32))
+DEFAULT_TIMEOUT = (5, 60)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=['GET', 'HEAD']
+        )
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide keep-alive session used for downloads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
@@ -0,0 +1,227 @@
+"""Parallel, cached, page-level PDF text extraction.
+
+Page ranges are spread over a process pool. Each worker opens the file
+itself, so only page numbers and text cross process boundaries. The backend
+(pypdf or pdfplumber) is picked per document by timing both on a probe page.
+Extracted pages are cached by file hash, so re-processing a document only
+extracts pages that are not cached yet. The on-disk cache is capped at
+PAGE_CACHE_MAX_BYTES and drops the least recently used documents first.
+Pages without a text layer come back as empty strings instead of failing
+the whole file.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+BACKENDS = ('pypdf', 'pdfplumber')
+# Below this many pages, process start-up costs more than it saves.
+MIN_PAGES_FOR_POOL = 8
+PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+logger = logging.getLogger('mindflow.ingestion')
+
+
+def _open_pypdf(pdf_path: str):
+    from pypdf import PdfReader
+    # pypdf reads a path fully into memory; a memory map lets the OS page it in.
+    with open(pdf_path, 'rb') as f:
+        view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return PdfReader(view)
+
+
+def _extract_range(pdf_path: str, backend: str, page_numbers: List[int]) -> List[Tuple[int, str]]:
+    """Extract the given 0-based pages; runs inside a worker process."""
+    results = []
+    if backend == 'pdfplumber':
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as pdf:
+            for number in page_numbers:
+                try:
+                    text = pdf.pages[number].extract_text()
+                except Exception as e:
+                    logger.warning('Error extracting page %d of %s: %s', number + 1, pdf_path, e)
+                    text = None
+                results.append((number, text or ''))
+    else:
+        reader = _open_pypdf(pdf_path)
+        for number in page_numbers:
+            try:
+                text = reader.pages[number].extract_text()
+            except Exception as e:
+                logger.warning('Error extracting page %d of %s: %s', number + 1, pdf_path, e)
+                text = None
+            results.append((number, text or ''))
+    return results
+
+
+def page_count(pdf_path: str) -> int:
+    """Number of pages in a PDF."""
+    return len(_open_pypdf(pdf_path).pages)
+
+
+def choose_backend(pdf_path: str, total_pages: int) -> str:
+    """Time each backend on a probe page and return the fastest one that finds text."""
+    probe = [min(1, total_pages - 1)] if total_pages else []
+    timings = {}
+    for backend in BACKENDS:
+        try:
+            # Warm up so the library's import time is not counted against it.
+            _extract_range(pdf_path, backend, [])
+        except ImportError:
+            continue
+        start = time.perf_counter()
+        text = _extract_range(pdf_path, backend, probe)
+        elapsed = time.perf_counter() - start
+        # A backend that returns nothing where another finds text is not "faster".
+        timings[backend] = (0 if any(page_text for _, page_text in text) else 1, elapsed)
+    if not timings:
+        raise RuntimeError('No PDF backend available; install pypdf or pdfplumber')
+    return min(timings, key=timings.get)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PageCache:
+    """Extracted page text keyed by file hash, kept in memory and optionally on disk.
+
+    A file's mtime marks when it was last used; once the directory holds more
+    than `max_bytes`, the least recently used files are removed.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_documents: int = 64, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self._documents: 'OrderedDict[str, Dict[int, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _load(self, digest: str) -> Optional[Dict[int, str]]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(digest), 'r', encoding='utf-8') as f:
+                pages = {int(number): text for number, text in json.load(f).items()}
+            os.utime(self._path(digest))
+        except (FileNotFoundError, ValueError):
+            return None
+        return pages
+
+    def get(self, digest: str) -> Dict[int, str]:
+        with self._lock:
+            pages = self._documents.get(digest)
+            if pages is None:
+                pages = self._load(digest)
+                if pages is None:
+                    return {}
+                self._documents[digest] = pages
+            self._documents.move_to_end(digest)
+            return dict(pages)
+
+    def put(self, digest: str, pages: Dict[int, str]) -> None:
+        with self._lock:
+            stored = self._documents.get(digest)
+            if stored is None:
+                # Merge with what is on disk rather than overwrite it with a partial set.
+                stored = self._load(digest) or {}
+                self._documents[digest] = stored
+            stored.update(pages)
+            self._documents.move_to_end(digest)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+            if self.directory:
+                temp_path = f"{self._path(digest)}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(stored, f, ensure_ascii=False)
+                os.replace(temp_path, self._path(digest))
+                self._prune(keep=self._path(digest))
+
+    def _prune(self, keep: str) -> None:
+        """Remove least recently used files until the directory fits in `max_bytes`."""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class PdfExtractor:
+    """Extracts PDF pages in parallel across a process pool."""
+
+    def __init__(self, max_workers: Optional[int] = None, cache: Optional[PageCache] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache or PageCache()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # Gunicorn workers are multithreaded; forking one could copy a held
+                # lock into the child, so workers come from a clean forkserver.
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('forkserver'))
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def extract_pages(self, pdf_path: str, backend: str = 'auto') -> List[Tuple[int, str]]:
+        """Return (1-based page number, text) for every page of the PDF."""
+        digest = file_digest(pdf_path)
+        cached = self.cache.get(digest)
+        total_pages = page_count(pdf_path)
+        missing = [number for number in range(total_pages) if number not in cached]
+
+        if missing:
+            if backend == 'auto':
+                backend = choose_backend(pdf_path, total_pages)
+            if len(missing) < MIN_PAGES_FOR_POOL or self.max_workers == 1:
+                extracted = _extract_range(pdf_path, backend, missing)
+            else:
+                size = -(-len(missing) // self.max_workers)
+                ranges = [missing[i:i + size] for i in range(0, len(missing), size)]
+                futures = [self._executor().submit(_extract_range, pdf_path, backend, pages) for pages in ranges]
+                extracted = [page for future in futures for page in future.result()]
+            new_pages = dict(extracted)
+            self.cache.put(digest, new_pages)
+            cached.update(new_pages)
+
+        return [(number + 1, cached.get(number, '')) for number in range(total_pages)]
+
+    def extract_text(self, pdf_path: str, separator: str = '\n', backend: str = 'auto') -> str:
+        """Return the whole document's text, pages joined by `separator`."""
+        return separator.join(text for _, text in self.extract_pages(pdf_path, backend) if text)
@@ -0,0 +1,43 @@
+import os
+
+from ingestion.pdf_extraction import PageCache
+
+
+def _age(cache, digest, mtime):
+    os.utime(cache._path(digest), (mtime, mtime))
+
+
+def test_pages_merge_across_puts_and_survive_a_new_instance(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put('a', {1: 'one'})
+    cache.put('a', {2: 'two'})
+    assert PageCache(str(tmp_path)).get('a') == {1: 'one', 2: 'two'}
+    assert cache.get('missing') == {}
+
+
+def test_prune_drops_least_recently_used_files_first(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10 ** 6)
+    for mtime, digest in enumerate(['old', 'used', 'new'], start=1):
+        cache.put(digest, {1: 'x' * 100})
+        _age(cache, digest, mtime)
+    # Reading a document from disk marks it recently used.
+    PageCache(str(tmp_path)).get('old')
+
+    cache.max_bytes = 2 * os.path.getsize(cache._path('new'))
+    cache.put('newest', {1: 'x' * 100})
+    assert sorted(os.listdir(tmp_path)) == ['newest.json', 'old.json']
+
+
+def test_prune_keeps_the_file_just_written_even_when_it_alone_is_too_big(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10)
+    cache.put('small', {1: 'x'})
+    cache.put('big', {1: 'x' * 1000})
+    assert os.listdir(tmp_path) == ['big.json']
+
+
+def test_memory_keeps_at_most_max_documents(tmp_path):
+    cache = PageCache(max_documents=2)
+    for digest in 'abc':
+        cache.put(digest, {1: digest})
+    assert cache.get('a') == {}
+    assert cache.get('c') == {1: 'c'}
@@ -0,0 +1,127 @@
+"""Disk-backed upload handling.
+
+Multipart file parts are written straight into named temp files by the
+form parser, and raw request bodies are streamed to disk in fixed-size
+blocks. Decoders get a path, a file handle or a read-only memory map of that
+single on-disk copy. Uploads never sit fully in memory, and temp files are
+removed when the request ends.
+"""
+
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from flask import Request, request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+UPLOAD_TMP_DIR = os.getenv('UPLOAD_TMP_DIR', os.path.join(tempfile.gettempdir(), 'mindflow-uploads'))
+STREAM_BLOCK_SIZE = 1 << 16
+
+os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+
+
+class DiskBackedRequest(Request):
+    """Flask request whose multipart file parts are parsed directly into named temp files."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile('wb+', dir=UPLOAD_TMP_DIR, prefix='upload-', delete=False)
+
+
+def cleanup_request_files(exception=None) -> None:
+    """Teardown hook: delete the temp files backing this request's uploads."""
+    # Only look at files the route actually parsed; don't parse now.
+    files = request.__dict__.get('files')
+    if not files:
+        return
+    for storage in files.values():
+        stream = storage.stream
+        name = getattr(stream, 'name', None)
+        stream.close()
+        if isinstance(name, str) and name.startswith(UPLOAD_TMP_DIR):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+
+@dataclass
+class Upload:
+    path: str
+    size: int
+    filename: Optional[str]
+
+    def open(self):
+        """Open the upload for reading."""
+        return open(self.path, 'rb')
+
+    @contextmanager
+    def memory_map(self) -> Iterator[mmap.mmap]:
+        """Read-only memory map of the upload; pages are loaded lazily by the OS."""
+        with open(self.path, 'rb') as f:
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield view
+            finally:
+                view.close()
+
+
+def _stream_body_to_disk(max_bytes: int, suffix: str) -> str:
+    handle = tempfile.NamedTemporaryFile('wb', dir=UPLOAD_TMP_DIR, prefix='upload-', suffix=suffix, delete=False)
+    size = 0
+    try:
+        with handle:
+            while True:
+                block = request.stream.read(STREAM_BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise RequestEntityTooLarge()
+                handle.write(block)
+    except Exception:
+        os.remove(handle.name)
+        raise
+    return handle.name
+
+
+@contextmanager
+def receive_upload(field: str, max_bytes: int, allow_raw_body: bool = False, suffix: str = '') -> Iterator[Upload]:
+    """Yield the upload in `field` (or the raw body) as a single on-disk copy.
+
+    Raises RequestEntityTooLarge past `max_bytes` and BadRequest when nothing
+    was uploaded. The file is deleted when the block exits.
+    """
+    request.max_content_length = max_bytes
+    if request.content_length is not None and request.content_length > max_bytes:
+        raise RequestEntityTooLarge()
+
+    content_type = request.mimetype or ''
+    if content_type.startswith('multipart/') or content_type == 'application/x-www-form-urlencoded':
+        storage = request.files.get(field)
+        if storage is None or storage.filename == '':
+            raise BadRequest(f"No '{field}' file uploaded")
+        stream = storage.stream
+        stream.flush()
+        path = stream.name
+        try:
+            yield Upload(path=path, size=os.path.getsize(path), filename=storage.filename)
+        finally:
+            stream.close()
+            if os.path.exists(path):
+                os.remove(path)
+        return
+
+    if not allow_raw_body or request.content_length == 0:
+        raise BadRequest('No upload received')
+    path = _stream_body_to_disk(max_bytes, suffix)
+    if os.path.getsize(path) == 0:
+        os.remove(path)
+        raise BadRequest('No upload received')
+    try:
+        yield Upload(path=path, size=os.path.getsize(path), filename=None)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,8 @@
+"""
+MindFlow Jobs Module
+This module runs long ingestion pipelines in the background and tracks their progress.
+"""
+
+from .manager import JobFailed, JobManager, JobProgress, JobQueueFull
+
+__all__ = ['JobFailed', 'JobManager', 'JobProgress', 'JobQueueFull']
@@ -0,0 +1,160 @@
+"""Bounded background execution of long-running pipelines.
+
+A route submits a pipeline function and gets a queued Job back at once.
+The function runs on this process's job pool, at most JOB_WORKERS at a
+time. It reports progress stage by stage through a JobProgress, and each
+change is persisted by the JobStore. Clients poll the job or stream its
+changes from any worker. When JOB_MAX_PENDING jobs are already queued or
+running here, `submit` refuses new ones rather than letting a backlog
+starve interactive requests.
+"""
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from storage import Job, JobStage, JobStore
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', 16))
+PRUNE_EVERY = 100
+
+
+class JobQueueFull(Exception):
+    """Raised when a process already has JOB_MAX_PENDING unfinished jobs."""
+
+
+class JobFailed(Exception):
+    """Raised by a pipeline to fail its job with a client-facing message and HTTP status."""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.status = status
+
+
+class JobProgress:
+    """Handle a pipeline uses to report stage progress; a no-op when run outside a job."""
+
+    def __init__(self, store: Optional[JobStore] = None, job: Optional[Job] = None):
+        self.store = store
+        self.job = job
+
+    def _change(self, name: str, **fields) -> None:
+        if self.job is None:
+            return
+
+        def apply(job: Job) -> None:
+            for stage in job.stages:
+                if stage.name == name:
+                    for key, value in fields.items():
+                        setattr(stage, key, value)
+        self.store.save(self.job, apply)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator['JobProgress']:
+        """Mark a stage running for the duration of the block, then done or failed."""
+        self._change(name, status='running', started_at=time.time())
+        try:
+            yield self
+        except BaseException as e:
+            self._change(name, status='failed', detail=str(e), finished_at=time.time())
+            raise
+        self._change(name, status='done', progress=1.0, finished_at=time.time())
+
+    def update(self, name: str, progress: float, detail: str = '') -> None:
+        self._change(name, progress=round(min(max(progress, 0.0), 1.0), 3), detail=detail)
+
+    def skip(self, name: str, detail: str = '') -> None:
+        self._change(name, status='skipped', detail=detail)
+
+
+class JobManager:
+    """Runs submitted pipelines on a bounded, per-process thread pool."""
+
+    def __init__(self, store: JobStore, max_workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._submitted = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Threads do not survive fork, so each worker builds its own pool on first use.
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            self._executor_pid = os.getpid()
+            self._pending = 0
+        return self._executor
+
+    def submit(self, kind: str, stages: List[str], fn: Callable[[JobProgress], Dict[str, Any]]) -> Job:
+        """Queue `fn` as a job; it returns the job's result and may raise JobFailed."""
+        with self._lock:
+            pool = self._pool()
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs are already queued or running; try again shortly")
+            self._pending += 1
+            self._submitted += 1
+            prune = self._submitted % PRUNE_EVERY == 1
+        if prune:
+            self.store.prune()
+        job = Job(job_id=uuid.uuid4().hex, kind=kind, stages=[JobStage(name) for name in stages])
+        self.store.save(job)
+        snapshot = self.store.get(job.job_id)
+        pool.submit(self._run, job, fn)
+        return snapshot
+
+    def _run(self, job: Job, fn: Callable[[JobProgress], Dict[str, Any]]) -> None:
+        try:
+            self.store.save(job, lambda j: setattr(j, 'status', 'running'))
+            result = fn(JobProgress(self.store, job))
+
+            def succeed(j: Job) -> None:
+                j.status, j.result = 'succeeded', result
+            self.store.save(job, succeed)
+        except Exception as e:
+            if not isinstance(e, JobFailed):
+                traceback.print_exc()
+
+            def fail(j: Job) -> None:
+                j.status, j.error, j.error_status = 'failed', str(e), getattr(e, 'status', 500)
+            self.store.save(job, fail)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """The job once it has finished, or as it stands after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        job = self.store.get(job_id)
+        while job is not None and not job.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            job = self.store.wait_for_change(job_id, job.version, remaining)
+        return job
+
+    def watch(self, job_id: str, heartbeat: float = 15.0) -> Iterator[Optional[Job]]:
+        """Yield the job each time it changes, ending once it has finished.
+
+        Yields None when nothing changed for `heartbeat` seconds, so streams
+        can send a keep-alive.
+        """
+        job = self.store.get(job_id)
+        version = None
+        while job is not None:
+            yield job if job.version != version else None
+            if job.finished:
+                return
+            version = job.version
+            job = self.store.wait_for_change(job_id, version, heartbeat)
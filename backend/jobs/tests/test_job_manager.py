@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from jobs import JobFailed, JobManager, JobQueueFull
+from storage import JobStore
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager(JobStore(str(tmp_path)), max_workers=1, max_pending=1)
+
+
+def test_wait_returns_the_finished_job(manager):
+    job = manager.submit('test', ['work'], lambda progress: {'answer': 42})
+    finished = manager.wait(job.job_id, timeout=5)
+    assert finished.status == 'succeeded'
+    assert finished.result == {'answer': 42}
+
+
+def test_wait_returns_the_running_job_after_the_timeout(manager):
+    release = threading.Event()
+    job = manager.submit('test', ['work'], lambda progress: release.wait(5) and {})
+    assert not manager.wait(job.job_id, timeout=0.05).finished
+    release.set()
+    assert manager.wait(job.job_id, timeout=5).finished
+
+
+def test_failed_job_keeps_its_status(manager):
+    def fail(progress):
+        raise JobFailed('bad input', 400)
+
+    job = manager.wait(manager.submit('test', ['work'], fail).job_id, timeout=5)
+    assert (job.status, job.error, job.error_status) == ('failed', 'bad input', 400)
+
+
+def test_submit_refuses_past_max_pending(manager):
+    release = threading.Event()
+    manager.submit('test', ['work'], lambda progress: release.wait(5) and {})
+    with pytest.raises(JobQueueFull):
+        manager.submit('test', ['work'], lambda progress: {})
+    release.set()
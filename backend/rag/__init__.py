@@ -0,0 +1,41 @@
+"""
+MindFlow RAG Module
+This module contains the retrieval pipeline used to ground answers in uploaded content.
+"""
+
+from .bm25 import BM25Index, tokenize
+from .chunker import Chunk, StreamingChunker, chunk_pages, estimate_tokens
+from .embeddings import GeminiEmbeddings, HashingEmbeddings
+from .index import INDEX_TYPES, IndexConfig, build_index, build_vector_store, set_search_params
+from .hybrid import HybridRetriever, reciprocal_rank_fusion, heuristic_rerank_score
+from .answer_cache import AnswerCache, CachedAnswer
+from .documents import DocumentStore, document_id_for, precompute_document
+from .minhash import MinHasher, deduplicate_questions
+from .question_bank import QuestionBanks
+
+__all__ = [
+    'BM25Index',
+    'tokenize',
+    'Chunk',
+    'StreamingChunker',
+    'chunk_pages',
+    'estimate_tokens',
+    'GeminiEmbeddings',
+    'HashingEmbeddings',
+    'INDEX_TYPES',
+    'IndexConfig',
+    'build_index',
+    'build_vector_store',
+    'set_search_params',
+    'HybridRetriever',
+    'reciprocal_rank_fusion',
+    'heuristic_rerank_score',
+    'AnswerCache',
+    'CachedAnswer',
+    'DocumentStore',
+    'document_id_for',
+    'precompute_document',
+    'MinHasher',
+    'deduplicate_questions',
+    'QuestionBanks'
+]
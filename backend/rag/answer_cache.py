@@ -0,0 +1,115 @@
+"""Exact-match cache of /explain-more answers, shared by every worker.
+
+Students working through the same document repeat each other's questions.
+An answer is kept on disk under the document's state directory (see
+DocumentStore.state_path), one JSON file per normalized question, so a
+repeat is served whichever Gunicorn worker receives it. Only exact repeats
+hit: case, punctuation and spacing are ignored, but paraphrases miss. The
+repo's embeddings do not place paraphrases close together, so there is no
+similarity matching.
+
+Each entry records the version of the retrieval index its answer was
+grounded in. An entry from another version is a miss and is overwritten by
+the next store. Entries expire after ANSWER_CACHE_TTL seconds, and each
+document keeps at most ANSWER_CACHE_MAX_ENTRIES, oldest removed first.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', 24 * 3600))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', 1000))
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def normalize_question(question: str) -> str:
+    return _NON_WORD.sub(' ', question.lower()).strip()
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    version: str
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'question': self.question, 'answer': self.answer, 'version': self.version, 'created_at': self.created_at}
+
+
+class AnswerCache:
+    """Per-document answers keyed by normalized question text, stored with a DocumentStore."""
+
+    def __init__(self, documents: Any, ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.documents = documents
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _directory(self, document_id: str) -> str:
+        directory = self.documents.state_path(document_id, 'answers')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def _path(self, document_id: str, question: str, variant: str) -> str:
+        digest = hashlib.sha256(f"{variant}\n{normalize_question(question)}".encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self._directory(document_id), f"{digest}.json")
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, document_id: str, version: str, question: str, variant: str = '') -> Optional[CachedAnswer]:
+        """The stored answer to this question, if it is fresh and from this index version.
+
+        `variant` separates answers to the same question produced under
+        different settings, such as the retrieval depth.
+        """
+        try:
+            with open(self._path(document_id, question, variant), 'r', encoding='utf-8') as f:
+                entry = CachedAnswer(**json.load(f))
+        except (FileNotFoundError, ValueError, TypeError):
+            self._count(False)
+            return None
+        fresh = entry.version == version and entry.created_at >= time.time() - self.ttl
+        self._count(fresh)
+        return entry if fresh else None
+
+    def store(self, document_id: str, version: str, question: str, answer: str, variant: str = '') -> None:
+        path = self._path(document_id, question, variant)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(CachedAnswer(question, answer, version).to_dict(), f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self._prune(os.path.dirname(path))
+
+    def _prune(self, directory: str) -> None:
+        """Delete the oldest entries beyond `max_entries`."""
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                try:
+                    entries.append((os.stat(os.path.join(directory, name)).st_mtime, name))
+                except FileNotFoundError:
+                    continue
+        for _, name in sorted(entries)[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
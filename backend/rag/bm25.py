@@ -0,0 +1,50 @@
+"""In-memory inverted BM25 index over text chunks."""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[\^'.]\w+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was what when where which who why with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, keeping things like `x^2` and `3.14` whole."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings[term].append((doc_id, frequency))
+        self.average_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def _idf(self, term: str) -> float:
+        document_frequency = len(self.postings.get(term, ()))
+        total = len(self.doc_lengths)
+        return math.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Return up to `k` (doc_id, score) pairs, best first."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_id, frequency in postings:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / (self.average_length or 1)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
@@ -0,0 +1,267 @@
+"""Token-aware, structure-preserving chunking of page streams.
+
+Pages are consumed one at a time. Repeated running headers and footers are
+learned from the first few pages and stripped from the top and bottom lines
+of each page. The remaining text is split into headings, paragraphs and
+sentences, keeping LaTeX spans and table rows intact. Those units are then
+packed greedily into chunks of at most `max_tokens`. A heading starts a new
+chunk and stays in its text; later chunks of the same section are prefixed
+with it. Every chunk records the page and character offset it started at,
+so answers can cite their source.
+"""
+
+import bisect
+import hashlib
+import math
+import re
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Markdown headings, numbered titles ("2.1 Newton's Laws") and all-caps titles.
+# A line ending like a sentence or a clause ("2. Force equals mass times
+# acceleration.", "SOLUTION:") is body text, even when it is short and numbered.
+HEADING_PATTERN = re.compile(r'^(#{1,6}\s+\S.*|\d+(\.\d+)*\.?\s+[A-Z][^.!?;:=$]{0,80}|[A-Z][A-Z0-9 ,&()/-]{2,60})(?<![.!?;:,])$')
+HEADING_MAX_WORDS = 10
+TABLE_ROW_PATTERN = re.compile(r'\|.*\||\S(\t| {3,})\S.*(\t| {3,})\S')
+# Sentence ends followed by whitespace and an uppercase letter, digit or opening bracket.
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9(\[])')
+MATH_SPAN = re.compile(r'\$\$.+?\$\$|\$[^$\n]+?\$|\\\[.+?\\\]', re.DOTALL)
+DIGITS = re.compile(r'\d+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough subword token count (~4 characters per token)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+@dataclass
+class Chunk:
+    text: str
+    page: int
+    page_end: int
+    offset: int
+    section: str
+    tokens: int
+
+    def metadata(self) -> Dict[str, object]:
+        return {
+            'page': self.page,
+            'page_end': self.page_end,
+            'offset': self.offset,
+            'section': self.section
+        }
+
+
+@dataclass
+class _Unit:
+    text: str
+    page: int
+    offset: int
+    tokens: int
+    is_heading: bool = False
+
+
+def _edge_key(line: str) -> str:
+    # Page numbers change from page to page; compare the rest.
+    return DIGITS.sub('#', line.strip().lower())
+
+
+def _split_sentences(paragraph: str) -> List[Tuple[int, str]]:
+    """Split a paragraph at sentence ends that are not inside math spans."""
+    protected = [(m.start(), m.end()) for m in MATH_SPAN.finditer(paragraph)]
+    pieces = []
+    start = 0
+    for boundary in SENTENCE_BOUNDARY.finditer(paragraph):
+        position = boundary.start()
+        if any(low <= position < high for low, high in protected):
+            continue
+        pieces.append((start, paragraph[start:position]))
+        start = boundary.end()
+    pieces.append((start, paragraph[start:]))
+    return [(offset, text) for offset, text in pieces if text.strip()]
+
+
+class StreamingChunker:
+    """Chunks an iterator of (page_number, text) pairs in a single pass."""
+
+    def __init__(
+        self,
+        max_tokens: int = 256,
+        overlap_tokens: int = 32,
+        token_counter: Callable[[str], int] = estimate_tokens,
+        edge_lines: int = 2,
+        learn_pages: int = 4,
+        min_repeats: int = 2
+    ):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = token_counter
+        self.edge_lines = edge_lines
+        self.learn_pages = learn_pages
+        self.min_repeats = min_repeats
+
+    def _edges(self, lines: List[str]) -> List[str]:
+        content = [line for line in lines if line.strip()]
+        return content[:self.edge_lines] + content[-self.edge_lines:]
+
+    def _units(self, page: int, text: str, boilerplate: set) -> Iterator[_Unit]:
+        """Break one page into heading, table and sentence units."""
+        lines = text.splitlines(keepends=True)
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        # Boilerplate is only stripped where running headers and footers sit.
+        edges = set(content[:self.edge_lines] + content[-self.edge_lines:])
+        offset = 0
+        paragraph_lines: List[Tuple[int, str]] = []
+
+        def flush_paragraph():
+            if not paragraph_lines:
+                return
+            # Map positions in the joined paragraph back to page offsets.
+            line_starts = []
+            page_offsets = []
+            parts = []
+            position = 0
+            for line_offset, line in paragraph_lines:
+                stripped_line = line.strip()
+                line_starts.append(position)
+                page_offsets.append(line_offset + len(line) - len(line.lstrip()))
+                parts.append(stripped_line)
+                position += len(stripped_line) + 1
+            paragraph = ' '.join(parts)
+            paragraph_lines.clear()
+            for sentence_offset, sentence in _split_sentences(paragraph):
+                line_index = bisect.bisect_right(line_starts, sentence_offset) - 1
+                page_offset = page_offsets[line_index] + sentence_offset - line_starts[line_index]
+                yield from self._sized_units(sentence.strip(), page, page_offset)
+
+        for i, line in enumerate(lines):
+            line_offset = offset
+            offset += len(line)
+            stripped = line.strip()
+
+            if not stripped:
+                yield from flush_paragraph()
+                continue
+            if i in edges and _edge_key(stripped) in boilerplate:
+                continue
+            if HEADING_PATTERN.match(stripped) and len(stripped.split()) <= HEADING_MAX_WORDS:
+                yield from flush_paragraph()
+                yield _Unit(stripped.lstrip('#').strip(), page, line_offset, self.count_tokens(stripped), is_heading=True)
+                continue
+            if TABLE_ROW_PATTERN.search(stripped):
+                yield from flush_paragraph()
+                yield from self._sized_units(stripped, page, line_offset)
+                continue
+            paragraph_lines.append((line_offset, line))
+
+        yield from flush_paragraph()
+
+    def _sized_units(self, text: str, page: int, offset: int) -> Iterator[_Unit]:
+        """Yield a unit, hard-splitting it by words only when it alone exceeds max_tokens."""
+        tokens = self.count_tokens(text)
+        if tokens <= self.max_tokens:
+            yield _Unit(text, page, offset, tokens)
+            return
+        words = text.split(' ')
+        piece: List[str] = []
+        piece_offset = offset
+        position = offset
+        for word in words:
+            candidate = ' '.join(piece + [word])
+            if piece and self.count_tokens(candidate) > self.max_tokens:
+                joined = ' '.join(piece)
+                yield _Unit(joined, page, piece_offset, self.count_tokens(joined))
+                piece = []
+                piece_offset = position
+            piece.append(word)
+            position += len(word) + 1
+        if piece:
+            joined = ' '.join(piece)
+            yield _Unit(joined, page, piece_offset, self.count_tokens(joined))
+
+    def _page_units(self, pages: Iterable[Tuple[int, str]]) -> Iterator[_Unit]:
+        """Strip learned boilerplate and yield units page by page."""
+        edge_counts: Counter = Counter()
+        boilerplate: set = set()
+        pending: Deque[Tuple[int, str]] = deque()
+
+        def learn(text: str):
+            for key in set(_edge_key(line) for line in self._edges(text.splitlines())):
+                edge_counts[key] += 1
+                if edge_counts[key] >= self.min_repeats:
+                    boilerplate.add(key)
+
+        for page, text in pages:
+            text = text or ''
+            learn(text)
+            pending.append((page, text))
+            if len(pending) > self.learn_pages:
+                yield from self._units(*pending.popleft(), boilerplate)
+        while pending:
+            yield from self._units(*pending.popleft(), boilerplate)
+
+    def chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Chunk]:
+        """Yield deduplicated chunks for the given pages."""
+        seen = set()
+        section = ''
+        current: List[_Unit] = []
+        current_tokens = 0
+
+        def emit() -> Optional[Chunk]:
+            if not current:
+                return None
+            text = ' '.join(unit.text for unit in current)
+            digest = hashlib.sha1(' '.join(text.lower().split()).encode('utf-8')).digest()
+            if digest in seen:
+                return None
+            seen.add(digest)
+            # A chunk that opens with its heading already carries it.
+            prefixed = section and not current[0].is_heading
+            return Chunk(
+                text=f"{section}\n{text}" if prefixed else text,
+                page=current[0].page,
+                page_end=current[-1].page,
+                offset=current[0].offset,
+                section=section,
+                tokens=current_tokens + (self.count_tokens(section) if prefixed else 0)
+            )
+
+        for unit in self._page_units(pages):
+            if unit.is_heading:
+                # Consecutive headings ("Chapter 2", "2.1 Forces") share a chunk.
+                if not all(previous.is_heading for previous in current):
+                    chunk = emit()
+                    if chunk:
+                        yield chunk
+                    current, current_tokens = [], 0
+                section = unit.text
+                current.append(unit)
+                current_tokens += unit.tokens
+                continue
+
+            budget = max(self.max_tokens - (self.count_tokens(section) if section else 0), self.max_tokens // 2)
+            if current and current_tokens + unit.tokens > budget:
+                chunk = emit()
+                if chunk:
+                    yield chunk
+                overlap: List[_Unit] = []
+                overlap_tokens = 0
+                for previous in reversed(current):
+                    if overlap_tokens + previous.tokens > self.overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_tokens += previous.tokens
+                current, current_tokens = overlap, overlap_tokens
+
+            current.append(unit)
+            current_tokens += unit.tokens
+
+        chunk = emit()
+        if chunk:
+            yield chunk
+
+
+def chunk_pages(pages: Iterable[Tuple[int, str]], **kwargs) -> List[Chunk]:
+    """Chunk (page_number, text) pairs with a StreamingChunker."""
+    return list(StreamingChunker(**kwargs).chunks(pages))
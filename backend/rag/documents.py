@@ -0,0 +1,334 @@
+"""Per-document artifacts, computed once when a document is ingested.
+
+Nothing used to be derived from a document until a user asked about it.
+/explain-more embedded and indexed the context on its first request, and
+/interactive-questions sent the whole context to Gemini on every call.
+`precompute_document` now runs as the last ingestion stage and saves
+everything those routes need under DOCUMENT_STORE_DIR/<document_id>/:
+
+- chunks.json: chunk texts and their page/section metadata
+- embeddings.npy: one embedding per chunk
+- index.faiss: the vector index over those embeddings
+- summaries.json: a short summary of each section
+- questions.json: a seed bank of quiz questions, generated section by section
+
+manifest.json is written last, so a document counts as ready only once
+every artifact is on disk. Each save writes a fresh `<document_id>.<n>`
+directory, and `<document_id>` is a symlink swapped atomically onto it, so
+readers never see a half-replaced document. Per-user state such as which
+questions a user has seen lives under DOCUMENT_STORE_DIR/_state/ and
+survives re-precomputation. Document ids are content hashes, so uploading
+the same material again reuses its artifacts.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from agents import Priority, get_llm_client, get_model, request_key
+from .chunker import Chunk, chunk_pages
+from .hybrid import HybridRetriever
+from .index import IndexConfig, build_index
+from .minhash import MinHasher, deduplicate_questions
+
+DOCUMENT_STORE_DIR = os.getenv('DOCUMENT_STORE_DIR', 'documents/')
+DOCUMENT_MAX_SECTIONS = int(os.getenv('DOCUMENT_MAX_SECTIONS', 24))
+DOCUMENT_SECTION_MAX_CHARS = int(os.getenv('DOCUMENT_SECTION_MAX_CHARS', 6000))
+DOCUMENT_QUESTIONS_PER_SECTION = int(os.getenv('DOCUMENT_QUESTIONS_PER_SECTION', 3))
+DOCUMENT_PRECOMPUTE_CONCURRENCY = int(os.getenv('DOCUMENT_PRECOMPUTE_CONCURRENCY', 4))
+ARTIFACT_VERSION = 1
+DOCUMENT_ID = re.compile(r'^[0-9a-f]{24}$')
+
+SUMMARY_PROMPT = """Summarize this section of a course document in 3 to 5 sentences for a student reviewing it. Use LaTeX in dollar signs for mathematical expressions.
+
+Section: {title}
+
+{text}"""
+
+QUESTIONS_PROMPT = """Based on this section of a course document, generate {count} interactive questions to test understanding.
+Format your response as a JSON array of questions, where each question has:
+- question_text: the actual question
+- options: array of 4 possible answers
+- correct_answer: the correct answer
+- explanation: explanation of why this is correct
+{avoid}
+Section: {title}
+
+{text}"""
+AVOID_PROMPT = """Ask about different facts than these existing questions:
+{questions}
+"""
+
+
+def document_id_for(text: str) -> str:
+    """Content-derived id, so re-uploading the same material finds its artifacts."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:24]
+
+
+def question_id_for(question_text: str) -> str:
+    return hashlib.sha1(question_text.encode('utf-8')).hexdigest()[:16]
+
+
+def group_sections(chunks: List[Chunk], max_sections: int = DOCUMENT_MAX_SECTIONS) -> List[Dict[str, Any]]:
+    """Group consecutive chunks by heading, merging neighbours down to `max_sections` groups."""
+    groups: List[List[int]] = []
+    for chunk_id, chunk in enumerate(chunks):
+        if groups and chunks[groups[-1][-1]].section == chunk.section:
+            groups[-1].append(chunk_id)
+        else:
+            groups.append([chunk_id])
+    if len(groups) > max_sections:
+        size = -(-len(groups) // max_sections)
+        groups = [[chunk_id for group in groups[i:i + size] for chunk_id in group] for i in range(0, len(groups), size)]
+    return [{
+        'title': chunks[ids[0]].section or f"Pages {chunks[ids[0]].page}-{chunks[ids[-1]].page_end}",
+        'chunk_ids': ids,
+        'pages': [chunks[ids[0]].page, chunks[ids[-1]].page_end]
+    } for ids in groups]
+
+
+def _section_text(texts: List[str], section: Dict[str, Any]) -> str:
+    return '\n\n'.join(texts[chunk_id] for chunk_id in section['chunk_ids'])[:DOCUMENT_SECTION_MAX_CHARS]
+
+
+def _generate(prompt: str) -> str:
+    model = get_model('gemini-pro')
+    return get_llm_client().call(lambda: model.generate_content(prompt), Priority.BACKGROUND, key=request_key('gemini-pro', prompt)).text
+
+
+def parse_questions(response: str) -> List[Dict[str, Any]]:
+    """The JSON array of questions in a response, keeping only well-formed entries."""
+    start, end = response.find('['), response.rfind(']') + 1
+    if start < 0 or end <= start:
+        return []
+    try:
+        questions = json.loads(response[start:end], strict=False)
+    except json.JSONDecodeError:
+        return []
+    return [
+        question for question in questions
+        if isinstance(question, dict) and question.get('question_text') and question.get('correct_answer')
+    ]
+
+
+def generate_section_questions(texts: List[str], section: Dict[str, Any], count: int = DOCUMENT_QUESTIONS_PER_SECTION, avoid: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Ask Gemini for `count` questions about one section, tagged with where they came from.
+
+    `avoid` lists question texts already in the bank, steering the model toward new material.
+    """
+    avoid_text = AVOID_PROMPT.format(questions='\n'.join(f"- {question}" for question in avoid)) if avoid else ''
+    prompt = QUESTIONS_PROMPT.format(count=count, avoid=avoid_text, title=section['title'], text=_section_text(texts, section))
+    return [
+        {
+            **question,
+            'question_id': question_id_for(question['question_text']),
+            'subtopic': section['title'],
+            'chunk_ids': section['chunk_ids']
+        }
+        for question in parse_questions(_generate(prompt))
+    ]
+
+
+def _summarize_section(texts: List[str], section: Dict[str, Any]) -> Dict[str, Any]:
+    summary = _generate(SUMMARY_PROMPT.format(title=section['title'], text=_section_text(texts, section)))
+    return {**section, 'summary': summary.strip()}
+
+
+class DocumentStore:
+    """Saves and loads precomputed document artifacts, keeping recently used retrievers in memory."""
+
+    def __init__(self, directory: str = DOCUMENT_STORE_DIR, max_loaded: int = 16):
+        self.directory = directory
+        self.max_loaded = max_loaded
+        self._retrievers: 'OrderedDict[str, HybridRetriever]' = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, document_id: str, name: str = '') -> str:
+        return os.path.join(self.directory, document_id, name)
+
+    def state_path(self, document_id: str, name: str) -> str:
+        """Where per-user state for a document lives, outside its replaceable artifacts."""
+        directory = os.path.join(self.directory, '_state', document_id)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    @contextmanager
+    def state_lock(self, document_id: str, name: str) -> Iterator[None]:
+        """Hold an exclusive flock on `<name>.lock` in the document's state directory, across workers."""
+        with open(self.state_path(document_id, f"{name}.lock"), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def read_state(self, document_id: str, name: str) -> Any:
+        """A JSON state file of the document, or None if there is none."""
+        try:
+            with open(self.state_path(document_id, name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_state(self, document_id: str, name: str, value: Any) -> None:
+        """Atomically replace a JSON state file of the document."""
+        path = self.state_path(document_id, name)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _read_json(self, document_id: str, name: str) -> Any:
+        with open(self.path(document_id, name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def manifest(self, document_id: str) -> Optional[Dict[str, Any]]:
+        if not DOCUMENT_ID.match(document_id or ''):
+            return None
+        try:
+            manifest = self._read_json(document_id, 'manifest.json')
+        except (FileNotFoundError, ValueError):
+            return None
+        return manifest if manifest.get('version') == ARTIFACT_VERSION else None
+
+    def exists(self, document_id: str) -> bool:
+        return self.manifest(document_id) is not None
+
+    def save(self, document_id: str, chunks: List[Chunk], vectors: np.ndarray, index: Any, summaries: List[Dict[str, Any]], questions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Write every artifact to a new version directory, then swap the document's symlink onto it."""
+        target = os.path.join(self.directory, document_id)
+        version = f"{document_id}.{time.time_ns()}"
+        staging = os.path.join(self.directory, version)
+        os.makedirs(staging, exist_ok=True)
+
+        def write_json(name: str, value: Any) -> None:
+            with open(os.path.join(staging, name), 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+
+        write_json('chunks.json', [{'text': chunk.text, 'tokens': chunk.tokens, **chunk.metadata()} for chunk in chunks])
+        np.save(os.path.join(staging, 'embeddings.npy'), vectors)
+        faiss.write_index(index, os.path.join(staging, 'index.faiss'))
+        write_json('summaries.json', summaries)
+        write_json('questions.json', questions)
+        manifest = {
+            'version': ARTIFACT_VERSION,
+            'document_id': document_id,
+            'created_at': time.time(),
+            'chunks': len(chunks),
+            'dimensions': int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            'sections': len(summaries),
+            'questions': len(questions)
+        }
+        write_json('manifest.json', manifest)
+
+        previous = os.readlink(target) if os.path.islink(target) else None
+        if os.path.isdir(target) and previous is None:
+            # A directory from before versioned saves; move it aside once so the link can take its name.
+            previous = f"{document_id}.0"
+            os.replace(target, os.path.join(self.directory, previous))
+        link = f"{target}.{os.getpid()}.{threading.get_ident()}.link"
+        os.symlink(version, link)
+        os.replace(link, target)
+        with self._lock:
+            self._retrievers.pop(document_id, None)
+        self._prune_versions(document_id, keep={version, previous})
+        return manifest
+
+    def _prune_versions(self, document_id: str, keep: set) -> None:
+        """Delete finished versions other than `keep`; the previous one stays for readers still using it."""
+        pattern = re.compile(rf'^{document_id}\.\d+$')
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            # A version without a manifest is another save still being written.
+            if pattern.match(name) and name not in keep and os.path.exists(os.path.join(path, 'manifest.json')):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def write_json(self, document_id: str, name: str, value: Any) -> None:
+        """Atomically replace one JSON artifact of a saved document."""
+        path = self.path(document_id, name)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def chunks(self, document_id: str) -> List[Dict[str, Any]]:
+        return self._read_json(document_id, 'chunks.json')
+
+    def summaries(self, document_id: str) -> List[Dict[str, Any]]:
+        return self._read_json(document_id, 'summaries.json')
+
+    def questions(self, document_id: str) -> List[Dict[str, Any]]:
+        return self._read_json(document_id, 'questions.json')
+
+    def retriever(self, document_id: str, embeddings: Any) -> Optional[HybridRetriever]:
+        """The document's retriever, loaded from its saved index; None if it was never precomputed."""
+        with self._lock:
+            retriever = self._retrievers.get(document_id)
+            if retriever is not None:
+                self._retrievers.move_to_end(document_id)
+                return retriever
+        if not self.exists(document_id):
+            return None
+        chunks = self.chunks(document_id)
+        index = faiss.read_index(self.path(document_id, 'index.faiss'))
+        retriever = HybridRetriever.from_index(
+            [chunk['text'] for chunk in chunks],
+            embeddings,
+            index,
+            metadatas=[{key: value for key, value in chunk.items() if key not in ('text', 'tokens')} for chunk in chunks]
+        )
+        with self._lock:
+            self._retrievers[document_id] = retriever
+            while len(self._retrievers) > self.max_loaded:
+                self._retrievers.popitem(last=False)
+        return retriever
+
+
+def precompute_document(
+    store: DocumentStore,
+    document_id: str,
+    pages: List[Tuple[int, str]],
+    embeddings: Any,
+    index_config: Optional[IndexConfig] = None,
+    max_tokens: int = 256,
+    report: Optional[Callable[[float, str], None]] = None
+) -> Dict[str, Any]:
+    """Build and save chunks, embeddings, index, section summaries and seed questions for a document."""
+    report = report or (lambda progress, detail: None)
+    chunks = chunk_pages(pages, max_tokens=max_tokens)
+    if not chunks:
+        raise ValueError('The document has no text to index')
+    texts = [chunk.text for chunk in chunks]
+    report(0.05, f"{len(chunks)} chunks")
+
+    vectors = np.array(embeddings.embed_documents(texts), dtype='float32')
+    report(0.5, f"{len(chunks)} chunks embedded")
+    index = build_index(vectors, index_config or IndexConfig())
+
+    sections = group_sections(chunks)
+    summaries: List[Dict[str, Any]] = [{}] * len(sections)
+    questions: List[List[Dict[str, Any]]] = [[] for _ in sections]
+    with ThreadPoolExecutor(max_workers=DOCUMENT_PRECOMPUTE_CONCURRENCY, thread_name_prefix='precompute') as pool:
+        summary_futures = [pool.submit(_summarize_section, texts, section) for section in sections]
+        question_futures = [pool.submit(generate_section_questions, texts, section) for section in sections]
+        for i, (summary, question) in enumerate(zip(summary_futures, question_futures)):
+            summaries[i] = summary.result()
+            try:
+                questions[i] = question.result()
+            except Exception as e:
+                # A section without seed questions is filled on demand later.
+                print(f"Error generating seed questions for '{sections[i]['title']}': {e}")
+            report(0.5 + 0.45 * (i + 1) / len(sections), f"{i + 1} of {len(sections)} sections summarized")
+
+    seeds = deduplicate_questions([question for batch in questions for question in batch], MinHasher())
+    return store.save(document_id, chunks, vectors, index, summaries, seeds)
@@ -0,0 +1,61 @@
+"""Embedding backends for the retrieval pipeline."""
+
+import hashlib
+import math
+import os
+from typing import List
+
+import google.generativeai as genai
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from agents import Priority, get_llm_client, get_model, request_key
+from .bm25 import tokenize
+
+
+class GeminiEmbeddings(Embeddings):
+    def __init__(self):
+        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+        self.model = get_model('gemini-pro')
+        self.llm = get_llm_client()
+
+    def embed_documents(self, texts: List[str], priority: Priority = Priority.BULK) -> List[List[float]]:
+        """Generate embeddings for a list of documents."""
+        embeddings = []
+        for text in texts:
+            prompt = f"Convert this text into a numerical embedding representation (return only the numbers, comma-separated): {text}"
+            response = self.llm.call(lambda: self.model.generate_content(prompt), priority, key=request_key('gemini-pro', prompt))
+            try:
+                numbers = [float(num) for num in response.text.strip('[]').split(',')]
+                while len(numbers) < 512:
+                    numbers.append(0.0)
+                embeddings.append(numbers[:512])
+            except Exception as e:
+                print(f"Error creating embedding: {e}")
+                embeddings.append(np.random.rand(512).tolist())
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        """Generate embedding for a single piece of text."""
+        return self.embed_documents([text], Priority.INTERACTIVE)[0]
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words feature hashing; an offline baseline for evaluation."""
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single piece of text."""
+        vector = [0.0] * self.dimensions
+        for token in tokenize(text):
+            digest = hashlib.md5(token.encode('utf-8')).digest()
+            index = int.from_bytes(digest[:4], 'little') % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of documents."""
+        return [self.embed_query(text) for text in texts]
@@ -0,0 +1,109 @@
+"""Hybrid lexical + dense retrieval with reciprocal rank fusion and reranking."""
+
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .bm25 import BM25Index, tokenize
+from .index import IndexConfig, build_vector_store, vector_store_from_index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], rrf_k: int = 60) -> Dict[int, float]:
+    """Fuse several ranked lists of doc ids into one score per id."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return scores
+
+
+def heuristic_rerank_score(query: str, text: str) -> float:
+    """Cheap relevance signal: query-term coverage plus exact bigram matches."""
+    query_terms = tokenize(query)
+    if not query_terms:
+        return 0.0
+    text_terms = tokenize(text)
+    text_vocabulary = set(text_terms)
+    coverage = sum(1 for term in set(query_terms) if term in text_vocabulary) / len(set(query_terms))
+
+    query_bigrams = set(zip(query_terms, query_terms[1:]))
+    if not query_bigrams:
+        return coverage
+    text_bigrams = set(zip(text_terms, text_terms[1:]))
+    phrase_matches = len(query_bigrams & text_bigrams) / len(query_bigrams)
+    return coverage + 0.5 * phrase_matches
+
+
+def _with_chunk_ids(texts: List[str], metadatas: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    return [
+        {**(metadatas[i] if metadatas else {}), 'chunk_id': i}
+        for i in range(len(texts))
+    ]
+
+
+class HybridRetriever:
+    """Retrieves chunks with BM25 and a vector store, fused with RRF and reranked.
+
+    The vector store must be built from the same `texts` in the same order with
+    a `chunk_id` metadata field, which `from_texts` takes care of.
+    """
+
+    def __init__(
+        self,
+        texts: List[str],
+        vector_store: Any,
+        candidates: int = 20,
+        rrf_k: int = 60,
+        rerank_weight: float = 0.02,
+        reranker: Optional[Callable[[str, str], float]] = heuristic_rerank_score
+    ):
+        self.texts = texts
+        self.vector_store = vector_store
+        self.bm25 = BM25Index(texts)
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.rerank_weight = rerank_weight
+        self.reranker = reranker
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the indexed chunks; it changes whenever the document's index does."""
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for text in self.texts:
+                digest.update(text.encode('utf-8'))
+                digest.update(b'\0')
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embeddings: Any, metadatas: Optional[List[Dict[str, Any]]] = None, index_config: Optional[IndexConfig] = None, vectors: Any = None, **kwargs) -> 'HybridRetriever':
+        """Build the BM25 index and a FAISS store over the same chunks; pass `vectors` if they are already embedded."""
+        return cls(texts, build_vector_store(texts, embeddings, _with_chunk_ids(texts, metadatas), index_config, vectors), **kwargs)
+
+    @classmethod
+    def from_index(cls, texts: List[str], embeddings: Any, index: Any, metadatas: Optional[List[Dict[str, Any]]] = None, **kwargs) -> 'HybridRetriever':
+        """Rebuild a retriever around a saved FAISS index of the same chunks."""
+        return cls(texts, vector_store_from_index(texts, embeddings, index, _with_chunk_ids(texts, metadatas)), **kwargs)
+
+    def _dense_ranking(self, query: str, query_embedding: Optional[List[float]] = None) -> List[int]:
+        if query_embedding is not None:
+            documents = self.vector_store.similarity_search_by_vector(query_embedding, k=self.candidates)
+        else:
+            documents = self.vector_store.similarity_search(query, k=self.candidates)
+        return [doc.metadata['chunk_id'] for doc in documents if 'chunk_id' in doc.metadata]
+
+    def _lexical_ranking(self, query: str) -> List[int]:
+        return [doc_id for doc_id, _ in self.bm25.search(query, self.candidates)]
+
+    def retrieve_ids(self, query: str, k: int, query_embedding: Optional[List[float]] = None) -> List[int]:
+        """Return the ids of the `k` best chunks for the query; pass its embedding if already computed."""
+        fused = reciprocal_rank_fusion([self._dense_ranking(query, query_embedding), self._lexical_ranking(query)], self.rrf_k)
+        if self.reranker is not None:
+            for doc_id in fused:
+                fused[doc_id] += self.rerank_weight * self.reranker(query, self.texts[doc_id])
+        return sorted(fused, key=fused.get, reverse=True)[:k]
+
+    def retrieve(self, query: str, k: int, query_embedding: Optional[List[float]] = None) -> List[str]:
+        """Return the text of the `k` best chunks for the query."""
+        return [self.texts[doc_id] for doc_id in self.retrieve_ids(query, k, query_embedding)]
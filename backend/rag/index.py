@@ -0,0 +1,142 @@
+"""Configurable FAISS index types for the vector store.
+
+The flat index is exact but costs O(n) memory and time per query. For large
+course libraries the approximate variants trade a little recall for much
+smaller, faster indexes:
+
+- ``ivf_flat``: inverted lists over k-means cells, full vectors
+- ``ivf_pq``: inverted lists with product-quantized codes
+- ``ivf_sq8``: inverted lists with 8-bit scalar-quantized vectors
+- ``hnsw``: graph index, no training needed
+- ``sq8``: flat scan over 8-bit scalar-quantized vectors
+"""
+
+import math
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'ivf_sq8', 'hnsw', 'sq8')
+# FAISS wants roughly this many training points per IVF cell.
+MIN_POINTS_PER_CELL = 39
+
+
+@dataclass
+class IndexConfig:
+    index_type: str = 'flat'
+    nlist: Optional[int] = None
+    nprobe: int = 8
+    pq_m: int = 16
+    pq_bits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    train_sample: int = 100_000
+
+    @classmethod
+    def from_env(cls) -> 'IndexConfig':
+        """Read the index configuration from RAG_INDEX_* environment variables."""
+        nlist = os.getenv('RAG_INDEX_NLIST')
+        return cls(
+            index_type=os.getenv('RAG_INDEX_TYPE', 'flat'),
+            nlist=int(nlist) if nlist else None,
+            nprobe=int(os.getenv('RAG_INDEX_NPROBE', 8)),
+            pq_m=int(os.getenv('RAG_INDEX_PQ_M', 16)),
+            hnsw_m=int(os.getenv('RAG_INDEX_HNSW_M', 32)),
+            ef_search=int(os.getenv('RAG_INDEX_EF_SEARCH', 64))
+        )
+
+
+def _nlist_for(config: IndexConfig, count: int) -> int:
+    if config.nlist:
+        return config.nlist
+    return max(1, min(int(4 * math.sqrt(count)), count // MIN_POINTS_PER_CELL))
+
+
+def _pq_m_for(config: IndexConfig, dimensions: int) -> int:
+    m = min(config.pq_m, dimensions)
+    while dimensions % m:
+        m -= 1
+    return m
+
+
+def factory_string(config: IndexConfig, dimensions: int, count: int) -> str:
+    """Translate a config into a faiss.index_factory description."""
+    if config.index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{config.index_type}', expected one of {INDEX_TYPES}")
+    if config.index_type == 'flat':
+        return 'Flat'
+    if config.index_type == 'sq8':
+        return 'SQ8'
+    if config.index_type == 'hnsw':
+        return f'HNSW{config.hnsw_m}'
+
+    nlist = _nlist_for(config, count)
+    if config.index_type == 'ivf_flat':
+        return f'IVF{nlist},Flat'
+    if config.index_type == 'ivf_sq8':
+        return f'IVF{nlist},SQ8'
+    return f'IVF{nlist},PQ{_pq_m_for(config, dimensions)}x{config.pq_bits}'
+
+
+def set_search_params(index: Any, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Tune recall/speed of an already built index at query time."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    hnsw = getattr(index, 'hnsw', None)
+    if hnsw is not None and ef_search is not None:
+        hnsw.efSearch = ef_search
+
+
+def build_index(vectors: np.ndarray, config: IndexConfig) -> Any:
+    """Build, train (on a sample) and fill an index for the given vectors."""
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    count, dimensions = vectors.shape
+    description = factory_string(config, dimensions, count)
+    needs_training = description.startswith('IVF') or 'PQ' in description or 'SQ' in description
+
+    if description.startswith('IVF') and count < MIN_POINTS_PER_CELL:
+        print(f"Only {count} vectors, too few to train '{description}'; using a flat index")
+        description, needs_training = 'Flat', False
+
+    index = faiss.index_factory(dimensions, description)
+    if description.startswith('HNSW'):
+        index.hnsw.efConstruction = config.ef_construction
+
+    if needs_training:
+        if count > config.train_sample:
+            sample = vectors[np.random.default_rng(0).choice(count, config.train_sample, replace=False)]
+        else:
+            sample = vectors
+        index.train(sample)
+
+    index.add(vectors)
+    set_search_params(index, nprobe=config.nprobe, ef_search=config.ef_search)
+    return index
+
+
+def build_vector_store(texts: List[str], embeddings: Any, metadatas: Optional[List[Dict[str, Any]]] = None, config: Optional[IndexConfig] = None, vectors: Optional[np.ndarray] = None) -> Any:
+    """Embed texts (unless `vectors` are given) and wrap the configured index in a LangChain FAISS store."""
+    config = config or IndexConfig()
+    if vectors is None:
+        vectors = np.array(embeddings.embed_documents(texts), dtype='float32')
+    return vector_store_from_index(texts, embeddings, build_index(vectors, config), metadatas)
+
+
+def vector_store_from_index(texts: List[str], embeddings: Any, index: Any, metadatas: Optional[List[Dict[str, Any]]] = None) -> Any:
+    """Wrap an already built index whose rows are `texts`, in order, in a LangChain FAISS store."""
+    from langchain.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_core.documents import Document
+
+    ids = [str(uuid.uuid4()) for _ in texts]
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=text, metadata=(metadatas[i] if metadatas else {}))
+        for i, (doc_id, text) in enumerate(zip(ids, texts))
+    })
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
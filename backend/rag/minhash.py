@@ -0,0 +1,61 @@
+"""MinHash near-duplicate detection for short texts such as quiz questions."""
+
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+QUESTION_DEDUP_THRESHOLD = float(os.getenv('QUESTION_DEDUP_THRESHOLD', 0.5))
+
+_MERSENNE_31 = (1 << 31) - 1
+_WORD = re.compile(r'\w+')
+
+
+class MinHasher:
+    """MinHash signatures of word-bigram sets; matching slots estimate Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 2, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.shingle_size = shingle_size
+        # 31-bit hashes and coefficients keep a * h + b inside uint64.
+        self.a = rng.integers(1, _MERSENNE_31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE_31, num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> Set[str]:
+        words = _WORD.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return set(words)
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self.shingles(text) or {''}
+        hashes = np.array([
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little') & _MERSENNE_31
+            for shingle in shingles
+        ], dtype=np.uint64)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE_31).min(axis=1)
+
+    @staticmethod
+    def similarity(signatures: np.ndarray, signature: np.ndarray) -> np.ndarray:
+        """Estimated Jaccard similarity of `signature` to each row of `signatures`."""
+        return (signatures == signature).mean(axis=1)
+
+
+def deduplicate_questions(
+    questions: List[Dict[str, Any]],
+    hasher: MinHasher,
+    threshold: float = QUESTION_DEDUP_THRESHOLD,
+    existing: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    """Drop questions that near-duplicate an `existing` signature or an earlier question in the list."""
+    signatures = existing if existing is not None else np.empty((0, len(hasher.a)), dtype=np.uint64)
+    kept = []
+    for question in questions:
+        signature = hasher.signature(question['question_text'])
+        if len(signatures) and MinHasher.similarity(signatures, signature).max() >= threshold:
+            continue
+        signatures = np.vstack([signatures, signature])
+        kept.append(question)
+    return kept
@@ -0,0 +1,302 @@
+"""Per-document question banks for /interactive-questions.
+
+Every precomputed document keeps its generated questions in questions.json.
+Each question records the subtopic (section) and chunks it came from. A
+quiz request is served from questions this user has not seen yet, taken
+round-robin across subtopics. What each user was served is appended to
+the document's seen.jsonl, kept with its per-user state so it survives
+re-precomputation.
+
+Banks are shared by every worker process. Before serving or merging, a
+worker re-reads whatever changed on disk: questions.json when its stamp
+(inode, size, mtime) moves, and seen.jsonl from where it last stopped.
+Serving holds an exclusive flock on seen.jsonl, and merging new questions
+holds one on the document's questions.lock. Once seen.jsonl holds more than
+SEEN_COMPACT_FACTOR lines per user, the reader that notices rewrites it
+to one line per user.
+
+Serving never calls the model. A bank short of unseen questions serves
+what it has, and the caller generates the rest and banks them with `add`.
+When a user has fewer than QUESTION_BANK_LOW_WATER unseen questions left,
+a background refill generates another batch. It targets the sections with the fewest questions
+and shows the model what is already in the bank. A MinHash signature over
+word bigrams screens every new question. Anything whose estimated Jaccard
+similarity to a banked question reaches QUESTION_DEDUP_THRESHOLD is dropped
+as a near-duplicate, so rephrasings of old questions never enter the bank.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .documents import DOCUMENT_QUESTIONS_PER_SECTION, DocumentStore, generate_section_questions, question_id_for
+from .minhash import QUESTION_DEDUP_THRESHOLD, MinHasher, deduplicate_questions
+
+QUESTION_BANK_LOW_WATER = int(os.getenv('QUESTION_BANK_LOW_WATER', 6))
+QUESTION_BANK_REFILL_SECTIONS = int(os.getenv('QUESTION_BANK_REFILL_SECTIONS', 3))
+QUESTION_BANK_MAX_QUESTIONS = int(os.getenv('QUESTION_BANK_MAX_QUESTIONS', 500))
+SEEN_COMPACT_FACTOR = 8
+SEEN_COMPACT_MIN_LINES = 64
+
+
+class _Bank:
+    def __init__(self, hasher: MinHasher):
+        self.hasher = hasher
+        self.questions: List[Dict[str, Any]] = []
+        self.signatures = np.zeros((0, len(hasher.a)), dtype=np.uint64)
+        self.questions_stamp: Optional[Tuple[int, int, int]] = None
+        self.seen: Dict[str, Set[str]] = {}
+        self.seen_inode: Optional[int] = None
+        self.seen_offset = 0
+        self.seen_lines = 0
+        self.lock = threading.Lock()
+        self.refilling = False
+
+    def set_questions(self, questions: List[Dict[str, Any]], stamp: Optional[Tuple[int, int, int]]) -> None:
+        self.questions = questions
+        self.signatures = np.array([self.hasher.signature(question['question_text']) for question in questions], dtype=np.uint64).reshape(len(questions), len(self.hasher.a))
+        self.questions_stamp = stamp
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+@contextmanager
+def _flocked(path: str) -> Iterator[BinaryIO]:
+    """Open `path` for appending under an exclusive flock.
+
+    Compaction replaces the file, so after taking the lock we make sure the
+    handle still refers to the current file and reopen if it does not.
+    """
+    while True:
+        with open(path, 'a+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                current = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                yield f
+                return
+
+
+class QuestionBanks:
+    """Serves unseen questions per user from each document's bank and keeps the banks topped up."""
+
+    def __init__(self, store: DocumentStore, threshold: float = QUESTION_DEDUP_THRESHOLD, low_water: int = QUESTION_BANK_LOW_WATER, max_loaded: int = 32):
+        self.store = store
+        self.threshold = threshold
+        self.low_water = low_water
+        self.max_loaded = max_loaded
+        self.hasher = MinHasher()
+        self._banks: 'OrderedDict[str, _Bank]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+    def _refill_pool(self) -> ThreadPoolExecutor:
+        # Threads do not survive fork, so each worker starts its own refill thread.
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='question-refill')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _bank(self, document_id: str) -> Optional[_Bank]:
+        if not self.store.exists(document_id):
+            return None
+        with self._lock:
+            bank = self._banks.get(document_id)
+            if bank is None:
+                bank = self._banks[document_id] = _Bank(self.hasher)
+                while len(self._banks) > self.max_loaded:
+                    self._banks.popitem(last=False)
+            self._banks.move_to_end(document_id)
+            return bank
+
+    def _sync_questions(self, document_id: str, bank: _Bank) -> None:
+        """Reload questions.json if another worker or a re-precompute replaced it; caller holds bank.lock."""
+        stamp = _stamp(self.store.path(document_id, 'questions.json'))
+        if stamp != bank.questions_stamp:
+            bank.set_questions(self.store.questions(document_id), stamp)
+
+    @staticmethod
+    def _sync_seen(bank: _Bank, log: BinaryIO) -> None:
+        """Read the lines other workers appended to seen.jsonl since our last read; caller holds its flock."""
+        inode = os.fstat(log.fileno()).st_ino
+        log.seek(0, os.SEEK_END)
+        if inode != bank.seen_inode or log.tell() < bank.seen_offset:
+            bank.seen, bank.seen_inode, bank.seen_offset, bank.seen_lines = {}, inode, 0, 0
+        log.seek(bank.seen_offset)
+        for line in log:
+            if not line.endswith(b'\n'):
+                break
+            bank.seen_offset += len(line)
+            bank.seen_lines += 1
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            bank.seen.setdefault(entry['user'], set()).update(entry['questions'])
+
+    def _compact_seen(self, document_id: str, bank: _Bank) -> None:
+        """Rewrite seen.jsonl to one line per user once it has grown far past that; caller holds its flock."""
+        if bank.seen_lines < max(SEEN_COMPACT_MIN_LINES, SEEN_COMPACT_FACTOR * len(bank.seen)):
+            return
+        path = self.store.state_path(document_id, 'seen.jsonl')
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as compacted:
+            for user, ids in bank.seen.items():
+                compacted.write((json.dumps({'user': user, 'questions': sorted(ids), 'at': time.time()}) + '\n').encode('utf-8'))
+            size = compacted.tell()
+        os.replace(temp_path, path)
+        bank.seen_inode, bank.seen_offset, bank.seen_lines = os.stat(path).st_ino, size, len(bank.seen)
+
+    @staticmethod
+    def _record_seen(bank: _Bank, log: BinaryIO, user_id: str, ids: List[str]) -> None:
+        """Mark questions as served to a user; caller holds the flock on seen.jsonl."""
+        bank.seen.setdefault(user_id, set()).update(ids)
+        log.write((json.dumps({'user': user_id, 'questions': ids, 'at': time.time()}) + '\n').encode('utf-8'))
+        log.flush()
+        bank.seen_offset = log.tell()
+        bank.seen_lines += 1
+
+    def serve(self, document_id: str, user_id: str, count: int = 3) -> Optional[List[Dict[str, Any]]]:
+        """Up to `count` questions this user has not seen; fewer when the bank is running short.
+
+        None if the document has no bank. Never calls the model; a short bank
+        schedules a background refill, and the caller tops up the rest itself
+        and banks them with `add`.
+        """
+        bank = self._bank(document_id)
+        if bank is None:
+            return None
+
+        with bank.lock, _flocked(self.store.state_path(document_id, 'seen.jsonl')) as log:
+            self._sync_questions(document_id, bank)
+            self._sync_seen(bank, log)
+            unseen = self._unseen(bank, user_id)
+            picked = _round_robin(unseen, count, offset=len(bank.seen.get(user_id, ())))
+            if picked:
+                self._record_seen(bank, log, user_id, [question['question_id'] for question in picked])
+            # Last, since it replaces the file this handle writes to.
+            self._compact_seen(document_id, bank)
+            remaining = len(unseen) - len(picked)
+        if remaining < self.low_water:
+            self.schedule_refill(document_id)
+        return picked
+
+    def add(self, document_id: str, questions: List[Dict[str, Any]], user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Bank questions generated outside a refill, marking them seen by `user_id`; returns the ones added.
+
+        Malformed questions and near-duplicates of banked ones are dropped.
+        """
+        bank = self._bank(document_id)
+        if bank is None:
+            return []
+        candidates = [
+            {**question, 'question_id': question_id_for(question['question_text']), 'subtopic': question.get('subtopic', '')}
+            for question in questions
+            if isinstance(question, dict) and question.get('question_text') and question.get('correct_answer')
+        ]
+        with bank.lock:
+            with _flocked(self.store.state_path(document_id, 'questions.lock')):
+                self._sync_questions(document_id, bank)
+                known = {question['question_id'] for question in bank.questions}
+                added = deduplicate_questions([question for question in candidates if question['question_id'] not in known], self.hasher, self.threshold, bank.signatures)
+                added = added[:max(0, QUESTION_BANK_MAX_QUESTIONS - len(bank.questions))]
+                if added:
+                    self.store.write_json(document_id, 'questions.json', bank.questions + added)
+                    bank.set_questions(bank.questions + added, _stamp(self.store.path(document_id, 'questions.json')))
+            if added and user_id is not None:
+                with _flocked(self.store.state_path(document_id, 'seen.jsonl')) as log:
+                    self._sync_seen(bank, log)
+                    self._record_seen(bank, log, user_id, [question['question_id'] for question in added])
+        return added
+
+    @staticmethod
+    def _unseen(bank: _Bank, user_id: str) -> List[Dict[str, Any]]:
+        seen = bank.seen.get(user_id, set())
+        return [question for question in bank.questions if question['question_id'] not in seen]
+
+    def _claim_refill(self, bank: _Bank) -> bool:
+        with bank.lock:
+            if bank.refilling or len(bank.questions) >= QUESTION_BANK_MAX_QUESTIONS:
+                return False
+            bank.refilling = True
+            return True
+
+    def schedule_refill(self, document_id: str) -> None:
+        """Refill the bank on the background thread unless a refill is already running."""
+        bank = self._bank(document_id)
+        if bank is not None and self._claim_refill(bank):
+            self._refill_pool().submit(self._refill, document_id, bank)
+
+    def refill(self, document_id: str) -> int:
+        """Generate a batch for the least-covered sections and bank the new questions; returns how many were added."""
+        bank = self._bank(document_id)
+        if bank is None or not self._claim_refill(bank):
+            return 0
+        return self._refill(document_id, bank)
+
+    def _refill(self, document_id: str, bank: _Bank) -> int:
+        try:
+            with bank.lock:
+                self._sync_questions(document_id, bank)
+                per_section: Dict[str, List[str]] = {}
+                for question in bank.questions:
+                    per_section.setdefault(question.get('subtopic', ''), []).append(question['question_text'])
+            texts = [chunk['text'] for chunk in self.store.chunks(document_id)]
+            sections = sorted(self.store.summaries(document_id), key=lambda section: len(per_section.get(section['title'], [])))
+            candidates = []
+            for section in sections[:QUESTION_BANK_REFILL_SECTIONS]:
+                try:
+                    candidates.extend(generate_section_questions(texts, section, DOCUMENT_QUESTIONS_PER_SECTION, per_section.get(section['title'], [])[-10:]))
+                except Exception as e:
+                    print(f"Error refilling questions for '{section['title']}': {e}")
+            # Merge against the bank as it is on disk now; another worker may have refilled meanwhile.
+            with bank.lock, _flocked(self.store.state_path(document_id, 'questions.lock')):
+                self._sync_questions(document_id, bank)
+                known = {question['question_id'] for question in bank.questions}
+                added = deduplicate_questions([question for question in candidates if question['question_id'] not in known], self.hasher, self.threshold, bank.signatures)
+                if added:
+                    self.store.write_json(document_id, 'questions.json', bank.questions + added)
+                    bank.set_questions(bank.questions + added, _stamp(self.store.path(document_id, 'questions.json')))
+            print(f"Question bank {document_id}: {len(added)} of {len(candidates)} generated questions added")
+            return len(added)
+        except Exception as e:
+            print(f"Error refilling question bank {document_id}: {e}")
+            return 0
+        finally:
+            with bank.lock:
+                bank.refilling = False
+
+
+def _round_robin(questions: List[Dict[str, Any]], count: int, offset: int = 0) -> List[Dict[str, Any]]:
+    """Take questions alternating across subtopics, starting at a user-specific subtopic."""
+    by_subtopic: 'OrderedDict[str, List[Dict[str, Any]]]' = OrderedDict()
+    for question in questions:
+        by_subtopic.setdefault(question.get('subtopic', ''), []).append(question)
+    queues = list(by_subtopic.values())
+    if not queues:
+        return []
+    queues = queues[offset % len(queues):] + queues[:offset % len(queues)]
+    picked: List[Dict[str, Any]] = []
+    while len(picked) < count and any(queues):
+        for queue in queues:
+            if queue and len(picked) < count:
+                picked.append(queue.pop(0))
+    return picked
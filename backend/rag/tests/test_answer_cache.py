@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from rag.answer_cache import AnswerCache
+from rag.documents import DocumentStore
+
+DOCUMENT = 'a' * 24
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentStore(str(tmp_path))
+
+
+def test_exact_repeat_hits_across_instances(store):
+    AnswerCache(store).store(DOCUMENT, 'v1', 'What is momentum?', 'Mass times velocity.')
+    cached = AnswerCache(store).lookup(DOCUMENT, 'v1', '  what is MOMENTUM ')
+    assert cached is not None and cached.answer == 'Mass times velocity.'
+
+
+def test_paraphrase_and_other_version_miss(store):
+    cache = AnswerCache(store)
+    cache.store(DOCUMENT, 'v1', 'What is momentum?', 'Mass times velocity.')
+    assert cache.lookup(DOCUMENT, 'v1', 'Define momentum') is None
+    assert cache.lookup(DOCUMENT, 'v2', 'What is momentum?') is None
+    assert cache.stats() == {'hits': 0, 'misses': 2}
+
+
+def test_variants_are_kept_apart(store):
+    cache = AnswerCache(store)
+    cache.store(DOCUMENT, 'v1', 'q', 'shallow', 'k=2')
+    assert cache.lookup(DOCUMENT, 'v1', 'q', 'k=4') is None
+    assert cache.lookup(DOCUMENT, 'v1', 'q', 'k=2').answer == 'shallow'
+
+
+def test_expired_entries_miss(store):
+    cache = AnswerCache(store, ttl=-1)
+    cache.store(DOCUMENT, 'v1', 'q', 'a')
+    assert cache.lookup(DOCUMENT, 'v1', 'q') is None
+
+
+def test_store_prunes_beyond_max_entries(store):
+    cache = AnswerCache(store, max_entries=3)
+    for i in range(5):
+        cache.store(DOCUMENT, 'v1', f"question {i}", str(i))
+    assert len(os.listdir(store.state_path(DOCUMENT, 'answers'))) == 3
@@ -0,0 +1,59 @@
+from rag.chunker import HEADING_PATTERN, _split_sentences, chunk_pages
+
+TOPICS = ['inertia', 'momentum', 'friction', 'gravity', 'torque']
+
+
+def _body(topic):
+    return '\n'.join(f"Line {i} explains how {topic} shapes motion in example {topic} {i}." for i in range(6))
+
+
+def test_headings_are_short_titles_not_numbered_sentences():
+    assert HEADING_PATTERN.match("2.1 Newton's Laws")
+    assert HEADING_PATTERN.match('## Momentum')
+    assert HEADING_PATTERN.match('KINEMATICS')
+    assert not HEADING_PATTERN.match('2. Force equals mass times acceleration.')
+    assert not HEADING_PATTERN.match('SOLUTION:')
+
+
+def test_sentences_do_not_split_inside_math():
+    pieces = [text for _, text in _split_sentences('We have $v = 2.5 m/s. Then$ it stops. Next it moves.')]
+    assert pieces == ['We have $v = 2.5 m/s. Then$ it stops.', 'Next it moves.']
+
+
+def test_chunks_respect_the_token_budget_and_record_their_page():
+    chunks = chunk_pages([(1, _body('inertia') * 2), (2, _body('momentum') * 2)], max_tokens=64, overlap_tokens=0)
+    assert len(chunks) > 2
+    assert all(chunk.tokens <= 64 for chunk in chunks)
+    assert chunks[0].page == 1 and chunks[-1].page_end == 2
+
+
+def test_later_chunks_of_a_section_carry_its_heading():
+    text = '1 Forces\n' + 'A force changes the motion of a body in a measurable way. ' * 12
+    chunks = chunk_pages([(1, text)], max_tokens=48, overlap_tokens=0)
+    assert chunks[0].text.startswith('1 Forces')
+    assert all(chunk.section == '1 Forces' for chunk in chunks)
+    assert all(chunk.text.startswith('1 Forces\n') for chunk in chunks[1:])
+
+
+def test_running_headers_and_page_numbers_are_stripped():
+    pages = [
+        (number, f"Physics Notes\n\n{_body(topic)}\n\nPage {number}")
+        for number, topic in enumerate(TOPICS, start=1)
+    ]
+    text = ' '.join(chunk.text for chunk in chunk_pages(pages))
+    assert 'Physics Notes' not in text
+    assert 'Page 3' not in text
+    assert 'friction shapes motion' in text
+
+
+def test_offsets_point_at_the_chunk_start_on_its_page():
+    page = 'Intro line.\n\nSecond paragraph starts here. It goes on.'
+    chunks = chunk_pages([(1, page)], max_tokens=8, overlap_tokens=0)
+    for chunk in chunks:
+        first_words = chunk.text.split()[0]
+        assert page[chunk.offset:].startswith(first_words)
+
+
+def test_repeated_content_is_deduplicated():
+    chunks = chunk_pages([(1, 'Same paragraph text.'), (2, 'Other words here.'), (3, 'Same paragraph text.')], max_tokens=6, overlap_tokens=0, learn_pages=0)
+    assert [chunk.text for chunk in chunks].count('Same paragraph text.') == 1
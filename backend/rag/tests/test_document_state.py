@@ -0,0 +1,33 @@
+import threading
+import time
+
+from rag.documents import DocumentStore
+
+DOCUMENT = 'b' * 24
+
+
+def test_state_round_trips_and_survives_missing_files(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    assert store.read_state(DOCUMENT, 'precompute.json') is None
+    store.write_state(DOCUMENT, 'precompute.json', {'job_id': 'abc'})
+    assert store.read_state(DOCUMENT, 'precompute.json') == {'job_id': 'abc'}
+
+
+def test_state_lock_serializes_holders(tmp_path):
+    stores = [DocumentStore(str(tmp_path)), DocumentStore(str(tmp_path))]
+    inside = []
+    overlaps = []
+
+    def hold(store):
+        with store.state_lock(DOCUMENT, 'precompute'):
+            overlaps.append(bool(inside))
+            inside.append(1)
+            time.sleep(0.05)
+            inside.pop()
+
+    threads = [threading.Thread(target=hold, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [False, False]
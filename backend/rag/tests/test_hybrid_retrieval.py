@@ -0,0 +1,48 @@
+import pytest
+
+from rag.bm25 import BM25Index, tokenize
+from rag.hybrid import heuristic_rerank_score, reciprocal_rank_fusion
+
+TEXTS = [
+    'Momentum is mass times velocity.',
+    'Kinetic energy is half of mass times velocity squared, or 0.5 m v^2.',
+    'Friction opposes motion between surfaces in contact.',
+    'The cat sat on the mat.',
+]
+
+
+def test_tokenize_drops_stopwords_and_keeps_formulas_whole():
+    assert tokenize('What is v^2 at 3.14 seconds?') == ['v^2', '3.14', 'seconds']
+
+
+def test_bm25_ranks_documents_containing_the_query_terms():
+    results = BM25Index(TEXTS).search('friction surfaces', 3)
+    assert results[0][0] == 2
+    assert len(results) == 1
+
+
+def test_bm25_prefers_rarer_terms_and_limits_results():
+    results = BM25Index(TEXTS).search('velocity squared', 1)
+    assert [doc_id for doc_id, _ in results] == [1]
+
+
+def test_bm25_on_an_empty_corpus_finds_nothing():
+    assert BM25Index([]).search('anything', 5) == []
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    scores = reciprocal_rank_fusion([[0, 1, 2], [1, 2, 0]], rrf_k=60)
+    assert max(scores, key=scores.get) == 1
+    assert scores[1] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_rrf_keeps_ids_found_by_only_one_ranking():
+    scores = reciprocal_rank_fusion([[3], [4, 3]])
+    assert set(scores) == {3, 4}
+    assert scores[3] > scores[4]
+
+
+def test_rerank_score_counts_coverage_and_phrases():
+    assert heuristic_rerank_score('mass velocity', 'velocity and mass') == pytest.approx(1.0)
+    assert heuristic_rerank_score('mass velocity', 'mass velocity') == pytest.approx(1.5)
+    assert heuristic_rerank_score('the', 'anything') == 0.0
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from rag.minhash import MinHasher, deduplicate_questions
+
+
+@pytest.fixture
+def hasher():
+    return MinHasher(num_perm=128)
+
+
+def _jaccard(hasher, first, second):
+    a, b = hasher.shingles(first), hasher.shingles(second)
+    return len(a & b) / len(a | b)
+
+
+def test_signatures_are_deterministic_across_instances():
+    text = 'What is the unit of force?'
+    assert np.array_equal(MinHasher().signature(text), MinHasher().signature(text))
+
+
+def test_similarity_estimates_bigram_jaccard(hasher):
+    first = 'what is the net force on a block sliding down a frictionless incline'
+    second = 'what is the net force on a block sliding down a rough incline'
+    estimate = MinHasher.similarity(hasher.signature(first)[None, :], hasher.signature(second))[0]
+    assert estimate == pytest.approx(_jaccard(hasher, first, second), abs=0.15)
+
+
+def test_deduplicate_drops_rephrasings_and_keeps_new_questions(hasher):
+    questions = [
+        {'question_text': 'What is the SI unit of force?'},
+        {'question_text': 'what is the SI unit of force'},
+        {'question_text': 'How does friction depend on the normal force?'},
+    ]
+    kept = deduplicate_questions(questions, hasher)
+    assert [question['question_text'] for question in kept] == [questions[0]['question_text'], questions[2]['question_text']]
+
+
+def test_deduplicate_checks_against_existing_signatures(hasher):
+    existing = np.array([hasher.signature('What is the SI unit of force?')])
+    kept = deduplicate_questions([{'question_text': 'What is the SI unit of force?'}, {'question_text': 'Define inertia.'}], hasher, existing=existing)
+    assert [question['question_text'] for question in kept] == ['Define inertia.']
+
+
+def test_short_texts_still_get_a_signature(hasher):
+    assert hasher.shingles('Momentum') == {'momentum'}
+    assert hasher.signature('').shape == (128,)
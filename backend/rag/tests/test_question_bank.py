@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from rag import question_bank
+from rag.documents import ARTIFACT_VERSION, DocumentStore, question_id_for
+from rag.question_bank import QuestionBanks
+
+DOCUMENT = 'c' * 24
+
+
+def _question(text, subtopic='Forces'):
+    return {'question_text': text, 'correct_answer': 'a', 'options': ['a', 'b'], 'question_id': question_id_for(text), 'subtopic': subtopic}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    os.makedirs(store.path(DOCUMENT))
+    with open(store.path(DOCUMENT, 'manifest.json'), 'w') as f:
+        json.dump({'version': ARTIFACT_VERSION, 'document_id': DOCUMENT}, f)
+    with open(store.path(DOCUMENT, 'questions.json'), 'w') as f:
+        json.dump([_question('What is inertia?'), _question('State Newton\'s third law.', 'Laws')], f)
+    return store
+
+
+@pytest.fixture
+def banks(store, monkeypatch):
+    banks = QuestionBanks(store, low_water=0)
+    monkeypatch.setattr(banks, 'schedule_refill', lambda document_id: None)
+    return banks
+
+
+def test_short_bank_serves_what_it_has(banks):
+    assert len(banks.serve(DOCUMENT, 'u', 3)) == 2
+    assert banks.serve(DOCUMENT, 'u', 3) == []
+    assert banks.serve('f' * 24, 'u', 3) is None
+
+
+def test_added_questions_are_banked_and_seen_by_their_user(banks, store):
+    added = banks.add(DOCUMENT, [
+        {'question_text': 'Define momentum precisely for a moving body.', 'correct_answer': 'p = mv'},
+        {'question_text': 'What is inertia?', 'correct_answer': 'a'},
+        {'question_text': 'no answer'}
+    ], 'u')
+    assert [question['question_text'] for question in added] == ['Define momentum precisely for a moving body.']
+    assert len(store.questions(DOCUMENT)) == 3
+    assert len(banks.serve(DOCUMENT, 'u', 3)) == 2
+    assert len(QuestionBanks(store, low_water=0).serve(DOCUMENT, 'other', 3)) == 3
+
+
+def test_seen_log_is_compacted_when_read(banks, store, monkeypatch):
+    monkeypatch.setattr(question_bank, 'SEEN_COMPACT_MIN_LINES', 4)
+    monkeypatch.setattr(question_bank, 'SEEN_COMPACT_FACTOR', 1)
+    for i in range(4):
+        banks.serve(DOCUMENT, f"user-{i % 2}", 1)
+    with open(store.state_path(DOCUMENT, 'seen.jsonl')) as f:
+        lines = [json.loads(line) for line in f]
+    assert sorted((line['user'], len(line['questions'])) for line in lines) == [('user-0', 2), ('user-1', 2)]
+    fresh = QuestionBanks(store, low_water=0)
+    assert fresh.serve(DOCUMENT, 'user-0', 3) == []
+
+
+def test_refill_releases_its_claim(banks, monkeypatch):
+    monkeypatch.setattr(banks.store, 'chunks', lambda document_id: (_ for _ in ()).throw(OSError('gone')))
+    assert banks.refill(DOCUMENT) == 0
+    assert banks._bank(DOCUMENT).refilling is False
@@ -0,0 +1,43 @@
+"""
+MindFlow Speech Module
+This module loads and shares the speech-to-text and text-to-speech models.
+"""
+
+from .audio_encoding import AudioFormat, StreamingEncoder, available_formats, negotiate_format, parse_sample_rate
+from .batching import WhisperBatcher, get_batcher
+from .g2p_cache import CachedG2P, G2PCache, install_g2p_cache
+from .memory import memory_usage
+from .models import (
+    KOKORO_VOICE,
+    get_tts_pipeline,
+    get_whisper_model,
+    loaded_models,
+    preload_models,
+    warmup_models
+)
+from .transcription import transcribe_audio
+from .vad import VadConfig, detect_speech, pack_segments
+
+__all__ = [
+    'AudioFormat',
+    'StreamingEncoder',
+    'available_formats',
+    'negotiate_format',
+    'parse_sample_rate',
+    'WhisperBatcher',
+    'get_batcher',
+    'CachedG2P',
+    'G2PCache',
+    'install_g2p_cache',
+    'memory_usage',
+    'KOKORO_VOICE',
+    'get_tts_pipeline',
+    'get_whisper_model',
+    'loaded_models',
+    'preload_models',
+    'warmup_models',
+    'transcribe_audio',
+    'VadConfig',
+    'detect_speech',
+    'pack_segments'
+]
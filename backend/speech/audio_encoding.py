@@ -0,0 +1,163 @@
+"""Negotiated, compressed encodings for synthesized speech.
+
+A client picks the format with `?format=` or through its Accept header, and
+can lower the sample rate with `?sample_rate=`. WAV stays the default, so
+existing clients keep working. Opus in Ogg is well over 10x smaller than
+24kHz 16-bit PCM for speech, and more again at 16 or 12kHz. FLAC is
+lossless, and MP3 is offered when the installed libsndfile can write it.
+TTS_COMPRESSION_LEVEL (0 = best quality, 1 = smallest) tunes the
+compressed formats.
+
+StreamingEncoder runs on its own thread. The synthesis loop hands it each
+chunk as soon as Kokoro yields it, so resampling and compression overlap
+with synthesis of the next sentence instead of running after it.
+"""
+
+import io
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+import soundfile as sf
+
+TTS_SAMPLE_RATE = 24000
+SAMPLE_RATES = (24000, 16000, 12000, 8000)
+TTS_COMPRESSION_LEVEL = float(os.getenv('TTS_COMPRESSION_LEVEL', 0.5))
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str
+    container: str
+    subtype: str
+    mimetype: str
+    extension: str
+
+
+AUDIO_FORMATS = {
+    'wav': AudioFormat('wav', 'WAV', 'PCM_16', 'audio/wav', 'wav'),
+    'opus': AudioFormat('opus', 'OGG', 'OPUS', 'audio/ogg', 'ogg'),
+    'flac': AudioFormat('flac', 'FLAC', 'PCM_16', 'audio/flac', 'flac'),
+    'mp3': AudioFormat('mp3', 'MP3', 'MPEG_LAYER_III', 'audio/mpeg', 'mp3'),
+}
+FORMAT_ALIASES = {'ogg': 'opus', 'mpeg': 'mp3', 'x-wav': 'wav', 'wave': 'wav'}
+# Accept-header MIME types, in server preference order; WAV first so '*/*' keeps the old default.
+ACCEPT_MIMETYPES = {
+    'audio/wav': 'wav', 'audio/x-wav': 'wav', 'audio/wave': 'wav',
+    'audio/ogg': 'opus', 'audio/opus': 'opus',
+    'audio/flac': 'flac', 'audio/x-flac': 'flac',
+    'audio/mpeg': 'mp3', 'audio/mp3': 'mp3',
+}
+
+
+@lru_cache(maxsize=None)
+def available_formats() -> Dict[str, AudioFormat]:
+    """Formats the installed libsndfile can write."""
+    return {name: fmt for name, fmt in AUDIO_FORMATS.items() if sf.check_format(fmt.container, fmt.subtype)}
+
+
+def negotiate_format(requested: Optional[str], accept=None) -> AudioFormat:
+    """Pick the output format from an explicit name, else from the Accept header, else WAV.
+
+    Raises ValueError for an explicitly requested format that is unknown or unavailable.
+    """
+    formats = available_formats()
+    if requested:
+        name = FORMAT_ALIASES.get(requested.lower(), requested.lower())
+        if name not in formats:
+            raise ValueError(f"Unsupported audio format '{requested}'; available: {', '.join(formats)}")
+        return formats[name]
+    if accept is not None:
+        offered = [mimetype for mimetype, name in ACCEPT_MIMETYPES.items() if name in formats]
+        best = accept.best_match(offered)
+        if best:
+            return formats[ACCEPT_MIMETYPES[best]]
+    return formats['wav']
+
+
+def parse_sample_rate(value: Optional[str]) -> int:
+    if not value:
+        return TTS_SAMPLE_RATE
+    rate = int(value)
+    if rate not in SAMPLE_RATES:
+        raise ValueError(f"Unsupported sample rate {rate}; choose one of {', '.join(map(str, SAMPLE_RATES))}")
+    return rate
+
+
+class _Resampler:
+    """Streaming downsampler: windowed-sinc low-pass, then linear interpolation.
+
+    Filter history and the output phase carry across chunks, so chunk
+    boundaries are seamless.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int, taps: int = 63):
+        self.step = source_rate / target_rate
+        n = np.arange(taps) - (taps - 1) / 2
+        cutoff = 0.45 / self.step
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        self.kernel = (kernel / kernel.sum()).astype(np.float32)
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        # The previous chunk's last filtered sample, so positions between chunks interpolate too.
+        self._last = np.zeros(1, dtype=np.float32)
+        self._position = 1.0
+
+    def __call__(self, chunk: np.ndarray) -> np.ndarray:
+        signal = np.concatenate([self._history, chunk])
+        self._history = signal[-(len(self.kernel) - 1):]
+        filtered = np.concatenate([self._last, np.convolve(signal, self.kernel, mode='valid')])
+        self._last = filtered[-1:]
+        end = len(filtered) - 1
+        positions = np.arange(self._position, end + 1e-9, self.step)
+        self._position = (positions[-1] + self.step if len(positions) else self._position) - end
+        return np.interp(positions, np.arange(len(filtered)), filtered).astype(np.float32)
+
+
+class StreamingEncoder:
+    """Encodes chunks on a worker thread while the caller keeps synthesizing."""
+
+    def __init__(self, audio_format: AudioFormat, sample_rate: int = TTS_SAMPLE_RATE, source_rate: int = TTS_SAMPLE_RATE):
+        self.format = audio_format
+        self.sample_rate = sample_rate
+        self._resample = _Resampler(source_rate, sample_rate) if sample_rate != source_rate else None
+        self._chunks: 'queue.Queue[Optional[np.ndarray]]' = queue.Queue(maxsize=16)
+        self._buffer = io.BytesIO()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name='tts-encoder', daemon=True)
+        self._thread.start()
+
+    def write(self, chunk) -> None:
+        self._chunks.put(np.asarray(chunk, dtype=np.float32).reshape(-1))
+
+    def finish(self) -> bytes:
+        """Wait for the remaining chunks to be encoded and return the file's bytes."""
+        self._chunks.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._buffer.getvalue()
+
+    def close(self) -> None:
+        """Stop the worker thread and discard the output, e.g. when synthesis failed."""
+        self._chunks.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        options = {} if self.format.container == 'WAV' else {'compression_level': TTS_COMPRESSION_LEVEL}
+        try:
+            with sf.SoundFile(self._buffer, 'w', samplerate=self.sample_rate, channels=1,
+                              format=self.format.container, subtype=self.format.subtype, **options) as out:
+                while True:
+                    chunk = self._chunks.get()
+                    if chunk is None:
+                        break
+                    out.write(self._resample(chunk) if self._resample else chunk)
+        except BaseException as e:
+            self._error = e
+            # Keep draining so the producer never blocks on a full queue.
+            while self._chunks.get() is not None:
+                pass
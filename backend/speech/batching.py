@@ -0,0 +1,184 @@
+"""Dynamic batching of Whisper windows across concurrent requests.
+
+Request threads compute each window's log-mel spectrogram themselves, then
+queue it. A single scheduler thread waits until WHISPER_MAX_BATCH_SIZE
+windows are pending, or WHISPER_BATCH_WAIT_MS has passed since the oldest
+one arrived. It stacks them into one tensor and runs a single
+whisper.decode() pass (encoder and decoder) for the batch. Each result is
+split back out to the future of the request that queued it.
+
+Batching is opt-in: it is off unless WHISPER_MAX_BATCH_SIZE is above 1.
+Batched decoding is a single greedy pass without previous-text prompting.
+A window whose result fails Whisper's own quality checks (compression
+ratio or average log-probability) is decoded again with model.transcribe(),
+which applies the usual temperature fallback. A batch that holds only one
+window goes straight to model.transcribe(), since there is nothing to share.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .whisper_backends import inference_lock
+
+WHISPER_MAX_BATCH_SIZE = int(os.getenv('WHISPER_MAX_BATCH_SIZE', 1))
+WHISPER_BATCH_WAIT_MS = float(os.getenv('WHISPER_BATCH_WAIT_MS', 20))
+SECONDS_PER_TIMESTAMP = 0.02
+# Whisper's transcribe() defaults.
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+@dataclass
+class _Pending:
+    audio: np.ndarray
+    mel: Any
+    duration: float
+    future: Future
+    queued_at: float
+
+
+def supports_batching(model: Any) -> bool:
+    """Batching needs an openai-whisper PyTorch model."""
+    try:
+        import whisper  # noqa: F401
+    except ImportError:
+        return False
+    return hasattr(model, 'dims') and hasattr(model, 'decode')
+
+
+def needs_fallback(result: Any) -> bool:
+    """Whether a greedy result fails the checks that make transcribe() retry at a higher temperature."""
+    if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+        # Silence; transcribe() would skip the window rather than retry it.
+        return False
+    return result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD
+
+
+class WhisperBatcher:
+    """Collects windows from many threads and decodes them together."""
+
+    def __init__(self, model: Any, max_batch_size: int = WHISPER_MAX_BATCH_SIZE, max_wait_ms: float = WHISPER_BATCH_WAIT_MS):
+        import whisper
+        self.whisper = whisper
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.options = whisper.DecodingOptions(task='transcribe', fp16=False)
+        self._pending: List[_Pending] = []
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='whisper-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, audio: np.ndarray) -> Future:
+        """Queue one window of at most 30 seconds; the future resolves to {'text', 'segments', 'language'}."""
+        whisper = self.whisper
+        mel = whisper.log_mel_spectrogram(audio, n_mels=self.model.dims.n_mels)
+        mel = whisper.pad_or_trim(mel, whisper.audio.N_FRAMES)
+        future: Future = Future()
+        with self._condition:
+            self._pending.append(_Pending(audio, mel, len(audio) / whisper.audio.SAMPLE_RATE, future, time.monotonic()))
+            self._condition.notify()
+        return future
+
+    def transcribe(self, audio: np.ndarray, **kwargs) -> Dict[str, Any]:
+        """Whisper's transcribe() interface for a single window."""
+        return self.submit(audio).result()
+
+    def _next_batch(self) -> List[_Pending]:
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            deadline = self._pending[0].queued_at + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self) -> None:
+        import torch
+        while True:
+            batch = self._next_batch()
+            try:
+                if len(batch) == 1:
+                    with inference_lock:
+                        batch[0].future.set_result(self.model.transcribe(batch[0].audio))
+                    continue
+                mel = torch.stack([item.mel for item in batch]).to(self.model.device)
+                with inference_lock, torch.no_grad():
+                    results = self.model.decode(mel, self.options)
+                for item, result in zip(batch, results):
+                    if needs_fallback(result):
+                        with inference_lock:
+                            item.future.set_result(self.model.transcribe(item.audio))
+                    else:
+                        item.future.set_result(self._to_dict(result, item.duration))
+            except Exception as e:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+
+    def _to_dict(self, result: Any, duration: float) -> Dict[str, Any]:
+        tokenizer = self.whisper.tokenizer.get_tokenizer(
+            self.model.is_multilingual,
+            num_languages=self.model.num_languages,
+            language=result.language,
+            task='transcribe'
+        )
+        return {
+            'text': result.text,
+            'segments': _timestamped_segments(result.tokens, tokenizer, duration),
+            'language': result.language
+        }
+
+
+def _timestamped_segments(tokens: List[int], tokenizer: Any, duration: float) -> List[Dict[str, Any]]:
+    """Split Whisper's <|t0|> text <|t1|> token stream into timed segments."""
+    begin = tokenizer.timestamp_begin
+    segments = []
+    start: Optional[float] = None
+    text: List[int] = []
+    for token in tokens:
+        if token >= begin:
+            moment = (token - begin) * SECONDS_PER_TIMESTAMP
+            if start is not None and text:
+                segments.append({'start': start, 'end': moment, 'text': tokenizer.decode(text)})
+                start, text = None, []
+            else:
+                start = moment
+        elif token < tokenizer.eot:
+            text.append(token)
+    if text:
+        segments.append({'start': start or 0.0, 'end': duration, 'text': tokenizer.decode(text)})
+    return segments
+
+
+_batcher: Optional[WhisperBatcher] = None
+_batcher_pid: Optional[int] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher(model: Any) -> Optional[WhisperBatcher]:
+    """This process's batcher, or None when batching is off or unsupported.
+
+    Threads do not survive fork, so the batcher is created lazily in each
+    worker rather than in a preloading master.
+    """
+    global _batcher, _batcher_pid
+    if WHISPER_MAX_BATCH_SIZE <= 1 or not supports_batching(model):
+        return None
+    with _batcher_lock:
+        if _batcher is None or _batcher_pid != os.getpid() or _batcher.model is not model:
+            _batcher = WhisperBatcher(model, WHISPER_MAX_BATCH_SIZE, WHISPER_BATCH_WAIT_MS)
+            _batcher_pid = os.getpid()
+        return _batcher
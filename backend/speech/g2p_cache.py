@@ -0,0 +1,161 @@
+"""Persistent grapheme-to-phoneme cache for the Kokoro pipeline.
+
+KPipeline runs its G2P frontend on every text chunk it synthesizes, while
+course material repeats the same sentences, terms and formulas. CachedG2P
+wraps `pipeline.g2p` and phonemizes text one sentence at a time, keyed by
+the normalized sentence. Only unseen sentences reach the real G2P.
+
+Entries live in an in-memory LRU as pickled bytes, so every hit hands out a
+fresh copy of the tokens for the pipeline to consume. New entries are
+merged into an on-disk snapshot every G2P_CACHE_SAVE_EVERY misses and at
+exit, so other workers and later processes start warm.
+"""
+
+import atexit
+import os
+import pickle
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+G2P_CACHE_SIZE = int(os.getenv('G2P_CACHE_SIZE', 50000))
+G2P_CACHE_DIR = os.getenv('G2P_CACHE_DIR', 'g2p_cache/')
+G2P_CACHE_SAVE_EVERY = int(os.getenv('G2P_CACHE_SAVE_EVERY', 500))
+SNAPSHOT_VERSION = 1
+
+_SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_segment(text: str) -> str:
+    """Cache key for a grapheme segment: NFC, single spaces, trimmed. Case is kept; it changes pronunciation."""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+class G2PCache:
+    """Thread-safe LRU of pickled G2P results with a mergeable on-disk snapshot."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = G2P_CACHE_SIZE, save_every: int = G2P_CACHE_SAVE_EVERY):
+        self.path = path
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if path:
+            self._entries.update(self._read_snapshot())
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(blob)
+
+    def put(self, key: str, value: Any) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = blob
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+            should_save = self.path and self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def _read_snapshot(self) -> Dict[str, bytes]:
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Ignoring unreadable G2P cache snapshot {self.path}: {e}")
+            return {}
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return {}
+        return snapshot['entries']
+
+    def save(self) -> None:
+        """Merge this process's entries into the snapshot on disk."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._unsaved:
+                return
+            entries = dict(self._entries)
+            self._unsaved = 0
+        # Keep what other processes saved; this process's entries win on conflict.
+        merged = self._read_snapshot()
+        merged.update(entries)
+        if len(merged) > self.max_entries:
+            merged = dict(list(merged.items())[-self.max_entries:])
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump({'version': SNAPSHOT_VERSION, 'entries': merged}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class CachedG2P:
+    """Drop-in for a Kokoro pipeline's `g2p` that phonemizes sentence by sentence through a G2PCache."""
+
+    def __init__(self, g2p: Callable[[str], Tuple[str, Any]], cache: G2PCache):
+        self.g2p = g2p
+        self.cache = cache
+
+    def _sentence(self, sentence: str) -> Tuple[str, Any]:
+        key = normalize_segment(sentence)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.g2p(key)
+            self.cache.put(key, result)
+        return result
+
+    def __call__(self, text: str) -> Tuple[str, Any]:
+        sentences = [part for part in _SENTENCE_END.split(text) if part.strip()]
+        if len(sentences) <= 1:
+            return self._sentence(text)
+
+        phonemes: List[str] = []
+        tokens: Optional[List[Any]] = []
+        for sentence in sentences:
+            sentence_phonemes, sentence_tokens = self._sentence(sentence)
+            phonemes.append(sentence_phonemes)
+            if tokens is not None and isinstance(sentence_tokens, list):
+                # English G2P returns word tokens; keep a space between sentences.
+                if tokens and hasattr(tokens[-1], 'whitespace'):
+                    tokens[-1].whitespace = ' '
+                tokens.extend(sentence_tokens)
+            else:
+                tokens = None
+        return ' '.join(phonemes), tokens
+
+
+def install_g2p_cache(pipeline: Any, lang_code: str) -> G2PCache:
+    """Wrap `pipeline.g2p` with a cache backed by this language's snapshot."""
+    try:
+        from importlib.metadata import version
+        frontend = version('misaki')
+    except Exception:
+        frontend = 'unknown'
+    # A new G2P frontend can phonemize differently; give it its own snapshot.
+    path = os.path.join(G2P_CACHE_DIR, f"g2p-{lang_code}-{frontend}.pkl") if G2P_CACHE_DIR else None
+    cache = G2PCache(path)
+    pipeline.g2p = CachedG2P(pipeline.g2p, cache)
+    atexit.register(cache.save)
+    return cache
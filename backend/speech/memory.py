@@ -0,0 +1,35 @@
+"""Memory usage of the current process, split into shared and private pages.
+
+RSS alone counts shared model pages once in every worker. PSS splits each
+shared page between the processes that map it, so summing PSS across
+workers gives the box's real footprint.
+"""
+
+import os
+import resource
+from typing import Any, Dict
+
+_SMAPS_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Shared_Dirty': 'shared_dirty_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb'
+}
+
+
+def memory_usage() -> Dict[str, Any]:
+    """This process's memory in MiB, from /proc/self/smaps_rollup when available."""
+    usage: Dict[str, Any] = {'pid': os.getpid()}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in _SMAPS_FIELDS:
+                    usage[_SMAPS_FIELDS[key]] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        # No /proc: only the peak RSS is available (KiB on Linux, bytes on macOS).
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage['max_rss_mb'] = round(peak / (1024 * 1024 if os.uname().sysname == 'Darwin' else 1024), 1)
+    return usage
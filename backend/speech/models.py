@@ -0,0 +1,104 @@
+"""Process-wide Whisper and Kokoro models, loaded once and warmed at boot.
+
+Whisper's checkpoint is opened with torch.load(mmap=True). Its weights are
+then backed by the page cache, so every worker on a box maps the same
+physical pages. Kokoro builds its weights in memory. Under Gunicorn with
+preload_app (see gunicorn.conf.py), both models are loaded and warmed in
+the master before it forks, and workers inherit them copy-on-write, so
+adding workers does not add model copies.
+
+SPEECH_WARMUP picks where the warmup inference runs: 'master' (at import,
+the default), 'worker' (from Gunicorn's post_fork hook) or 'off'.
+WHISPER_BACKEND picks the inference backend (see whisper_backends.py), and
+WHISPER_NUM_THREADS overrides the per-worker intra-op thread count.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from .g2p_cache import install_g2p_cache
+from .whisper_backends import default_num_threads, load_whisper
+
+WHISPER_MODEL_PATH = os.getenv(
+    'WHISPER_MODEL_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model', 'whisper_model.pt')
+)
+KOKORO_LANG_CODE = os.getenv('KOKORO_LANG_CODE', 'a')
+KOKORO_VOICE = os.getenv('KOKORO_VOICE', 'af_heart')
+SPEECH_WARMUP = os.getenv('SPEECH_WARMUP', 'master').lower()
+WHISPER_BACKEND = os.getenv('WHISPER_BACKEND', 'torch')
+WHISPER_CT2_MODEL = os.getenv('WHISPER_CT2_MODEL', '')
+WHISPER_NUM_THREADS = int(os.getenv('WHISPER_NUM_THREADS', 0)) or default_num_threads()
+
+_models: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _load(name: str, loader: Callable[[], Any]) -> Any:
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            start = time.perf_counter()
+            model = loader()
+            _models[name] = model
+            print(f"Loaded {name} model in {time.perf_counter() - start:.1f}s")
+        return model
+
+
+def _load_whisper() -> Any:
+    return load_whisper(WHISPER_BACKEND, WHISPER_MODEL_PATH, WHISPER_NUM_THREADS, WHISPER_CT2_MODEL)
+
+
+def _load_kokoro() -> Any:
+    from kokoro import KPipeline
+    pipeline = KPipeline(lang_code=KOKORO_LANG_CODE)
+    if hasattr(pipeline, 'g2p'):
+        install_g2p_cache(pipeline, KOKORO_LANG_CODE)
+    return pipeline
+
+
+def get_whisper_model() -> Any:
+    """The shared Whisper model."""
+    return _load('whisper', _load_whisper)
+
+
+def get_tts_pipeline() -> Any:
+    """The shared Kokoro pipeline."""
+    return _load('kokoro', _load_kokoro)
+
+
+def configure_threads() -> None:
+    """Apply the per-worker thread count; thread pools are per process, so call it after fork."""
+    if WHISPER_BACKEND != 'ctranslate2':
+        import torch
+        torch.set_num_threads(WHISPER_NUM_THREADS)
+
+
+def loaded_models() -> List[str]:
+    with _lock:
+        return sorted(_models)
+
+
+def warmup_models() -> None:
+    """Run one small inference per model so lazy initialisation is not paid by the first request."""
+    start = time.perf_counter()
+    get_whisper_model().transcribe(np.zeros(16000, dtype=np.float32))
+    print(f"Warmed up whisper in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    # Also loads the default voice pack and the G2P backend.
+    for _ in get_tts_pipeline()('Warm up.', voice=KOKORO_VOICE):
+        pass
+    print(f"Warmed up kokoro in {time.perf_counter() - start:.1f}s")
+
+
+def preload_models(warmup: bool = SPEECH_WARMUP == 'master') -> None:
+    """Load both models now, and warm them up unless disabled."""
+    get_whisper_model()
+    get_tts_pipeline()
+    if warmup:
+        warmup_models()
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from speech.audio_encoding import _Resampler
+
+SOURCE_RATE = 24000
+TARGET_RATE = 16000
+
+
+def _tone(frequency, seconds=1.0, rate=SOURCE_RATE):
+    return np.sin(2 * np.pi * frequency * np.arange(int(rate * seconds)) / rate).astype(np.float32)
+
+
+def test_output_length_follows_the_rate_ratio():
+    out = _Resampler(SOURCE_RATE, TARGET_RATE)(_tone(440))
+    assert abs(len(out) - TARGET_RATE) <= 1
+
+
+def test_chunk_boundaries_are_seamless():
+    signal = _tone(440)
+    whole = _Resampler(SOURCE_RATE, TARGET_RATE)(signal)
+    resample = _Resampler(SOURCE_RATE, TARGET_RATE)
+    pieces = np.concatenate([resample(chunk) for chunk in np.array_split(signal, [1000, 1001, 7777, 15000])])
+    assert len(pieces) == len(whole)
+    np.testing.assert_allclose(pieces, whole, atol=1e-5)
+
+
+def test_passband_is_kept_and_aliasing_frequencies_are_removed():
+    kept = _Resampler(SOURCE_RATE, TARGET_RATE)(_tone(1000))[200:]
+    removed = _Resampler(SOURCE_RATE, TARGET_RATE)(_tone(10000))[200:]
+    assert np.sqrt(np.mean(kept ** 2)) == pytest.approx(np.sqrt(0.5), rel=0.05)
+    assert np.sqrt(np.mean(removed ** 2)) < 0.05
@@ -0,0 +1,108 @@
+"""Speech-to-text with VAD trimming, window packing and timestamp stitching.
+
+The recording is decoded to 16kHz mono. Silence is dropped (see vad.py),
+and the remaining speech is packed into 30-second Whisper windows. Each
+window is transcribed, and its segments are mapped back onto the original
+timeline and stitched in order.
+
+How windows are transcribed depends on the backend:
+- PyTorch Whisper with batching on (see batching.py): all windows are
+  submitted at once and share forward passes with other requests' windows.
+- PyTorch Whisper without batching: Whisper installs its KV-cache hooks on
+  the shared model for every decode, so windows run one at a time under a
+  lock, each prompted with the previous window's text for continuity.
+- CTranslate2: safe to call concurrently, so windows run in parallel.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .vad import SAMPLE_RATE, WINDOW_SECONDS, SpeechWindow, VadConfig, detect_speech, pack_segments
+from .batching import get_batcher
+from .whisper_backends import CTranslate2Whisper, inference_lock
+
+VAD_ENABLED = os.getenv('VAD_ENABLED', '1').lower() not in ('0', 'false', 'no')
+VAD_PARALLELISM = int(os.getenv('VAD_PARALLELISM', 2))
+PROMPT_CHARS = 200
+WINDOW_SAMPLES = SAMPLE_RATE * WINDOW_SECONDS
+
+
+def load_audio(path: str) -> np.ndarray:
+    """Decode any audio file to float32 mono at 16kHz."""
+    try:
+        import whisper
+        return whisper.load_audio(path)
+    except ImportError:
+        import soundfile as sf
+        audio, rate = sf.read(path, dtype='float32', always_2d=True)
+        audio = audio.mean(axis=1)
+        if rate != SAMPLE_RATE:
+            positions = np.arange(0, len(audio), rate / SAMPLE_RATE)
+            audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+        return audio
+
+
+def _transcribe_window(model: Any, window: SpeechWindow, prompt: str = '') -> Dict[str, Any]:
+    kwargs = {'initial_prompt': prompt} if prompt else {}
+    return _window_result(window, model.transcribe(window.audio, **kwargs))
+
+
+def _window_result(window: SpeechWindow, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a window's segments onto the original recording's timeline."""
+    segments = [{
+        'start': round(window.to_original(segment['start']), 2),
+        'end': round(window.to_original(segment['end']), 2),
+        'text': segment['text'].strip()
+    } for segment in result.get('segments', [])]
+    if not segments and result.get('text', '').strip():
+        segments = [{
+            'start': round(window.pieces[0][1] / SAMPLE_RATE, 2),
+            'end': round((window.pieces[-1][1] + window.pieces[-1][2]) / SAMPLE_RATE, 2),
+            'text': result['text'].strip()
+        }]
+    return {'segments': segments, 'language': result.get('language')}
+
+
+def transcribe_audio(model: Any, path: str, vad: bool = VAD_ENABLED, vad_config: VadConfig = VadConfig()) -> Dict[str, Any]:
+    """Transcribe an audio file; returns text, timestamped segments and timing details."""
+    start = time.perf_counter()
+    audio = load_audio(path)
+    audio_seconds = len(audio) / SAMPLE_RATE
+
+    batcher = get_batcher(model)
+    if vad:
+        windows = pack_segments(audio, detect_speech(audio, SAMPLE_RATE, vad_config))
+    elif batcher is not None:
+        # Batched decoding takes whole windows only; cut the audio into consecutive ones.
+        windows = pack_segments(audio, [(offset, min(offset + WINDOW_SAMPLES, len(audio))) for offset in range(0, len(audio), WINDOW_SAMPLES)], gap_ms=0)
+    else:
+        windows = [SpeechWindow(audio=audio, pieces=[(0, 0, len(audio))])] if len(audio) else []
+
+    if batcher is not None:
+        futures = [(window, batcher.submit(window.audio)) for window in windows]
+        results = [_window_result(window, future.result()) for window, future in futures]
+    elif isinstance(model, CTranslate2Whisper) and len(windows) > 1:
+        with ThreadPoolExecutor(max_workers=VAD_PARALLELISM) as pool:
+            results = list(pool.map(lambda window: _transcribe_window(model, window), windows))
+    else:
+        results = []
+        prompt = ''
+        with inference_lock:
+            for window in windows:
+                result = _transcribe_window(model, window, prompt)
+                results.append(result)
+                prompt = ' '.join(segment['text'] for segment in result['segments'])[-PROMPT_CHARS:]
+
+    segments: List[Dict[str, Any]] = [segment for result in results for segment in result['segments']]
+    return {
+        'text': ' '.join(segment['text'] for segment in segments if segment['text']),
+        'segments': segments,
+        'language': next((result['language'] for result in results if result['language']), None),
+        'audio_seconds': round(audio_seconds, 2),
+        'speech_seconds': round(sum(length for window in windows for _, _, length in window.pieces) / SAMPLE_RATE, 2),
+        'processing_seconds': round(time.perf_counter() - start, 2)
+    }
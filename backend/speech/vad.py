@@ -0,0 +1,146 @@
+"""Energy-based voice activity detection and packing into Whisper windows.
+
+Frames whose energy is well above the recording's own noise floor count as
+speech. Short pauses inside speech are bridged, blips too short to be
+speech are dropped, and each region is padded so word edges are kept.
+Whisper pads every input to a 30 second window, so transcribing each speech
+region alone would waste most of every window. `pack_segments` instead
+concatenates consecutive regions into windows of up to 30 seconds and keeps
+the offsets needed to map timestamps back to the original recording.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30
+
+
+@dataclass
+class VadConfig:
+    frame_ms: int = 30
+    # Speech must be this far above the noise floor (dB) and above the absolute floor.
+    margin_db: float = 12.0
+    min_level_db: float = -50.0
+    min_speech_ms: int = 250
+    min_silence_ms: int = 600
+    pad_ms: int = 200
+    max_segment_seconds: float = WINDOW_SECONDS
+
+
+@dataclass
+class SpeechWindow:
+    """Audio for one transcription call, built from speech regions of the original."""
+    audio: np.ndarray
+    # (offset in this window, start in the original, length), all in samples.
+    pieces: List[Tuple[int, int, int]] = field(default_factory=list)
+
+    def to_original(self, seconds: float, sample_rate: int = SAMPLE_RATE) -> float:
+        """Map a timestamp inside this window back to the original recording."""
+        position = int(seconds * sample_rate)
+        for offset, start, length in self.pieces:
+            if position < offset + length:
+                return (start + max(0, position - offset)) / sample_rate
+        offset, start, length = self.pieces[-1]
+        return (start + length) / sample_rate
+
+
+def _frame_levels(audio: np.ndarray, frame: int) -> np.ndarray:
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0)
+    frames = audio[:count * frame].reshape(count, frame).astype(np.float64)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def _split_long(start: int, end: int, levels: np.ndarray, frame: int, max_samples: int) -> List[Tuple[int, int]]:
+    """Cut a region longer than `max_samples` at its quietest frame near the limit."""
+    pieces = []
+    while end - start > max_samples:
+        search_from = (start + max_samples * 3 // 4) // frame
+        search_to = (start + max_samples) // frame
+        cut = (search_from + int(np.argmin(levels[search_from:search_to]))) * frame if search_to > search_from else start + max_samples
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+
+def detect_speech(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, config: VadConfig = VadConfig()) -> List[Tuple[int, int]]:
+    """(start, end) sample ranges of speech, in order."""
+    frame = sample_rate * config.frame_ms // 1000
+    levels = _frame_levels(audio, frame)
+    if not len(levels):
+        return []
+    noise_floor = np.percentile(levels, 10)
+    threshold = max(noise_floor + config.margin_db, config.min_level_db)
+    voiced = levels > threshold
+
+    regions = []
+    index = 0
+    while index < len(voiced):
+        if not voiced[index]:
+            index += 1
+            continue
+        start = index
+        while index < len(voiced) and voiced[index]:
+            index += 1
+        regions.append([start, index])
+
+    # Bridge pauses shorter than min_silence_ms, then drop blips.
+    max_gap = config.min_silence_ms // config.frame_ms
+    merged: List[List[int]] = []
+    for start, end in regions:
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    min_frames = max(1, config.min_speech_ms // config.frame_ms)
+    pad = sample_rate * config.pad_ms // 1000
+
+    segments: List[Tuple[int, int]] = []
+    for start, end in merged:
+        if end - start < min_frames:
+            continue
+        start_sample = max(0, start * frame - pad)
+        end_sample = min(len(audio), end * frame + pad)
+        if segments and start_sample <= segments[-1][1]:
+            start_sample = segments.pop()[0]
+        segments.append((start_sample, end_sample))
+
+    max_samples = int(config.max_segment_seconds * sample_rate)
+    return [piece for start, end in segments for piece in _split_long(start, end, levels, frame, max_samples)]
+
+
+def pack_segments(audio: np.ndarray, segments: List[Tuple[int, int]], sample_rate: int = SAMPLE_RATE,
+                  window_seconds: float = WINDOW_SECONDS, gap_ms: int = 100) -> List[SpeechWindow]:
+    """Concatenate consecutive speech segments into windows of at most `window_seconds`."""
+    limit = int(window_seconds * sample_rate)
+    gap = np.zeros(sample_rate * gap_ms // 1000, dtype=np.float32)
+    windows: List[SpeechWindow] = []
+    parts: List[np.ndarray] = []
+    current = SpeechWindow(audio=np.zeros(0, dtype=np.float32))
+    length = 0
+
+    def flush():
+        if current.pieces:
+            current.audio = np.concatenate(parts).astype(np.float32, copy=False)
+            windows.append(current)
+
+    for start, end in segments:
+        size = end - start
+        needed = size + (len(gap) if current.pieces else 0)
+        if current.pieces and length + needed > limit:
+            flush()
+            current, parts, length = SpeechWindow(audio=np.zeros(0, dtype=np.float32)), [], 0
+        if current.pieces:
+            parts.append(gap)
+            length += len(gap)
+        current.pieces.append((length, start, size))
+        parts.append(audio[start:end])
+        length += size
+    flush()
+    return windows
@@ -0,0 +1,95 @@
+"""Selectable Whisper inference backends for CPU serving.
+
+- 'torch': the full-precision checkpoint exactly as saved.
+- 'torch-int8': the same checkpoint with its Linear layers dynamically
+  quantized to int8. Attention and MLP projections hold almost all of
+  Whisper's FLOPs, and int8 GEMMs run them several times faster on CPU.
+- 'ctranslate2': an int8 CTranslate2 export run through faster-whisper.
+  It needs the optional faster-whisper package and a converted model
+  directory (or a model size name, which faster-whisper downloads).
+
+Every backend returns an object with Whisper's `transcribe(audio)`
+interface, which returns a dict with 'text', 'segments' and 'language'.
+"""
+
+import os
+import threading
+from typing import Any, Dict
+
+BACKENDS = ('torch', 'torch-int8', 'ctranslate2')
+
+# PyTorch Whisper installs its KV-cache hooks on the shared model for every
+# decode, so at most one decode may run on a model at a time.
+inference_lock = threading.Lock()
+
+# Gunicorn's worker count; gunicorn.conf.py reads it from here too.
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', os.getenv('WEB_CONCURRENCY', 2)))
+
+
+def default_num_threads() -> int:
+    """Intra-op threads per worker: the cores split evenly between Gunicorn workers."""
+    return max(1, (os.cpu_count() or 1) // max(1, GUNICORN_WORKERS))
+
+
+def load_torch(path: str) -> Any:
+    import torch
+    # mmap keeps the weights file-backed: shared between processes, paged in lazily.
+    return torch.load(path, weights_only=False, mmap=True)
+
+
+def quantize_int8(model: Any) -> Any:
+    """Dynamically quantize every Linear layer of a Whisper model to int8."""
+    import torch
+    from torch import nn
+
+    for module in model.modules():
+        # whisper.model.Linear only casts its weight to the input dtype, which is a
+        # no-op in fp32; plain nn.Linear is what the quantizer knows how to swap.
+        if isinstance(module, nn.Linear) and type(module) is not nn.Linear:
+            module.__class__ = nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+class CTranslate2Whisper:
+    """faster-whisper model behind Whisper's transcribe() interface."""
+
+    def __init__(self, model_path: str, num_threads: int, compute_type: str = 'int8', num_workers: int = 2):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError("WHISPER_BACKEND=ctranslate2 requires the faster-whisper package") from e
+        self.model = WhisperModel(model_path, device='cpu', compute_type=compute_type, cpu_threads=num_threads,
+                                  # Lets concurrent transcribe() calls run in parallel.
+                                  num_workers=num_workers)
+
+    def transcribe(self, audio: Any, **kwargs) -> Dict[str, Any]:
+        segments, info = self.model.transcribe(
+            audio,
+            beam_size=kwargs.get('beam_size', 5),
+            language=kwargs.get('language'),
+            initial_prompt=kwargs.get('initial_prompt')
+        )
+        segments = [
+            {'id': index, 'start': segment.start, 'end': segment.end, 'text': segment.text}
+            for index, segment in enumerate(segments)
+        ]
+        return {
+            'text': ''.join(segment['text'] for segment in segments),
+            'segments': segments,
+            'language': info.language
+        }
+
+
+def load_whisper(backend: str, path: str, num_threads: int, ct2_model: str = '') -> Any:
+    """Load Whisper with the given backend and set the intra-op thread count."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown Whisper backend '{backend}'; expected one of {', '.join(BACKENDS)}")
+    if backend == 'ctranslate2':
+        return CTranslate2Whisper(ct2_model or path, num_threads)
+
+    import torch
+    torch.set_num_threads(num_threads)
+    model = load_torch(path)
+    if backend == 'torch-int8':
+        model = quantize_int8(model)
+    return model
@@ -0,0 +1,9 @@
+"""
+MindFlow Storage Module
+This module contains the persistent stores used by the backend routes.
+"""
+
+from .chat_history import ChatHistoryStore
+from .job_store import Job, JobStage, JobStore
+
+__all__ = ['ChatHistoryStore', 'Job', 'JobStage', 'JobStore']
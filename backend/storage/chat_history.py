@@ -0,0 +1,180 @@
+"""Per-session chat history with a bounded in-memory tail and a JSON Lines log."""
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, IO, Iterator, List, Optional, Tuple
+
+
+class _Tail:
+    """The newest entries of a session's log and the file state they were read from."""
+
+    def __init__(self, entries: List[Dict[str, Any]], limit: int, stamp: Optional[Tuple[int, int, int]], total: int):
+        self.entries: Deque[Dict[str, Any]] = deque(entries, maxlen=limit)
+        self.stamp = stamp
+        # Entries in the whole log, so paging knows whether older ones exist on disk.
+        self.total = total
+
+
+def _stamp(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ChatHistoryStore:
+    """Append-only chat history, one JSON Lines file per session.
+
+    The log file is the source of truth, so every Gunicorn worker sees the
+    same history. Appends and compaction hold an exclusive `flock` on the
+    log. Each process keeps the newest `memory_limit` entries of its
+    `max_sessions` most recently used sessions in memory, stamped with the
+    log's inode, size and mtime. A read uses that tail only while the stamp
+    still matches the file; otherwise it re-reads the log. Every
+    `compact_every` appends a session's log is rewritten to its newest
+    `retain` entries so files stay bounded too.
+    """
+
+    def __init__(self, directory: str, memory_limit: int = 50, max_sessions: int = 1000, compact_every: int = 500, retain: int = 5000):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.max_sessions = max_sessions
+        self.compact_every = compact_every
+        self.retain = retain
+        self._recent: 'OrderedDict[str, _Tail]' = OrderedDict()
+        self._appends_since_compaction: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        digest = hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.jsonl")
+
+    @contextmanager
+    def _locked(self, session_id: str, exclusive: bool) -> Iterator[IO[str]]:
+        """Open a session's log under a shared or exclusive flock.
+
+        Compaction replaces the file, so after taking the lock we make sure
+        the handle still refers to the current log and reopen if it does not.
+        """
+        path = self._path(session_id)
+        while True:
+            log = open(path, 'a+', encoding='utf-8')
+            try:
+                fcntl.flock(log, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    current = os.stat(path).st_ino == os.fstat(log.fileno()).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    yield log
+                    return
+            finally:
+                log.close()
+
+    @staticmethod
+    def _parse(log: IO[str]) -> List[Dict[str, Any]]:
+        log.seek(0)
+        entries = []
+        for line in log:
+            line = line.strip()
+            if line:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn write from a crashed worker; skip it.
+                    continue
+        return entries
+
+    def _read_log(self, session_id: str) -> List[Dict[str, Any]]:
+        """Every entry on disk, caching the newest ones for this process."""
+        if not os.path.exists(self._path(session_id)):
+            self._remember(session_id, _Tail([], self.memory_limit, None, 0))
+            return []
+        with self._locked(session_id, exclusive=False) as log:
+            entries = self._parse(log)
+            stamp = _stamp(os.fstat(log.fileno()))
+        self._remember(session_id, _Tail(entries[-self.memory_limit:], self.memory_limit, stamp, len(entries)))
+        return entries
+
+    def _remember(self, session_id: str, tail: _Tail) -> None:
+        self._recent[session_id] = tail
+        self._recent.move_to_end(session_id)
+        while len(self._recent) > self.max_sessions:
+            evicted, _ = self._recent.popitem(last=False)
+            self._appends_since_compaction.pop(evicted, None)
+
+    def _fresh_tail(self, session_id: str) -> Optional[_Tail]:
+        """This process's cached tail, if nobody has written the log since it was read."""
+        tail = self._recent.get(session_id)
+        if tail is None:
+            return None
+        try:
+            stamp = _stamp(os.stat(self._path(session_id)))
+        except FileNotFoundError:
+            stamp = None
+        if stamp != tail.stamp:
+            return None
+        self._recent.move_to_end(session_id)
+        return tail
+
+    def append(self, session_id: str, entry: Dict[str, Any]) -> None:
+        """Record an entry for a session."""
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with self._locked(session_id, exclusive=True) as log:
+                before = _stamp(os.fstat(log.fileno()))
+                log.write(line)
+                log.flush()
+                tail = self._recent.get(session_id)
+                if tail is not None and tail.stamp == before:
+                    tail.entries.append(entry)
+                    tail.total += 1
+                    tail.stamp = _stamp(os.fstat(log.fileno()))
+                    self._recent.move_to_end(session_id)
+                else:
+                    self._recent.pop(session_id, None)
+
+                appends = self._appends_since_compaction.get(session_id, 0) + 1
+                if appends >= self.compact_every:
+                    self._compact(session_id, log)
+                    appends = 0
+                self._appends_since_compaction[session_id] = appends
+
+    def _compact(self, session_id: str, log: IO[str]) -> None:
+        """Rewrite the log to its newest `retain` entries; the caller holds its exclusive lock."""
+        entries = self._parse(log)
+        if len(entries) <= self.retain:
+            return
+        path = self._path(session_id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as compacted:
+            for entry in entries[-self.retain:]:
+                compacted.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(temp_path, path)
+        self._recent.pop(session_id, None)
+
+    def page(self, session_id: str, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """Return entries newest first, skipping `offset` of them."""
+        offset = max(offset, 0)
+        limit = max(limit, 0)
+        with self._lock:
+            tail = self._fresh_tail(session_id)
+            if tail is not None and offset + limit <= len(tail.entries):
+                recent = list(tail.entries)
+                return {
+                    'entries': recent[::-1][offset:offset + limit],
+                    'offset': offset,
+                    'limit': limit,
+                    'has_more': offset + limit < tail.total
+                }
+            newest_first = self._read_log(session_id)[::-1]
+
+        return {
+            'entries': newest_first[offset:offset + limit],
+            'offset': offset,
+            'limit': limit,
+            'has_more': offset + limit < len(newest_first)
+        }
@@ -0,0 +1,163 @@
+"""Background job records, one JSON file per job."""
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional
+
+TERMINAL_STATUSES = ('succeeded', 'failed')
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', 10))
+JOB_HEARTBEAT_TIMEOUT = float(os.getenv('JOB_HEARTBEAT_TIMEOUT', 60))
+
+
+@dataclass
+class JobStage:
+    name: str
+    status: str = 'pending'
+    progress: float = 0.0
+    detail: str = ''
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    stages: List[JobStage]
+    status: str = 'queued'
+    heartbeat_at: float = field(default_factory=time.time)
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    version: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop('heartbeat_at')
+        if not include_result:
+            data.pop('result')
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Job':
+        known = {f.name for f in fields(cls)}
+        return cls(**{**{key: value for key, value in data.items() if key in known}, 'stages': [JobStage(**stage) for stage in data['stages']]})
+
+
+class JobStore:
+    """Persists jobs so any worker process can report on them.
+
+    Jobs started by this process stay in memory while they run, and every
+    change is written through to `directory`. Readers in this process can
+    block in `wait_for_change` instead of polling. Jobs owned by other
+    processes are read from disk. The owning process refreshes each
+    unfinished job's heartbeat every JOB_HEARTBEAT_INTERVAL seconds; a job
+    whose heartbeat is older than JOB_HEARTBEAT_TIMEOUT is reported as
+    failed, since the worker running it is gone.
+    """
+
+    def __init__(self, directory: str, retention: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.retention = retention
+        self._live: Dict[str, Job] = {}
+        self._changed = threading.Condition()
+        self._heartbeat_pid: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _write(self, job: Job) -> None:
+        path = self._path(job.job_id)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(job), f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def save(self, job: Job, change: Optional[Callable[[Job], None]] = None) -> None:
+        """Apply `change` to a job this process owns, persist it and wake its watchers."""
+        with self._changed:
+            if change is not None:
+                change(job)
+            job.version += 1
+            job.updated_at = job.heartbeat_at = time.time()
+            self._write(job)
+            if job.finished:
+                self._live.pop(job.job_id, None)
+            else:
+                self._live[job.job_id] = job
+                self._start_heartbeat()
+            self._changed.notify_all()
+
+    def _start_heartbeat(self) -> None:
+        # Threads do not survive fork, so each worker starts its own.
+        if self._heartbeat_pid != os.getpid():
+            self._heartbeat_pid = os.getpid()
+            threading.Thread(target=self._beat, name='job-heartbeat', daemon=True).start()
+
+    def _beat(self) -> None:
+        """Refresh the heartbeat of every unfinished job this process owns; no version bump."""
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            with self._changed:
+                for job in list(self._live.values()):
+                    job.heartbeat_at = time.time()
+                    try:
+                        self._write(job)
+                    except OSError as e:
+                        print(f"Error writing heartbeat for job {job.job_id}: {e}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            job = self._live.get(job_id)
+            if job is not None:
+                return Job.from_dict(asdict(job))
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                job = Job.from_dict(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+        if not job.finished and time.time() - job.heartbeat_at > JOB_HEARTBEAT_TIMEOUT:
+            job.status = 'failed'
+            job.error = 'The worker running this job exited before it finished'
+        return job
+
+    def wait_for_change(self, job_id: str, version: int, timeout: float, poll_interval: float = 0.25) -> Optional[Job]:
+        """Return the job once its version differs from `version`, or after `timeout` seconds.
+
+        Jobs running in this process wake the caller as soon as they change;
+        other processes' jobs are re-read every `poll_interval` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.version != version or job.finished or remaining <= 0:
+                return job
+            with self._changed:
+                if job_id in self._live:
+                    if self._live[job_id].version == version:
+                        self._changed.wait(remaining)
+                    continue
+            time.sleep(min(remaining, poll_interval))
+
+    def prune(self) -> None:
+        """Delete finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith('.json') and os.path.getmtime(path) < cutoff and name[:-5] not in self._live:
+                    os.remove(path)
+            except OSError:
+                continue
+
@@ -0,0 +1,54 @@
+import pytest
+
+from storage.chat_history import ChatHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChatHistoryStore(str(tmp_path), memory_limit=5)
+
+
+def test_page_returns_newest_first(store):
+    for i in range(3):
+        store.append('s', {'i': i})
+    page = store.page('s', limit=2)
+    assert [entry['i'] for entry in page['entries']] == [2, 1]
+    assert page['has_more'] is True
+
+
+def test_has_more_is_false_when_the_log_exactly_fills_memory(store):
+    for i in range(5):
+        store.append('s', {'i': i})
+    assert store.page('s', limit=5)['has_more'] is False
+    store.append('s', {'i': 5})
+    assert store.page('s', limit=5)['has_more'] is True
+
+
+def test_pages_past_the_memory_tail_come_from_disk(store):
+    for i in range(8):
+        store.append('s', {'i': i})
+    page = store.page('s', offset=5, limit=5)
+    assert [entry['i'] for entry in page['entries']] == [2, 1, 0]
+    assert page['has_more'] is False
+
+
+def test_sees_appends_from_another_store_on_the_same_directory(tmp_path):
+    first = ChatHistoryStore(str(tmp_path))
+    second = ChatHistoryStore(str(tmp_path))
+    first.append('s', {'i': 0})
+    assert first.page('s')['entries'] == [{'i': 0}]
+    second.append('s', {'i': 1})
+    assert [entry['i'] for entry in first.page('s')['entries']] == [1, 0]
+
+
+def test_compaction_keeps_the_newest_entries(tmp_path):
+    store = ChatHistoryStore(str(tmp_path), compact_every=4, retain=3)
+    for i in range(8):
+        store.append('s', {'i': i})
+    assert [entry['i'] for entry in ChatHistoryStore(str(tmp_path)).page('s')['entries']] == [7, 6, 5]
+
+
+def test_unknown_session_is_empty_and_creates_no_file(tmp_path):
+    store = ChatHistoryStore(str(tmp_path))
+    assert store.page('nobody') == {'entries': [], 'offset': 0, 'limit': 20, 'has_more': False}
+    assert list(tmp_path.iterdir()) == []